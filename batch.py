@@ -0,0 +1,256 @@
+"""
+Move generation and evaluation for many boards at once, with NumPy.
+
+Boards are an (N, width, width) integer array in the same layout as
+Othello.board (boards[n][y][x], 0 for empty, 1 for white, 2 for black), and
+players are either one player number for every board or an (N,) array of them.
+Every function works on all N boards with whole-array operations, so there is
+no Python-level loop over boards or squares, only over the 8 directions and
+the length of a line.
+
+Run this file to check the results against Othello on random positions, and
+to time both:
+
+	python3 batch.py -n 10000 -w 8
+"""
+import random
+import sys
+import time
+
+import numpy
+
+from othelloplayer import Othello
+
+################################################################################
+# CONSTANTS
+################################################################################
+
+# (dx, dy) for each of the 8 directions
+DIRECTIONS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+DEFAULT_BOARDS = 10000
+DEFAULT_WIDTH = 8
+DEFAULT_PLIES = 60
+
+################################################################################
+# BATCHED FUNCTIONS
+################################################################################
+
+def to_array(boards):
+	"""
+	Returns a list of 2D boards (lists or tuples) as an (N, width, width) array.
+	"""
+	return numpy.array(boards, dtype=numpy.int8)
+
+def _get_sides(boards, players):
+	"""
+	Returns (own, opp) boolean masks of each board's player's and opponent's tokens.
+	"""
+	players = numpy.asarray(players, dtype=boards.dtype).reshape(-1, 1, 1)
+	own = boards == players
+	opp = (boards != 0) & ~own
+	return (own, opp)
+
+def _shift(mask, dx, dy):
+	"""
+	Returns the masks with every square moved dx right and dy down. Squares moved
+	off the board are lost, and the ones moved out of are cleared.
+	"""
+	width = mask.shape[2]
+	shifted = numpy.zeros_like(mask)
+	shifted[:, max(dy, 0):width + min(dy, 0), max(dx, 0):width + min(dx, 0)] = mask[:, max(-dy, 0):width + min(-dy, 0), max(-dx, 0):width + min(-dx, 0)]
+	return shifted
+
+def get_move_masks(boards, players):
+	"""
+	Returns an (N, width, width) boolean array of each board's legal moves for
+	its player: empty squares from which a line of opponent tokens ends in one of
+	the player's own.
+	"""
+	own, opp = _get_sides(boards, players)
+	empty = boards == 0
+	moves = numpy.zeros_like(own)
+	for dx, dy in DIRECTIONS:
+		# opponent lines running back from each own token, grown one square at a time
+		line = _shift(own, dx, dy) & opp
+		for _ in range(boards.shape[1] - 3):
+			line |= _shift(line, dx, dy) & opp
+		moves |= _shift(line, dx, dy) & empty
+	return moves
+
+def count_moves(boards, players):
+	"""
+	Returns an (N,) array of the number of legal moves on each board.
+	"""
+	return get_move_masks(boards, players).sum(axis=(1, 2))
+
+def get_flip_masks(boards, players, locations):
+	"""
+	Returns an (N, width, width) boolean array of the tokens each board's player
+	would flip by playing at its (x, y) location, given as an (N, 2) array.
+	"""
+	own, opp = _get_sides(boards, players)
+	locations = numpy.asarray(locations).reshape(-1, 2)
+	placed = numpy.zeros_like(own)
+	placed[numpy.arange(len(boards)), locations[:, 1], locations[:, 0]] = True
+
+	flips = numpy.zeros_like(own)
+	for dx, dy in DIRECTIONS:
+		# the line of opponent tokens running out from the placed token...
+		line = _shift(placed, dx, dy) & opp
+		for _ in range(boards.shape[1] - 3):
+			line |= _shift(line, dx, dy) & opp
+		# ...only flips if one of the player's own tokens is at the end of it
+		bracketed = (_shift(line, dx, dy) & own).any(axis=(1, 2))
+		flips |= line & bracketed[:, None, None]
+	return flips
+
+def play_moves(boards, players, locations):
+	"""
+	Returns new boards with each board's player having played at its (x, y)
+	location, flipping tokens the same way Othello.play_move does.
+	"""
+	players = numpy.broadcast_to(numpy.asarray(players, dtype=boards.dtype), (len(boards),))
+	locations = numpy.asarray(locations).reshape(-1, 2)
+	flips = get_flip_masks(boards, players, locations)
+
+	played = numpy.where(flips, players[:, None, None], boards)
+	played[numpy.arange(len(boards)), locations[:, 1], locations[:, 0]] = players
+	return played
+
+def get_token_counts(boards, players):
+	"""
+	Returns an (N,) array of the number of tokens each board's player has.
+	"""
+	return _get_sides(boards, players)[0].sum(axis=(1, 2))
+
+def evaluate(boards, players):
+	"""
+	Returns an (N,) array of Othello.evaluate() for each board: the player's token
+	count minus his opponent's.
+	"""
+	own, opp = _get_sides(boards, players)
+	return own.sum(axis=(1, 2), dtype=numpy.int64) - opp.sum(axis=(1, 2), dtype=numpy.int64)
+
+################################################################################
+# CHECKING
+################################################################################
+
+def make_positions(count, width = DEFAULT_WIDTH, max_plies = DEFAULT_PLIES, seed = 0):
+	"""
+	Returns (boards, players) for the given number of positions, each reached by
+	a random number of random moves from the start. Every player has a legal move.
+	"""
+	rng = random.Random(seed)
+	boards = []
+	players = []
+	while len(boards) < count:
+		game = Othello(None, width)
+		player = 2
+		for _ in range(rng.randrange(max_plies)):
+			moves = game._get_available_moves(player)
+			if not moves:
+				player = 3 - player
+				moves = game._get_available_moves(player)
+				if not moves:
+					break
+			game.play_move(rng.choice(moves), player)
+			player = 3 - player
+		if game._get_available_moves(player):
+			boards.append(game.board)
+			players.append(player)
+	return (boards, players)
+
+def check(boards, players, seed = 0):
+	"""
+	Returns the number of boards where the batched results differ from Othello's:
+	the legal moves, the board after a random legal move, and the evaluation.
+	"""
+	rng = random.Random(seed)
+	games = [Othello([list(row) for row in board]) for board in boards]
+	array = to_array(boards)
+
+	masks = get_move_masks(array, players)
+	scores = evaluate(array, players)
+	locations = [rng.choice(game._get_available_moves(player)) for game, player in zip(games, players)]
+	played = play_moves(array, players, locations)
+
+	mismatches = 0
+	for n, (game, player) in enumerate(zip(games, players)):
+		moves = sorted((int(x), int(y)) for y, x in zip(*numpy.nonzero(masks[n])))
+		ok = moves == sorted(game._get_available_moves(player))
+		ok = ok and scores[n] == game.evaluate(player)
+		game.play_move(locations[n], player)
+		ok = ok and played[n].tolist() == game.board
+		mismatches += not ok
+	return mismatches
+
+def make_timing_games(boards, players, seed = 0):
+	"""
+	Returns (games, locations): an Othello for each board, and a random legal move
+	on each. Picking the moves fills each game's move cache, which would let the
+	timed loop skip generating them, so the caches are emptied again.
+	"""
+	rng = random.Random(seed)
+	games = [Othello([list(row) for row in board]) for board in boards]
+	locations = [rng.choice(game._get_available_moves(player)) for game, player in zip(games, players)]
+	for game in games:
+		game.clear_move_cache()
+	return (games, locations)
+
+def time_both(boards, players, seed = 0):
+	"""
+	Returns (Othello seconds, batched seconds) to find every board's legal moves,
+	play a random one of them, and evaluate the result.
+	"""
+	games, locations = make_timing_games(boards, players, seed)
+
+	start = time.perf_counter()
+	for game, player, location in zip(games, players, locations):
+		game._get_available_moves(player)
+		game.play_move(location, player)
+		game.evaluate(player)
+	loop_seconds = time.perf_counter() - start
+
+	start = time.perf_counter()
+	array = to_array(boards)
+	get_move_masks(array, players)
+	evaluate(play_moves(array, players, locations), players)
+	batch_seconds = time.perf_counter() - start
+
+	return (loop_seconds, batch_seconds)
+
+################################################################################
+# COMMAND LINE
+################################################################################
+
+def print_help(output = sys.stderr):
+	"""
+	Print out a help screen for the user (probably to stderr).
+	"""
+	print("Usage: python3 " +sys.argv[0]+ " <options>", file=output)
+	print("Options include:", file=output)
+	print("\t-h\tprint this help", file=output)
+	print("\t-n\tnumber of random positions (default " +str(DEFAULT_BOARDS)+ ")", file=output)
+	print("\t-s\trandom seed (default 0)", file=output)
+	print("\t-w\tboard width (default " +str(DEFAULT_WIDTH)+ ")", file=output)
+
+if __name__ == "__main__":
+	args = sys.argv[1:]
+	if "-h" in args or "--help" in args:
+		print_help()
+		sys.exit(1)
+
+	count = int(args[args.index("-n") + 1]) if "-n" in args else DEFAULT_BOARDS
+	width = int(args[args.index("-w") + 1]) if "-w" in args else DEFAULT_WIDTH
+	seed = int(args[args.index("-s") + 1]) if "-s" in args else 0
+
+	boards, players = make_positions(count, width, width * width - 4, seed)
+	mismatches = check(boards, players, seed)
+	loop_seconds, batch_seconds = time_both(boards, players, seed)
+
+	print(str(count) + " boards, " + str(mismatches) + " mismatches")
+	print("Othello: %.3fs (%.0f boards/s), batched: %.3fs (%.0f boards/s), x%.1f" % (
+		loop_seconds, count / loop_seconds, batch_seconds, count / batch_seconds, loop_seconds / batch_seconds))
+	if mismatches:
+		sys.exit(2)
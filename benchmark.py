@@ -0,0 +1,340 @@
+"""
+Speed benchmarks for move generation and search, on a fixed set of positions.
+
+For every position and engine (the 2D list Othello, and BitboardOthello on 8x8
+boards) this measures:
+	perft:		the number of leaf nodes a given number of plies ahead, which checks
+				move generation for correctness (the engines must agree, and the
+				starting position must match the well-known counts).
+	movegen:	calls per second of _get_available_moves(), get_flipped() (once per
+				legal move), and get_children().
+	search:		nodes/sec, cumulative time to reach each depth of an iteratively
+				deepened Search, and how many times moves were generated per node.
+	fixed:		the nodes a single search to the deepest depth takes with the
+				principal variation search, next to plain alpha-beta.
+
+Results are printed (or written with -o) as JSON, so runs from different commits
+can be compared. -c compares a run against an earlier JSON file.
+
+	python3 benchmark.py -o before.json
+	python3 benchmark.py -c before.json
+
+-b measures instead how many midgame positions per second
+ComputerPlayer.pick_moves() gets through with 1, 2, 4... worker processes (up to
+one per core), which should grow about as fast as the number of workers.
+
+	python3 benchmark.py -b
+"""
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from bitboard import BitboardOthello
+from othelloplayer import ComputerPlayer, Othello
+from search import Search
+from transposition import TranspositionTable
+
+################################################################################
+# CONSTANTS
+################################################################################
+
+# (name, width, random plies played from the start, seed, perft depth, search depth)
+POSITIONS = (
+	("start", 8, 0, 0, 5, 7),
+	("opening", 8, 6, 1, 4, 6),
+	("midgame", 8, 24, 2, 4, 6),
+	("endgame", 8, 48, 3, 5, 8),
+	("midgame16", 16, 80, 4, 3, 3),
+	("midgame24", 24, 200, 5, 2, 2),
+)
+
+# leaf counts from the starting position, for plies 1 through 8
+KNOWN_START_PERFT = (4, 12, 56, 244, 1396, 8200, 55092, 390216)
+
+# how long to keep repeating each movegen measurement, in seconds
+MIN_TIME = 0.2
+
+# the pick_moves() benchmark: how many positions, how many random plies into the
+# game (the seed picks from this range), and how deep to search them
+BATCH_POSITIONS = 1000
+BATCH_PLIES = (16, 32)
+BATCH_DEPTH = 4
+
+################################################################################
+# BENCHMARKS
+################################################################################
+
+def make_position(width, plies, seed):
+	"""
+	Returns (board, player to move) after playing the given number of random moves
+	from the starting position, with a fixed seed.
+	"""
+	rng = random.Random(seed)
+	game = Othello(None, width)
+	player = 2
+	for _ in range(plies):
+		moves = game._get_available_moves(player)
+		if not moves:
+			if not game._get_available_moves(3 - player):
+				break
+		else :
+			game.play_move(rng.choice(moves), player)
+		player = 3 - player
+	return (game.board, player)
+
+def get_engines(board):
+	"""
+	Returns a dict of engine name to a fresh game state for the board.
+	"""
+	engines = {"list": Othello(board)}
+	if len(board) == 8:
+		engines["bitboard"] = BitboardOthello(board)
+	return engines
+
+def perft(state, player, depth):
+	"""
+	Returns the number of leaf nodes depth plies ahead. A pass counts as a ply,
+	and a finished game counts as a leaf however early it ends.
+	"""
+	if depth == 0:
+		return 1
+
+	moves = state.get_moves(player)
+	if not moves:
+		if not state.get_moves(3 - player):
+			return 1
+		return perft(state, 3 - player, depth - 1)
+
+	total = 0
+	for move in moves:
+		undo = state.make_move(move, player)
+		total += perft(state, 3 - player, depth - 1)
+		state.unmake_move(move, player, undo)
+	return total
+
+def get_rate(function):
+	"""
+	Calls the function repeatedly for at least MIN_TIME seconds, and returns the
+	number of calls per second.
+	"""
+	calls = 0
+	start = time.perf_counter()
+	while True:
+		function()
+		calls += 1
+		elapsed = time.perf_counter() - start
+		if elapsed >= MIN_TIME:
+			return calls / elapsed
+
+def benchmark_movegen(state, player):
+	"""
+	Returns calls per second for the move generation functions. The move cache
+	is cleared before every call, so moves really are generated each time.
+	"""
+	moves = state._get_available_moves(player)
+	def flip_all():
+		for move in moves:
+			state.get_flipped(move, player)
+	def generate():
+		state.clear_move_cache()
+		state._get_available_moves(player)
+	def get_children():
+		state.clear_move_cache()
+		state.get_children(player)
+
+	return {
+		"available_moves_per_second": get_rate(generate),
+		"flipped_per_second": get_rate(flip_all) * len(moves),
+		"children_per_second": get_rate(get_children),
+	}
+
+def benchmark_search(state, player, max_depth):
+	"""
+	Searches 1, 2, ... max_depth plies deep with one Search and table, and returns
+	the node count and cumulative time to finish each depth, plus nodes/sec and
+	move generations per node.
+	"""
+	search = Search(TranspositionTable(1 << 18), seed=0)
+	generated = state.generated
+	depths = {}
+	best_move = None
+	start = time.perf_counter()
+	for depth in range(1, max_depth + 1):
+		best_move = search._search_root(state, player, depth, best_move)
+		depths[depth] = {"nodes": search.stats.nodes, "seconds": time.perf_counter() - start}
+	elapsed = time.perf_counter() - start
+
+	return {
+		"depths": depths,
+		"nodes": search.stats.nodes,
+		"nodes_per_second": search.stats.nodes / elapsed if elapsed else 0.0,
+		"cutoff_rate": search.stats.get_cutoff_rate(),
+		"movegen_per_node": (state.generated - generated) / search.stats.nodes if search.stats.nodes else 0.0,
+		"best_move": None if best_move is None else state.get_location(best_move),
+	}
+
+def benchmark_fixed_depth(state, player, depth):
+	"""
+	Searches depth plies deep once as a principal variation search and once as
+	plain alpha-beta, each with a fresh table, and returns both node counts.
+	"""
+	results = {"depth": depth}
+	for name, pvs in (("pvs_nodes", True), ("alpha_beta_nodes", False)):
+		search = Search(TranspositionTable(1 << 18), seed=0, pvs=pvs)
+		search.get_best_move(state, player, depth)
+		results[name] = search.stats.nodes
+	return results
+
+def benchmark_batch(count = BATCH_POSITIONS, depth = BATCH_DEPTH, max_workers = None):
+	"""
+	Returns the positions per second pick_moves() gets through on count midgame
+	positions with black to move, for 1, 2, 4... workers up to max_workers (one
+	per core by default), and checks that every worker count picks legal moves.
+	"""
+	boards = []
+	seed = 0
+	while len(boards) < count:
+		board, player = make_position(8, BATCH_PLIES[0] + seed % (BATCH_PLIES[1] - BATCH_PLIES[0]), seed)
+		seed += 1
+		if player == 2 and Othello(board)._get_available_moves(2):
+			boards.append(tuple(tuple(row) for row in board))
+
+	if max_workers == None:
+		max_workers = os.cpu_count() or 1
+	worker_counts = [1]
+	while worker_counts[-1] * 2 <= max_workers:
+		worker_counts.append(worker_counts[-1] * 2)
+	if worker_counts[-1] != max_workers:
+		worker_counts.append(max_workers)
+
+	results = {"positions": count, "depth": depth, "cores": os.cpu_count(), "workers": {}}
+	for workers in worker_counts:
+		player = ComputerPlayer(2, depth, seed=0, endgame_empties=0)
+		# start the workers (and their imports) before the clock does
+		player.pick_moves(boards[:workers], workers)
+		start = time.perf_counter()
+		moves = player.pick_moves(boards, workers)
+		elapsed = time.perf_counter() - start
+		player.close()
+
+		for board, move in zip(boards, moves):
+			assert Othello([list(row) for row in board]).get_flipped(move, 2), "pick_moves() picked an illegal move!"
+		results["workers"][workers] = {"seconds": elapsed, "positions_per_second": count / elapsed}
+
+	base = results["workers"][1]["positions_per_second"]
+	for stats in results["workers"].values():
+		stats["speedup"] = stats["positions_per_second"] / base
+	return results
+
+def run_benchmarks(names = None, quick = False):
+	"""
+	Runs every benchmark on every position (or just the named ones), and returns
+	the results as a JSON-ready dict. Quick runs search and perft one ply less.
+	"""
+	results = {"python": platform.python_version(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "positions": {}}
+
+	for name, width, plies, seed, perft_depth, search_depth in POSITIONS:
+		if names and name not in names:
+			continue
+		if quick:
+			perft_depth = max(1, perft_depth - 1)
+			search_depth = max(1, search_depth - 1)
+
+		board, player = make_position(width, plies, seed)
+		position = {"width": width, "player": player, "empties": Othello(board).get_state_value(0), "engines": {}}
+
+		for engine_name, state in get_engines(board).items():
+			start = time.perf_counter()
+			nodes = perft(state, player, perft_depth)
+			perft_seconds = time.perf_counter() - start
+
+			stats = {"perft": {"depth": perft_depth, "nodes": nodes, "seconds": perft_seconds, "nodes_per_second": nodes / perft_seconds}}
+			stats.update(benchmark_movegen(state, player))
+			stats["search"] = benchmark_search(state, player, search_depth)
+			stats["fixed_depth"] = benchmark_fixed_depth(state, player, search_depth)
+			position["engines"][engine_name] = stats
+
+		counts = set(stats["perft"]["nodes"] for stats in position["engines"].values())
+		position["perft_ok"] = len(counts) == 1
+		if name == "start" and width == 8:
+			position["perft_ok"] = position["perft_ok"] and counts == {KNOWN_START_PERFT[perft_depth - 1]}
+
+		results["positions"][name] = position
+
+	return results
+
+def compare(old, new, output = sys.stdout):
+	"""
+	Prints how each rate in the new results compares to the old ones.
+	"""
+	rates = ("available_moves_per_second", "flipped_per_second", "children_per_second")
+	for name, position in new["positions"].items():
+		if name not in old["positions"]:
+			continue
+		for engine_name, stats in position["engines"].items():
+			old_stats = old["positions"][name]["engines"].get(engine_name)
+			if old_stats == None:
+				continue
+			line = name + " " + engine_name + ":"
+			for rate in rates:
+				line += " " + rate.replace("_per_second", "") + " x%.2f" % (stats[rate] / old_stats[rate])
+			line += " perft x%.2f" % (stats["perft"]["nodes_per_second"] / old_stats["perft"]["nodes_per_second"])
+			line += " search x%.2f" % (stats["search"]["nodes_per_second"] / old_stats["search"]["nodes_per_second"])
+			if "movegen_per_node" in old_stats["search"]:
+				line += " movegen/node %.2f -> %.2f" % (old_stats["search"]["movegen_per_node"], stats["search"]["movegen_per_node"])
+			fixed = stats["fixed_depth"]
+			line += " depth %d nodes %d (alpha-beta %d)" % (fixed["depth"], fixed["pvs_nodes"], fixed["alpha_beta_nodes"])
+			print(line, file=output)
+
+################################################################################
+# COMMAND LINE
+################################################################################
+
+def print_help(output = sys.stderr):
+	"""
+	Print out a help screen for the user (probably to stderr).
+	"""
+	print("Usage: python3 " +sys.argv[0]+ " <options> [position names]", file=output)
+	print("Options include:", file=output)
+	print("\t-b\tmeasure pick_moves() throughput instead (-q for fewer positions)", file=output)
+	print("\t-c\tcompare against an earlier JSON file", file=output)
+	print("\t-h\tprint this help", file=output)
+	print("\t-o\twrite the JSON results to a file instead of stdout", file=output)
+	print("\t-q\tquick run (one ply shallower)", file=output)
+	print("Positions: " + ", ".join(position[0] for position in POSITIONS), file=output)
+
+if __name__ == "__main__":
+	args = sys.argv[1:]
+	if "-h" in args or "--help" in args:
+		print_help()
+		sys.exit(1)
+
+	output_file = args[args.index("-o") + 1] if "-o" in args else None
+	compare_file = args[args.index("-c") + 1] if "-c" in args else None
+	names = [arg for arg in args if not arg.startswith("-") and arg not in (output_file, compare_file)]
+
+	if "-b" in args:
+		results = benchmark_batch(BATCH_POSITIONS // 10 if "-q" in args else BATCH_POSITIONS)
+		json.dump(results, sys.stdout, indent=1)
+		print()
+		sys.exit(0)
+
+	results = run_benchmarks(names, "-q" in args)
+
+	if output_file:
+		with open(output_file, "w") as f:
+			json.dump(results, f, indent=1)
+	elif not compare_file:
+		json.dump(results, sys.stdout, indent=1)
+		print()
+
+	if compare_file:
+		with open(compare_file) as f:
+			compare(json.load(f), results)
+
+	if not all(position["perft_ok"] for position in results["positions"].values()):
+		print("perft mismatch!", file=sys.stderr)
+		sys.exit(2)
@@ -0,0 +1,439 @@
+"""
+An 8x8 Othello engine built on two 64-bit integers instead of a 2D list.
+
+Square (x, y) maps to bit y*8 + x. Each player's tokens are held in their own
+int, so move generation and flipping are done with shifts and masks rather than
+walking the board one tile at a time.
+"""
+from transposition import get_zobrist_keys
+
+FULL = 0xFFFFFFFFFFFFFFFF
+NOT_A_FILE = 0xFEFEFEFEFEFEFEFE # every square except x == 0
+NOT_H_FILE = 0x7F7F7F7F7F7F7F7F # every square except x == 7
+INNER_FILES = NOT_A_FILE & NOT_H_FILE
+
+CORNERS = 0x8100000000000081
+EDGES = 0xFF818181818181FF
+
+# (shift, mask) pairs for directions that move toward higher bits, then lower bits.
+# The mask removes any bits that wrapped around from the opposite edge.
+_LEFT_SHIFTS = ((1, NOT_A_FILE), (7, NOT_H_FILE), (8, FULL), (9, NOT_A_FILE))
+_RIGHT_SHIFTS = ((1, NOT_H_FILE), (7, NOT_A_FILE), (8, FULL), (9, NOT_H_FILE))
+
+def get_moves(own, opp):
+	"""
+	Returns a bitmask of every empty square where the player holding the "own"
+	tokens could play and flip at least one of the "opp" tokens.
+	"""
+	empty = ~(own | opp) & FULL
+	inner = opp & INNER_FILES
+	moves = 0
+
+	for shift, mask in ((1, inner), (7, inner), (8, opp), (9, inner)):
+		t = mask & (own << shift)
+		t |= mask & (t << shift)
+		t |= mask & (t << shift)
+		t |= mask & (t << shift)
+		t |= mask & (t << shift)
+		t |= mask & (t << shift)
+		moves |= t << shift
+
+		t = mask & (own >> shift)
+		t |= mask & (t >> shift)
+		t |= mask & (t >> shift)
+		t |= mask & (t >> shift)
+		t |= mask & (t >> shift)
+		t |= mask & (t >> shift)
+		moves |= t >> shift
+
+	return moves & empty
+
+def get_flips(own, opp, square):
+	"""
+	Returns a bitmask of the "opp" tokens that would be flipped if the "own" player
+	played on the given square (a bit index, not a location).
+	"""
+	x = 1 << square
+	flips = 0
+
+	for shift, mask in _LEFT_SHIFTS:
+		line = 0
+		t = (x << shift) & mask
+		while t & opp:
+			line |= t
+			t = (t << shift) & mask
+		if t & own:
+			flips |= line
+
+	for shift, mask in _RIGHT_SHIFTS:
+		line = 0
+		t = (x >> shift) & mask
+		while t & opp:
+			line |= t
+			t = (t >> shift) & mask
+		if t & own:
+			flips |= line
+
+	return flips
+
+def iter_squares(mask):
+	"""
+	Yields the bit index of every set bit in the mask, lowest first. Since squares
+	are numbered y*8 + x, this is the same order as scanning the 2D board by rows.
+	"""
+	while mask:
+		low = mask & -mask
+		yield low.bit_length() - 1
+		mask ^= low
+
+def to_location(square):
+	"""
+	Converts a bit index into an (x, y) location.
+	"""
+	return (square & 7, square >> 3)
+
+def to_square(location):
+	"""
+	Converts an (x, y) location into a bit index.
+	"""
+	return location[1] * 8 + location[0]
+
+def get_location_type(square):
+	"""
+	The bitboard equivalent of othelloplayer.get_location_type.
+	"Corner" returns 3. "Edge" returns 2. Otherwise returns 1.
+	"""
+	bit = 1 << square
+	if bit & CORNERS:
+		return 3
+	if bit & EDGES:
+		return 2
+	return 1
+
+class BitboardOthello:
+	"""
+	An 8x8 game of Othello with the same public interface as othelloplayer.Othello,
+	but stored as two bitboards.
+
+	Attributes:
+		tokens:	a list of [None, white bitboard, black bitboard], so that tokens[player]
+				gives the bitboard for player 1 or 2.
+		width:	always 8.
+		move_cache:	for each player, the (key, move bitmask) of the last moves
+					generated, so asking again about the same position is cheap.
+		generated:	the number of times moves were actually generated.
+	"""
+	def __init__(self, board, width=None):
+		"""
+		Constructor. Breaks if neither board nor width are provided, or if the board is
+		not 8x8. If a board is given, it is converted into bitboards. Otherwise the
+		standard starting position is built.
+		"""
+		assert(board != None or width != None)
+
+		self.width = 8
+		self.tokens = [None, 0, 0]
+
+		if board:
+			assert(len(board) == 8 and len(board[0]) == 8)
+			for y in range(8):
+				for x in range(8):
+					cell = board[y][x]
+					if cell:
+						self.tokens[cell] |= 1 << (y*8 + x)
+		else :
+			assert(width == 8)
+			self.tokens[1] = (1 << to_square((3, 3))) | (1 << to_square((4, 4)))
+			self.tokens[2] = (1 << to_square((4, 3))) | (1 << to_square((3, 4)))
+
+		self.key = self._compute_key()
+		self.move_cache = [None, None, None]
+		self.generated = 0
+
+	def _compute_key(self):
+		"""
+		Returns the Zobrist key of the tokens on the board, from scratch.
+		"""
+		square_keys = get_zobrist_keys(8)[0]
+		key = 0
+		for player in (1, 2):
+			for square in iter_squares(self.tokens[player]):
+				key ^= square_keys[square][player]
+		return key
+
+	@property
+	def board(self):
+		"""
+		The board as a 2D list of integers, in the same layout as Othello.board.
+		"""
+		white, black = self.tokens[1], self.tokens[2]
+		board = []
+		for y in range(8):
+			row = []
+			for x in range(8):
+				bit = 1 << (y*8 + x)
+				row.append(1 if white & bit else 2 if black & bit else 0)
+			board.append(row)
+		return board
+
+	def copy(self):
+		"""
+		Returns a new BitboardOthello with the same tokens.
+		"""
+		other = BitboardOthello.__new__(BitboardOthello)
+		other.width = 8
+		other.tokens = [None, self.tokens[1], self.tokens[2]]
+		other.key = self.key
+		other.move_cache = self.move_cache[:]
+		other.generated = 0
+		return other
+
+	def play_move(self, location, player):
+		"""
+		Places the player's token at the location provided.
+		Then flips all appropriate tokens at orthogonal and diagonal directions.
+		Returns the list of flipped locations, which undo_move() needs.
+		"""
+		flips = self.make_move(to_square(location), player)[0]
+		return [to_location(square) for square in iter_squares(flips)]
+
+	def undo_move(self, location, player, flipped):
+		"""
+		Takes back a move made with play_move(), given the list of locations it
+		flipped. Moves must be undone in the reverse order they were played.
+		"""
+		flips = 0
+		for flip in flipped:
+			flips |= 1 << to_square(flip)
+
+		opponent = 3 - player
+		self.tokens[player] &= ~(flips | (1 << to_square(location)))
+		self.tokens[opponent] |= flips
+		self.key = self._compute_key()
+
+	def make_move(self, square, player):
+		"""
+		Plays a move from get_moves() (a bit index) in place. Returns a tuple of the
+		flipped bitmask and the old key, which unmake_move() needs to take it back.
+		"""
+		return self._place(square, player, get_flips(self.tokens[player], self.tokens[3 - player], square))
+
+	def _place(self, square, player, flips):
+		"""
+		make_move(), given the bitmask of tokens the move flips.
+		"""
+		opponent = 3 - player
+		undo = (flips, self.key)
+
+		self.tokens[player] |= flips | (1 << square)
+		self.tokens[opponent] &= ~flips
+
+		square_keys = get_zobrist_keys(8)[0]
+		key = self.key ^ square_keys[square][player]
+		while flips:
+			low = flips & -flips
+			flips ^= low
+			flip_keys = square_keys[low.bit_length() - 1]
+			key ^= flip_keys[1] ^ flip_keys[2]
+		self.key = key
+
+		return undo
+
+	def unmake_move(self, square, player, undo):
+		"""
+		Takes back a move played by make_move().
+		"""
+		flips, self.key = undo
+		self.tokens[player] &= ~(flips | (1 << square))
+		self.tokens[3 - player] |= flips
+
+	def try_move(self, square, player):
+		"""
+		make_move() for any empty square: returns None, and leaves the board alone,
+		if the move wouldn't flip anything.
+		"""
+		flips = get_flips(self.tokens[player], self.tokens[3 - player], square)
+		if not flips:
+			return None
+		return self._place(square, player, flips)
+
+	def get_empties(self):
+		"""
+		Returns every empty square as a bit index, the form get_moves() uses.
+		"""
+		return list(iter_squares(~(self.tokens[1] | self.tokens[2]) & FULL))
+
+	def _get_move_mask(self, player):
+		"""
+		Returns the bitmask of the player's moves, generating it only if the board
+		has changed since it was last asked for.
+		"""
+		cached = self.move_cache[player]
+		if cached is not None and cached[0] == self.key:
+			return cached[1]
+		self.generated += 1
+		moves = get_moves(self.tokens[player], self.tokens[3 - player])
+		self.move_cache[player] = (self.key, moves)
+		return moves
+
+	def count_moves(self, player):
+		"""
+		Returns the number of moves available to the player.
+		"""
+		return self._get_move_mask(player).bit_count()
+
+	def to_string(self):
+		"""
+		Converts the game state into an easy-to-read string.
+		"""
+		output = "  " + " ".join(str(i) for i in range(8)) + "\n"
+		for i, row in enumerate(self.board):
+			output += str(i) + " " + " ".join(str(cell) for cell in row) + "\n"
+		return output
+
+	def _get_available_moves(self, player):
+		"""
+		Finds all available moves for a player, as (x, y) locations.
+		Note that a player can have no available play spots in normal play.
+		"""
+		return [to_location(square) for square in iter_squares(self._get_move_mask(player))]
+
+	def clear_move_cache(self):
+		"""
+		Forgets the cached moves, so the next call generates them again.
+		"""
+		self.move_cache = [None, None, None]
+
+	def is_on_board(self, location):
+		"""
+		Returns whether a location is a valid spot on the game board.
+		"""
+		return 0 <= location[0] < 8 and 0 <= location[1] < 8
+
+	def get_flipped(self, location, player):
+		"""
+		Returns a list of tokens that would be flipped to the given player's color if he
+		were to play on the location given.
+		"""
+		flips = get_flips(self.tokens[player], self.tokens[3 - player], to_square(location))
+		return [to_location(square) for square in iter_squares(flips)]
+
+	def get_children(self, player):
+		"""
+		Returns a list of all states from available moves the given player can make.
+		"""
+		children = []
+		for move in self._get_available_moves(player):
+			child = self.copy()
+			child.play_move(move, player)
+			children.append(child)
+		return children
+
+	def get_moves(self, player):
+		"""
+		Returns the moves available to the player as bit indices, which is the form
+		the search uses.
+		"""
+		return list(iter_squares(self._get_move_mask(player)))
+
+	def get_child(self, move, player):
+		"""
+		Returns a copy of this state with the move (a bit index) played.
+		"""
+		child = self.copy()
+		child.make_move(move, player)
+		return child
+
+	def get_location(self, move):
+		"""
+		Converts a move from get_moves() into an (x, y) location.
+		"""
+		return to_location(move)
+
+	def get_move_type(self, move):
+		"""
+		Returns get_location_type() for a move from get_moves().
+		"""
+		return get_location_type(move)
+
+	def evaluate(self, player):
+		"""
+		Returns the player's token count minus his opponent's.
+		"""
+		return self.tokens[player].bit_count() - self.tokens[3 - player].bit_count()
+
+	def get_state_value(self, player):
+		"""
+		Returns the number of tokens the player has on the board. Player 0 counts
+		the empty squares.
+		"""
+		if player == 0:
+			return 64 - (self.tokens[1] | self.tokens[2]).bit_count()
+		return self.tokens[player].bit_count()
+
+	def _is_state_terminal(self):
+		"""
+		Returns true if there are no spots, or if neither player can make a valid
+		move.
+		"""
+		return not self._get_move_mask(1) and not self._get_move_mask(2)
+
+	def get_best_move(self, player, plies):
+		"""
+		Returns the best move for a given player to take, looking ahead by a
+		given number of plies. Scores and tie-breaks match Othello.get_best_move.
+		"""
+		own, opp = self.tokens[player], self.tokens[3 - player]
+
+		best_move = (None, -float("inf"))
+		for square in iter_squares(get_moves(own, opp)):
+			flips = get_flips(own, opp, square)
+			score = _negamax(own | flips | (1 << square), opp & ~flips, plies - 1, -float("inf"), float("inf"), True)
+			if score > best_move[1]:
+				best_move = (square, score)
+
+			if score == best_move[1]:
+				# we prefer corner to edge to other locations.
+				if best_move[0] is None or get_location_type(square) > get_location_type(best_move[0]):
+					best_move = (square, score)
+
+		if best_move[0] is None:
+			return None
+		return to_location(best_move[0])
+
+	def negamax(self, player, depth, a, b, isPruning):
+		"""
+		Negamax function, with the same conventions as Othello.negamax: "player" is
+		the player who made the last move, and leaves are scored by his token count.
+		"""
+		return _negamax(self.tokens[player], self.tokens[3 - player], depth, a, b, isPruning)
+
+def _negamax(own, opp, depth, a, b, isPruning):
+	"""
+	Bitboard negamax. "own" belongs to the player who just moved, and "opp" to the
+	player whose turn it is.
+	"""
+	if depth == 0:
+		return own.bit_count()
+	moves = get_moves(opp, own)
+	if not moves and not get_moves(own, opp):
+		return own.bit_count()
+
+	best = -float("inf")
+
+	while moves:
+		low = moves & -moves
+		moves ^= low
+		flips = get_flips(opp, own, low.bit_length() - 1)
+		value = _negamax(opp | flips | low, own & ~flips, depth - 1, -b, -a, isPruning)
+		if value > best:
+			best = value
+
+		# Prunes low-value children. Alpha-beta.
+		if isPruning:
+			if value > a:
+				a = value
+			if a >= b:
+				break
+
+	return -best
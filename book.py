@@ -0,0 +1,188 @@
+"""
+An opening book: a file of positions and the move to play in each, so the
+first plies of a game don't have to be searched at all.
+
+Every position is stored once, in whichever of its 8 symmetric forms (4
+rotations, each optionally mirrored) sorts first, so a book covers all the
+positions that are the same game up to symmetry. Records have a fixed size and
+are sorted, so lookups binary search a memory-mapped file. Many engine
+processes can share one copy of a book through the OS page cache.
+
+File format (all integers big-endian):
+	header:	8-byte magic "OTHBOOK1", width (2 bytes), number of records (4 bytes)
+	record:	player to move (1 byte), white tokens, black tokens (each a bitset of
+			width*width bits, padded to whole bytes), move square y*width + x
+			(2 bytes), score (2 bytes, signed)
+
+makebook.py builds books.
+"""
+import mmap
+import struct
+
+################################################################################
+# CONSTANTS
+################################################################################
+
+MAGIC = b"OTHBOOK1"
+HEADER = struct.Struct(">8sHI")
+VALUE = struct.Struct(">Hh")
+
+################################################################################
+# SYMMETRY
+################################################################################
+
+_permutation_cache = {}
+
+def get_permutations(width):
+	"""
+	Returns the 8 symmetries of a board as lists, where permutation[y*width + x]
+	is the square that (x, y) moves to.
+	"""
+	if width not in _permutation_cache:
+		n = width - 1
+		transforms = (
+			lambda x, y: (x, y),
+			lambda x, y: (n - y, x),
+			lambda x, y: (n - x, n - y),
+			lambda x, y: (y, n - x),
+			lambda x, y: (n - x, y),
+			lambda x, y: (x, n - y),
+			lambda x, y: (y, x),
+			lambda x, y: (n - y, n - x),
+		)
+		permutations = []
+		for transform in transforms:
+			permutation = []
+			for square in range(width * width):
+				x, y = transform(square % width, square // width)
+				permutation.append(y * width + x)
+			permutations.append(permutation)
+		_permutation_cache[width] = permutations
+	return _permutation_cache[width]
+
+def get_bitsets(board):
+	"""
+	Returns the (white, black) tokens on a 2D board as bitsets of square y*width + x.
+	"""
+	width = len(board)
+	bitsets = [0, 0, 0]
+	for y in range(width):
+		for x in range(width):
+			if board[y][x]:
+				bitsets[board[y][x]] |= 1 << (y * width + x)
+	return (bitsets[1], bitsets[2])
+
+def permute(bitset, permutation):
+	"""
+	Returns the bitset with every square moved according to the permutation.
+	"""
+	result = 0
+	while bitset:
+		low = bitset & -bitset
+		result |= 1 << permutation[low.bit_length() - 1]
+		bitset ^= low
+	return result
+
+def get_key(board, player):
+	"""
+	Returns (key, permutation) for a position: the record key of its
+	canonical form, and the permutation that takes the board to that form.
+	"""
+	width = len(board)
+	size = (width * width + 7) // 8
+	white, black = get_bitsets(board)
+
+	best = None
+	for permutation in get_permutations(width):
+		key = bytes([player]) + permute(white, permutation).to_bytes(size, "big") + permute(black, permutation).to_bytes(size, "big")
+		if best == None or key < best[0]:
+			best = (key, permutation)
+	return best
+
+################################################################################
+# READING
+################################################################################
+
+class OpeningBook:
+	"""
+	A memory-mapped, read-only opening book.
+
+	Attributes:
+		path:		the book file.
+		width:		the board width the book is for.
+		records:	the number of positions in the book.
+	"""
+	def __init__(self, path):
+		"""
+		Constructor, maps the book file at the given path into memory.
+		"""
+		self.path = path
+		with open(path, "rb") as f:
+			self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		magic, self.width, self.records = HEADER.unpack_from(self.data, 0)
+		assert magic == MAGIC, path + " is not an opening book!"
+		self.key_size = 1 + 2 * ((self.width * self.width + 7) // 8)
+		self.record_size = self.key_size + VALUE.size
+
+	def __len__(self):
+		"""
+		Returns the number of positions in the book.
+		"""
+		return self.records
+
+	def close(self):
+		"""
+		Unmaps the book file.
+		"""
+		self.data.close()
+
+	def _find(self, key):
+		"""
+		Binary searches for the key, and returns its (move square, score) in the
+		canonical orientation, or None.
+		"""
+		low, high = 0, self.records
+		while low < high:
+			middle = (low + high) // 2
+			offset = HEADER.size + middle * self.record_size
+			record_key = self.data[offset:offset + self.key_size]
+			if record_key < key:
+				low = middle + 1
+			elif record_key > key:
+				high = middle
+			else :
+				return VALUE.unpack_from(self.data, offset + self.key_size)
+		return None
+
+	def lookup(self, board, player):
+		"""
+		Returns the book's (x, y) location for the player on this board, or None
+		if the position isn't in the book.
+		"""
+		if len(board) != self.width:
+			return None
+
+		key, permutation = get_key(board, player)
+		found = self._find(key)
+		if found == None:
+			return None
+
+		# the stored move is in the canonical orientation, so undo the permutation
+		square = permutation.index(found[0])
+		return (square % self.width, square // self.width)
+
+################################################################################
+# WRITING
+################################################################################
+
+def write_book(path, width, entries):
+	"""
+	Writes a book file from a dict of record key to (move square, score), where
+	both the keys and moves are in canonical orientation.
+	"""
+	with open(path, "wb") as f:
+		f.write(HEADER.pack(MAGIC, width, len(entries)))
+		for key in sorted(entries):
+			move, score = entries[key]
+			f.write(key + VALUE.pack(move, max(-32768, min(32767, score))))
@@ -0,0 +1,257 @@
+"""
+An exact endgame solver. Once few enough squares are left empty, it's cheaper
+(and stronger) to search every line to the end of the game than to search a
+fixed number of plies and guess with evaluate().
+
+The solver works on any game state the Search does, plus get_empties(),
+try_move() and count_moves(). It keeps its own list of empty squares, so it
+never scans the full board for moves, and it orders moves fastest-first (fewest
+replies for the opponent) while many squares are left, then by region parity.
+
+Scores are final disc differences from the point of view of the player to move,
+the same as evaluate() at the end of a game, so solved positions can share the
+Search's transposition table.
+"""
+import time
+
+from search import CLOCK_CHECK_INTERVAL, INFINITY, SearchStats, SearchTimeout
+from transposition import EXACT, LOWER, UPPER, get_zobrist_keys
+
+EXACT_SCORE = "exact"
+WIN_LOSS_DRAW = "wld"
+MODES = (EXACT_SCORE, WIN_LOSS_DRAW)
+
+# below this many empties, ordering by the opponent's mobility costs more than it saves
+FASTEST_FIRST_EMPTIES = 7
+
+# below this many empties, the transposition table costs more than it saves
+TABLE_EMPTIES = 7
+
+# solved entries are stored this deep, so no depth-limited search replaces them
+SOLVED_DEPTH = 1000
+
+class EndgameSolver:
+	"""
+	Searches a position to the end of the game.
+
+	Attributes:
+		table:		a TranspositionTable to share with the Search, or None.
+		deadline:	a time.perf_counter() value after which the solver gives up by
+					raising SearchTimeout, or None for no limit.
+		stats:		a SearchStats for the last solve.
+	"""
+	def __init__(self, table=None):
+		"""
+		Constructor, takes the transposition table to use.
+		"""
+		self.table = table
+		self.deadline = None
+		self.stats = SearchStats()
+		self.regions = {}
+
+	def get_best_move(self, state, player, mode=EXACT_SCORE):
+		"""
+		Returns the best (x, y) location for the player, or None if he has no moves.
+		"""
+		move = self.solve(state, player, mode)[0]
+		if move is None:
+			return None
+		return state.get_location(move)
+
+	def solve(self, state, player, mode=EXACT_SCORE):
+		"""
+		Returns (best move, score) for the player, with the move in the form
+		get_moves() uses (None if he has to pass). In exact mode the score is the
+		final disc difference with perfect play. In win/loss/draw mode it's only
+		1, 0 or -1, which is much quicker to prove.
+		"""
+		assert mode in MODES, "Unknown endgame mode: " + str(mode)
+
+		start = time.perf_counter()
+		self.stats = SearchStats()
+		empties = state.get_empties()
+		self.stats.depth = len(empties)
+
+		if mode == EXACT_SCORE:
+			a, b = -INFINITY, INFINITY
+		else :
+			a, b = -1, 1
+
+		best_move = None
+		best = -INFINITY
+		for move in self._order_moves(state, player, empties):
+			undo = state.make_move(move, player)
+			empties.remove(move)
+			value = -self._solve(state, 3 - player, empties, -b, -a, False, 1)
+			empties.append(move)
+			state.unmake_move(move, player, undo)
+
+			if value > best:
+				best = value
+				best_move = move
+			if value > a:
+				a = value
+				if a >= b:
+					break
+
+		if best_move is None:
+			# no moves: the score is whatever happens after passing
+			best = -self._solve(state, 3 - player, empties, -b, -a, True, 1)
+
+		if mode == WIN_LOSS_DRAW:
+			best = (best > 0) - (best < 0)
+
+		self.stats.seconds = time.perf_counter() - start
+		self.stats.iterations.append((self.stats.depth, self.stats.nodes, self.stats.seconds))
+		return (best_move, best)
+
+	def stop(self):
+		"""
+		Makes the solver give up at its next clock check. Meant to be called from
+		another thread.
+		"""
+		self.deadline = 0.0
+
+	def _get_region(self, state, move):
+		"""
+		Returns which quarter of the board a move is in.
+		"""
+		region = self.regions.get(move)
+		if region is None:
+			x, y = state.get_location(move)
+			half = state.width // 2
+			region = (x >= half) + 2 * (y >= half)
+			self.regions[move] = region
+		return region
+
+	def _order_moves(self, state, player, empties):
+		"""
+		Returns the player's legal moves among the empties, best guesses first.
+		With many empties, that's the moves that leave the opponent the fewest
+		replies. With few, it's moves in regions with an odd number of empties,
+		since whoever moves last in a region tends to win it.
+		"""
+		opponent = 3 - player
+		if len(empties) >= FASTEST_FIRST_EMPTIES:
+			scored = []
+			for move in empties:
+				undo = state.try_move(move, player)
+				if undo is not None:
+					scored.append((state.count_moves(opponent), move))
+					state.unmake_move(move, player, undo)
+			scored.sort(key=lambda pair: pair[0])
+			return [move for _, move in scored]
+
+		counts = [0, 0, 0, 0]
+		for move in empties:
+			counts[self._get_region(state, move)] += 1
+		moves = []
+		for move in sorted(empties, key=lambda move: counts[self._get_region(state, move)] % 2 == 0):
+			undo = state.try_move(move, player)
+			if undo is not None:
+				moves.append(move)
+				state.unmake_move(move, player, undo)
+		return moves
+
+	def _solve(self, state, player, empties, a, b, passed, ply):
+		"""
+		Returns the final disc difference for the player to move with perfect play,
+		or a bound on it outside the window (a, b). passed is True if the other
+		player just had to pass.
+		"""
+		stats = self.stats
+		stats.nodes += 1
+		if ply > stats.max_ply:
+			stats.max_ply = ply
+		if self.deadline is not None and not stats.nodes % CLOCK_CHECK_INTERVAL:
+			if time.perf_counter() >= self.deadline:
+				raise SearchTimeout()
+
+		if not empties:
+			stats.leaves += 1
+			return state.evaluate(player)
+
+		table = self.table if len(empties) >= TABLE_EMPTIES else None
+		if table is not None:
+			key = state.key
+			if player == 2:
+				key ^= get_zobrist_keys(state.width)[1]
+			entry = table.probe(key)
+			if entry is not None and entry[1] >= SOLVED_DEPTH:
+				value, bound = entry[2], entry[3]
+				if bound == EXACT:
+					return value
+				if bound == LOWER and value >= b:
+					return value
+				if bound == UPPER and value <= a:
+					return value
+
+		a_original = a
+		best = -INFINITY
+		best_move = None
+
+		if len(empties) >= FASTEST_FIRST_EMPTIES:
+			moves = self._order_moves(state, player, empties)
+			for move in moves:
+				undo = state.make_move(move, player)
+				index = empties.index(move)
+				del empties[index]
+				value = -self._solve(state, 3 - player, empties, -b, -a, False, ply + 1)
+				empties.insert(index, move)
+				state.unmake_move(move, player, undo)
+
+				if value > best:
+					best = value
+					best_move = move
+				if value > a:
+					a = value
+					if a >= b:
+						stats.cutoffs += 1
+						if move == moves[0]:
+							stats.first_move_cutoffs += 1
+						break
+		else :
+			# few empties: try each one in parity order, and skip the ones that flip nothing
+			counts = [0, 0, 0, 0]
+			for move in empties:
+				counts[self._get_region(state, move)] += 1
+			first = True
+			for move in sorted(empties, key=lambda move: counts[self._get_region(state, move)] % 2 == 0):
+				undo = state.try_move(move, player)
+				if undo is None:
+					continue
+				index = empties.index(move)
+				del empties[index]
+				value = -self._solve(state, 3 - player, empties, -b, -a, False, ply + 1)
+				empties.insert(index, move)
+				state.unmake_move(move, player, undo)
+
+				if value > best:
+					best = value
+					best_move = move
+				if value > a:
+					a = value
+					if a >= b:
+						stats.cutoffs += 1
+						if first:
+							stats.first_move_cutoffs += 1
+						break
+				first = False
+
+		if best_move is None:
+			if passed:
+				# neither player can move, so the game is over
+				stats.leaves += 1
+				return state.evaluate(player)
+			return -self._solve(state, 3 - player, empties, -b, -a, True, ply + 1)
+
+		if table is not None:
+			if best <= a_original:
+				bound = UPPER
+			elif best >= b:
+				bound = LOWER
+			else :
+				bound = EXACT
+			table.store(key, SOLVED_DEPTH, best, bound, best_move)
+
+		return best
@@ -0,0 +1,419 @@
+"""
+A long-lived engine process, driven by a line-based text protocol on stdin and
+stdout. Unlike a ComputerPlayer made fresh for every game, an engine keeps its
+transposition table and move ordering history between moves (and games), so a
+host can keep a pool of warm engines and send each request to one of them.
+
+	python3 engine.py [-b book.bin] [-e endgame empties] [-m table entries] [-s seed]
+
+Commands, one per line:
+	position startpos [width <w>] [moves <x,y> ...]
+	position board <cells> <player> [moves <x,y> ...]
+				sets the position, either the start of a game or a board given as
+				width*width digits (0 empty, 1 white, 2 black) row by row, with the
+				player to move. Moves are then played from it, passing if need be.
+	go [depth <plies>] [time <ms>]
+				searches the position, deepening until either limit (or the end of
+				the game). Replies "bestmove x,y", or "bestmove none" if the player to
+				move has to pass. The search runs in the background, so stop works.
+	stop		makes the search in progress reply at once with its best move so far.
+	stats		replies "stats " and a JSON object of the last search's stats, plus
+				the transposition table's.
+	newgame		forgets the position's history (but not the table).
+	clear		empties the transposition table and move ordering history.
+	isready		replies "readyok" once any search in progress has replied.
+	quit		exits.
+
+Anything that goes wrong replies "error " and a message. EngineClient runs an
+engine as a subprocess, and has the same pick_move() as a ComputerPlayer.
+"""
+import json
+import subprocess
+import sys
+import threading
+import time
+
+from book import OpeningBook
+from endgame import EXACT_SCORE, EndgameSolver
+from othelloplayer import DEFAULT_ENDGAME_EMPTIES, DEFAULT_TABLE_ENTRIES, ENDGAME_TIME_SHARE, make_othello
+from search import Search, SearchStats, SearchTimeout
+from transposition import TranspositionTable
+
+################################################################################
+# CONSTANTS
+################################################################################
+
+DEFAULT_DEPTH = 6
+DEFAULT_WIDTH = 8
+
+################################################################################
+# ENGINE
+################################################################################
+
+class Engine:
+	"""
+	The engine behind the protocol: a position, and everything that should stay
+	warm between searches of it.
+
+	Attributes:
+		table:				the transposition table, kept for the life of the engine.
+		search:				the Search, kept so its killer and history tables stay warm
+							(until the board width changes).
+		book:				an OpeningBook to play from, or None.
+		endgame_empties:	with this many empty squares or fewer, positions are solved, as
+							long as a time limit bounds the solver or the depth asked for
+							reaches the end of the game anyway.
+		state:				the current position (a game state from make_othello()).
+		player:				the player to move in it.
+		stats:				the SearchStats of the last go.
+		output:				where replies are written.
+	"""
+	def __init__(self, output = sys.stdout, table_entries = DEFAULT_TABLE_ENTRIES, book = None, endgame_empties = DEFAULT_ENDGAME_EMPTIES, seed = None):
+		"""
+		Constructor, takes where to write replies, the transposition table size, an
+		opening book (or the path to one), when to start solving the endgame, and a
+		seed for tie-breaks.
+		"""
+		self.output = output
+		self.table = TranspositionTable(table_entries)
+		self.search = Search(self.table, seed=seed)
+		self.seed = seed
+		if isinstance(book, str):
+			book = OpeningBook(book)
+		self.book = book
+		self.endgame_empties = endgame_empties
+
+		self.state = make_othello(None, DEFAULT_WIDTH)
+		self.player = 2
+		self.stats = SearchStats()
+
+		self.current_search = None
+		self.stopped = False
+		self.searching = False
+		self.thread = None
+		self.output_lock = threading.Lock()
+
+	def reply(self, line):
+		"""
+		Writes one line of reply, and flushes it so the host sees it at once.
+		"""
+		with self.output_lock:
+			print(line, file=self.output, flush=True)
+
+	def handle(self, line):
+		"""
+		Carries out one command line. Returns False once told to quit.
+		"""
+		words = line.split()
+		if not words:
+			return True
+		command, args = words[0], words[1:]
+
+		if command == "quit":
+			self.stop()
+			return False
+
+		try:
+			if command == "stop":
+				self.stop()
+			elif command == "isready":
+				self.wait()
+				self.reply("readyok")
+			elif command in ("position", "go", "newgame", "clear"):
+				if self.is_busy():
+					self.reply("error busy: stop the search first")
+					return True
+				# the last search has replied, but its thread may not quite have finished
+				self.wait()
+				if command == "position":
+					self.set_position(args)
+				elif command == "go":
+					self.go(args)
+				elif command == "newgame":
+					self.state = make_othello(None, self.state.width)
+					self.player = 2
+				else :
+					self.table.clear()
+					self.search = Search(self.table, seed=self.seed)
+			elif command == "stats":
+				stats = self.stats.to_dict()
+				stats["table"] = self.table.get_stats()
+				self.reply("stats " + json.dumps(stats))
+			else :
+				self.reply("error unknown command: " + command)
+		except (ValueError, IndexError, AssertionError) as exception:
+			self.reply("error " + (str(exception) or "bad arguments") + ": " + line.strip())
+		return True
+
+	def set_position(self, args):
+		"""
+		The position command.
+		"""
+		if "moves" in args:
+			moves = args[args.index("moves") + 1:]
+			args = args[:args.index("moves")]
+		else :
+			moves = []
+
+		if args[0] == "startpos":
+			width = int(args[args.index("width") + 1]) if "width" in args else DEFAULT_WIDTH
+			assert width >= 4 and width % 2 == 0, "bad width"
+			state = make_othello(None, width)
+			player = 2
+		elif args[0] == "board":
+			cells = args[1]
+			width = int(len(cells) ** 0.5)
+			assert width * width == len(cells) and width >= 4 and width % 2 == 0, "bad board"
+			assert set(cells) <= set("012"), "bad board"
+			state = make_othello([[int(cell) for cell in cells[y * width:(y + 1) * width]] for y in range(width)])
+			player = int(args[2])
+			assert player in (1, 2), "bad player"
+		else :
+			raise ValueError("bad position")
+
+		for move in moves:
+			location = tuple(int(value) for value in move.split(","))
+			if not state.get_moves(player):
+				# the player to move has to pass
+				player = 3 - player
+			assert location in state._get_available_moves(player), "illegal move " + move
+			state.play_move(location, player)
+			player = 3 - player
+
+		if state.width != self.state.width:
+			# the search's square priorities, killers and history are by square index,
+			# which means a different square on a board of another width
+			self.search = Search(self.table, seed=self.seed)
+		self.state = state
+		self.player = player
+
+	def go(self, args):
+		"""
+		The go command: starts the search on a background thread.
+		"""
+		depth = int(args[args.index("depth") + 1]) if "depth" in args else None
+		time_ms = int(args[args.index("time") + 1]) if "time" in args else None
+		if depth == None and time_ms == None:
+			depth = DEFAULT_DEPTH
+		assert depth == None or depth > 0, "bad depth"
+		assert time_ms == None or time_ms > 0, "bad time"
+
+		self.stopped = False
+		self.searching = True
+		self.thread = threading.Thread(target=self._go, args=(self.state.copy(), self.player, depth, time_ms), daemon=True)
+		self.thread.start()
+
+	def _go(self, state, player, depth, time_ms):
+		"""
+		The search thread: finds a move and replies with it.
+		"""
+		try:
+			location = self._pick_move(state, player, depth, time_ms)
+			reply = "bestmove " + ("none" if location == None else str(location[0]) + "," + str(location[1]))
+		except Exception as exception:
+			reply = "error " + repr(exception)
+
+		# the host may send its next command the moment it sees the reply
+		self.searching = False
+		self.reply(reply)
+
+	def _pick_move(self, state, player, depth, time_ms):
+		"""
+		Returns the (x, y) location to play: from the book, the endgame solver, or
+		an iteratively deepened search, like ComputerPlayer.pick_move.
+		"""
+		start = time.perf_counter()
+		moves = state.get_moves(player)
+		if not moves:
+			self.stats = SearchStats()
+			return None
+
+		if self.book != None:
+			location = self.book.lookup(state.board, player)
+			if location != None and location in state._get_available_moves(player):
+				self.stats = SearchStats()
+				self.stats.from_book = True
+				return location
+
+		empties = state.get_state_value(0)
+		if empties <= self.endgame_empties and (time_ms != None or empties <= depth):
+			solver = self._start(EndgameSolver(self.table))
+			if time_ms != None and solver.deadline == None:
+				solver.deadline = start + ENDGAME_TIME_SHARE * time_ms / 1000
+			try:
+				location = solver.get_best_move(state.copy(), player, EXACT_SCORE)
+				self.stats = solver.stats
+				return location
+			except SearchTimeout:
+				pass
+
+		if time_ms != None:
+			time_ms = max(1, time_ms - 1000 * (time.perf_counter() - start))
+		# a stop() that came too late for the last search may have left a deadline
+		self.search.deadline = None
+		search = self._start(self.search)
+		try:
+			location = search.iterative_deepening(state, player, depth, time_ms)
+		except SearchTimeout:
+			# stopped before even the 1-ply search finished
+			location = state.get_location(search._order_moves(state, moves, None, 0)[0])
+		finally:
+			search.deadline = None
+		self.stats = search.stats
+		return location
+
+	def _start(self, search):
+		"""
+		Makes the Search or EndgameSolver the one stop() stops, and returns it.
+		"""
+		self.current_search = search
+		if self.stopped:
+			search.stop()
+		return search
+
+	def is_busy(self):
+		"""
+		Returns whether a search is in progress and hasn't replied yet.
+		"""
+		return self.searching
+
+	def stop(self):
+		"""
+		Stops any search in progress, and waits for it to reply.
+		"""
+		if not self.is_busy():
+			return
+		self.stopped = True
+		search = self.current_search
+		if search != None:
+			search.stop()
+		self.wait()
+
+	def wait(self):
+		"""
+		Waits for any search in progress to reply, and its thread to finish.
+		"""
+		if self.thread != None:
+			self.thread.join()
+			self.thread = None
+
+	def run(self, input = sys.stdin):
+		"""
+		Reads and carries out commands until told to quit, or the input ends.
+		"""
+		for line in input:
+			if not self.handle(line):
+				break
+		self.wait()
+
+################################################################################
+# CLIENT
+################################################################################
+
+class EngineClient:
+	"""
+	Runs an engine process and talks to it, with the same pick_move() as a
+	ComputerPlayer, so a host can hand a game to a warm engine.
+
+	Attributes:
+		player_ID:			the player this client picks moves for, 1 or 2.
+		difficulty_level:	the depth limit to send with go, or None.
+		time_ms:			the time limit to send with go, or None.
+		process:			the engine's subprocess.Popen.
+	"""
+	def __init__(self, player_ID, difficulty_level = None, time_ms = None, args = ()):
+		"""
+		Constructor, takes the player, the depth and time limits to search with,
+		and any command-line arguments for the engine. Starts the engine.
+		"""
+		assert (player_ID == 1 or player_ID == 2), "The player must be set to 1 or 2!"
+		self.player_ID = player_ID
+		self.difficulty_level = difficulty_level
+		self.time_ms = time_ms
+		self.process = subprocess.Popen([sys.executable, __file__] + list(args), stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+
+	def send(self, line):
+		"""
+		Sends one command line to the engine.
+		"""
+		self.process.stdin.write(line + "\n")
+		self.process.stdin.flush()
+
+	def read_reply(self, prefix):
+		"""
+		Returns the rest of the next reply line starting with prefix. Raises
+		RuntimeError on an error reply, or if the engine has gone away.
+		"""
+		while True:
+			line = self.process.stdout.readline()
+			if not line:
+				raise RuntimeError("the engine exited")
+			line = line.rstrip("\n")
+			if line.startswith("error"):
+				raise RuntimeError(line)
+			if line.startswith(prefix):
+				return line[len(prefix):].strip()
+
+	def pick_move(self, board):
+		"""
+		Returns the engine's (x, y) location for this player on the board, or None
+		if he has to pass.
+		"""
+		cells = "".join(str(cell) for row in board for cell in row)
+		self.send("position board " + cells + " " + str(self.player_ID))
+
+		command = "go"
+		if self.difficulty_level != None: command += " depth " + str(self.difficulty_level)
+		if self.time_ms != None: command += " time " + str(self.time_ms)
+		self.send(command)
+
+		move = self.read_reply("bestmove")
+		if move == "none":
+			return None
+		return tuple(int(value) for value in move.split(","))
+
+	def get_stats(self):
+		"""
+		Returns the engine's stats for the last move, as a dict.
+		"""
+		self.send("stats")
+		return json.loads(self.read_reply("stats"))
+
+	def close(self):
+		"""
+		Tells the engine to quit, and waits for it.
+		"""
+		if self.process.poll() == None:
+			self.send("quit")
+			self.process.stdin.close()
+			self.process.wait()
+
+################################################################################
+# COMMAND LINE
+################################################################################
+
+def print_help(output = sys.stderr):
+	"""
+	Print out a help screen for the user (probably to stderr).
+	"""
+	print("Usage: python3 " +sys.argv[0]+ " <options>", file=output)
+	print("Options include:", file=output)
+	print("\t-b\tplay from this opening book", file=output)
+	print("\t-e\tsolve the endgame from this many empty squares (default " +str(DEFAULT_ENDGAME_EMPTIES)+ ")", file=output)
+	print("\t-h\tprint this help", file=output)
+	print("\t-m\ttransposition table entries (default " +str(DEFAULT_TABLE_ENTRIES)+ ")", file=output)
+	print("\t-s\trandom seed for tie-breaks", file=output)
+	print("The protocol is described at the top of " +sys.argv[0]+ ".", file=output)
+
+if __name__ == "__main__":
+	args = sys.argv[1:]
+	if "-h" in args or "--help" in args:
+		print_help()
+		sys.exit(1)
+
+	book = args[args.index("-b") + 1] if "-b" in args else None
+	endgame_empties = int(args[args.index("-e") + 1]) if "-e" in args else DEFAULT_ENDGAME_EMPTIES
+	table_entries = int(args[args.index("-m") + 1]) if "-m" in args else DEFAULT_TABLE_ENTRIES
+	seed = int(args[args.index("-s") + 1]) if "-s" in args else None
+
+	Engine(sys.stdout, table_entries, book, endgame_empties, seed).run(sys.stdin)
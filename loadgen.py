@@ -0,0 +1,172 @@
+"""
+A load generator for server.py: many concurrent clients asking for moves,
+reporting throughput and latency percentiles.
+
+	python3 server.py -j 4 &
+	python3 loadgen.py -n 2000 -c 32 -u 200
+
+Each client keeps one connection open and sends its requests one after the
+other. The positions are drawn from a pool of -u distinct random positions, so
+a smaller pool means more repeats for the server's cache and coalescing to
+absorb. Requests the server turns away (503) are counted, not retried.
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+
+from batch import make_positions
+from server import DEFAULT_DEPTH, DEFAULT_HOST, DEFAULT_PORT
+from tournament import get_percentile
+
+################################################################################
+# CONSTANTS
+################################################################################
+
+DEFAULT_REQUESTS = 1000
+DEFAULT_CLIENTS = 16
+DEFAULT_POSITIONS = 100
+DEFAULT_WIDTH = 8
+
+################################################################################
+# CLIENT
+################################################################################
+
+async def request(reader, writer, method, path, payload = None):
+	"""
+	Sends one request on an open connection, and returns (status, decoded JSON body).
+	"""
+	body = b"" if payload == None else json.dumps(payload).encode()
+	head = method + " " + path + " HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\nContent-Length: " + str(len(body)) + "\r\n\r\n"
+	writer.write(head.encode("latin-1") + body)
+	await writer.drain()
+
+	status = int((await reader.readline()).split()[1])
+	length = 0
+	while True:
+		line = await reader.readline()
+		if line in (b"\r\n", b"\n", b""):
+			break
+		name, _, value = line.decode("latin-1").partition(":")
+		if name.strip().lower() == "content-length":
+			length = int(value)
+	return (status, json.loads(await reader.readexactly(length)))
+
+async def run_client(host, port, jobs, latencies, statuses):
+	"""
+	Takes request payloads from the jobs list until it's empty, recording each
+	one's latency and status.
+	"""
+	reader, writer = await asyncio.open_connection(host, port)
+	try:
+		while jobs:
+			payload = jobs.pop()
+			start = time.perf_counter()
+			status, _ = await request(reader, writer, "POST", "/move", payload)
+			latencies.append(time.perf_counter() - start)
+			statuses[status] = statuses.get(status, 0) + 1
+	finally:
+		writer.close()
+
+async def run_load(host = DEFAULT_HOST, port = DEFAULT_PORT, requests = DEFAULT_REQUESTS, clients = DEFAULT_CLIENTS,
+		positions = DEFAULT_POSITIONS, depth = DEFAULT_DEPTH, time_ms = None, width = DEFAULT_WIDTH, seed = 0):
+	"""
+	Sends the requests from the given number of concurrent clients, and returns a
+	dict of summary statistics, including the server's own counters afterwards.
+	"""
+	rng = random.Random(seed)
+	boards, players = make_positions(positions, width, width * width - 4, seed)
+	pool = list(zip(boards, players))
+	jobs = []
+	for _ in range(requests):
+		board, player = rng.choice(pool)
+		payload = {"board": board, "player": player, "depth": depth}
+		if time_ms != None:
+			payload["time_ms"] = time_ms
+		jobs.append(payload)
+
+	latencies = []
+	statuses = {}
+	start = time.perf_counter()
+	await asyncio.gather(*[run_client(host, port, jobs, latencies, statuses) for _ in range(clients)])
+	seconds = time.perf_counter() - start
+
+	reader, writer = await asyncio.open_connection(host, port)
+	try:
+		server_stats = (await request(reader, writer, "GET", "/stats"))[1]
+	finally:
+		writer.close()
+
+	latencies.sort()
+	return {
+		"requests": requests,
+		"clients": clients,
+		"positions": positions,
+		"seconds": seconds,
+		"ok": statuses.get(200, 0),
+		"rejected": statuses.get(503, 0),
+		"failed": requests - statuses.get(200, 0) - statuses.get(503, 0),
+		"throughput": statuses.get(200, 0) / seconds if seconds else 0.0,
+		"p50_ms": get_percentile(latencies, 50) * 1000,
+		"p90_ms": get_percentile(latencies, 90) * 1000,
+		"p99_ms": get_percentile(latencies, 99) * 1000,
+		"max_ms": latencies[-1] * 1000 if latencies else 0.0,
+		"server": server_stats,
+	}
+
+def print_summary(summary, output = sys.stdout):
+	"""
+	Prints the statistics from run_load() in a readable form.
+	"""
+	print("%d requests from %d clients over %d positions in %.2fs" % (
+		summary["requests"], summary["clients"], summary["positions"], summary["seconds"]), file=output)
+	print("ok: %d, rejected: %d, failed: %d, throughput: %.1f moves/s" % (
+		summary["ok"], summary["rejected"], summary["failed"], summary["throughput"]), file=output)
+	print("latency p50: %.1fms, p90: %.1fms, p99: %.1fms, max: %.1fms" % (
+		summary["p50_ms"], summary["p90_ms"], summary["p99_ms"], summary["max_ms"]), file=output)
+	print("server: " + json.dumps(summary["server"], sort_keys=True), file=output)
+
+################################################################################
+# COMMAND LINE
+################################################################################
+
+def print_help(output = sys.stderr):
+	"""
+	Print out a help screen for the user (probably to stderr).
+	"""
+	print("Usage: python3 " +sys.argv[0]+ " <options>", file=output)
+	print("Options include:", file=output)
+	print("\t-c\tconcurrent clients (default " +str(DEFAULT_CLIENTS)+ ")", file=output)
+	print("\t-d\tsearch depth to ask for (default " +str(DEFAULT_DEPTH)+ ")", file=output)
+	print("\t-h\tprint this help", file=output)
+	print("\t-H\tserver host (default " +DEFAULT_HOST+ ")", file=output)
+	print("\t-j\tprint the statistics as JSON", file=output)
+	print("\t-n\tnumber of requests (default " +str(DEFAULT_REQUESTS)+ ")", file=output)
+	print("\t-p\tserver port (default " +str(DEFAULT_PORT)+ ")", file=output)
+	print("\t-s\trandom seed (default 0)", file=output)
+	print("\t-t\tsearch time limit to ask for, in milliseconds (default none)", file=output)
+	print("\t-u\tnumber of distinct positions (default " +str(DEFAULT_POSITIONS)+ ")", file=output)
+	print("\t-w\tboard width (default " +str(DEFAULT_WIDTH)+ ")", file=output)
+
+if __name__ == "__main__":
+	args = sys.argv[1:]
+	if "-h" in args or "--help" in args:
+		print_help()
+		sys.exit(1)
+
+	host = args[args.index("-H") + 1] if "-H" in args else DEFAULT_HOST
+	port = int(args[args.index("-p") + 1]) if "-p" in args else DEFAULT_PORT
+	requests = int(args[args.index("-n") + 1]) if "-n" in args else DEFAULT_REQUESTS
+	clients = int(args[args.index("-c") + 1]) if "-c" in args else DEFAULT_CLIENTS
+	positions = int(args[args.index("-u") + 1]) if "-u" in args else DEFAULT_POSITIONS
+	depth = int(args[args.index("-d") + 1]) if "-d" in args else DEFAULT_DEPTH
+	time_ms = int(args[args.index("-t") + 1]) if "-t" in args else None
+	width = int(args[args.index("-w") + 1]) if "-w" in args else DEFAULT_WIDTH
+	seed = int(args[args.index("-s") + 1]) if "-s" in args else 0
+
+	summary = asyncio.run(run_load(host, port, requests, clients, positions, depth, time_ms, width, seed))
+	if "-j" in args:
+		print(json.dumps(summary, indent=2, sort_keys=True))
+	else :
+		print_summary(summary)
@@ -0,0 +1,205 @@
+"""
+Builds opening books (see book.py) in one of two ways. Searching every position
+a few plies from the start:
+
+	python3 makebook.py -o book.bin -p 6 -d 8
+
+or from self-play games that start with a few random moves:
+
+	python3 makebook.py -o book.bin -p 10 -g 2000 -r 4 -l 4
+
+or from games already saved in a game record file (see records.py):
+
+	python3 makebook.py -o book.bin -p 10 -i games.bin
+
+Either way, positions that are the same up to symmetry are only counted once.
+"""
+import random
+import sys
+
+from book import get_key, write_book
+from othelloplayer import ComputerPlayer, make_othello
+from records import read_games
+from search import INFINITY, Search
+from transposition import TranspositionTable
+
+################################################################################
+# CONSTANTS
+################################################################################
+
+DEFAULT_PLIES = 6
+DEFAULT_DEPTH = 6
+DEFAULT_LEVEL = 4
+DEFAULT_RANDOM_PLIES = 4
+
+# a self-play move needs this many games behind it to make the book
+MIN_GAMES = 2
+
+################################################################################
+# BUILDING
+################################################################################
+
+def add_entry(entries, board, player, location, score):
+	"""
+	Adds a position and its move to the entries dict, in canonical orientation.
+	"""
+	key, permutation = get_key(board, player)
+	entries[key] = (permutation[location[1] * len(board) + location[0]], score)
+
+def search_position(table, state, player, depth):
+	"""
+	Returns the move and score of a search of the given depth, for a player with
+	at least one move. The score is the best score of the deepest iteration that
+	finished, or for a forced move (which iterative deepening doesn't search),
+	the value of the position searched to the same depth.
+	"""
+	search = Search(table, seed=0)
+	location = search.iterative_deepening(state, player, depth)
+	score = search.depth_scores.get(search.stats.depth)
+	if score is None:
+		score = search.negamax(state.copy(), player, depth, -INFINITY, INFINITY)
+	return (location, score)
+
+def build_from_search(width = 8, plies = DEFAULT_PLIES, depth = DEFAULT_DEPTH, output = None):
+	"""
+	Returns book entries for every position up to the given number of plies from
+	the start, each with the move and score of a search of the given depth.
+	Positions that are the same up to symmetry are only searched once.
+	"""
+	entries = {}
+	table = TranspositionTable()
+	frontier = [(make_othello(None, width), 2)]
+
+	for ply in range(plies):
+		next_frontier = []
+		for state, player in frontier:
+			board = state.board
+			key = get_key(board, player)[0]
+			if key in entries:
+				continue
+
+			moves = state.get_moves(player)
+			if not moves:
+				if state.get_moves(3 - player):
+					next_frontier.append((state, 3 - player))
+				continue
+
+			location, score = search_position(table, state, player, depth)
+			add_entry(entries, board, player, location, score)
+
+			for move in moves:
+				child = state.copy()
+				child.make_move(move, player)
+				next_frontier.append((child, 3 - player))
+
+		frontier = next_frontier
+		if output != None:
+			print("ply " + str(ply + 1) + ": " + str(len(entries)) + " positions", file=output)
+
+	return entries
+
+def build_from_games(games, width = 8, plies = DEFAULT_PLIES, min_games = MIN_GAMES):
+	"""
+	Returns book entries from finished games, any iterable of (moves, winner)
+	pairs. For every position in the first plies of the games, the book move is
+	the one whose games went best for the player who made it. The score is the
+	net number of games won with it.
+	"""
+	results = {}
+	for moves, winner in games:
+		game = make_othello(None, width)
+		player = 2
+		for ply, move in enumerate(moves[:plies]):
+			if not game.get_flipped(move, player):
+				player = 3 - player
+			key, permutation = get_key(game.board, player)
+			canonical_move = permutation[move[1] * width + move[0]]
+			counts = results.setdefault(key, {}).setdefault(canonical_move, [0, 0])
+			counts[0] += 1
+			counts[1] += 1 if winner == player else -1 if winner == 3 - player else 0
+			game.play_move(move, player)
+			player = 3 - player
+
+	entries = {}
+	for key, moves in results.items():
+		candidates = [(net / played, net, move) for move, (played, net) in moves.items() if played >= min_games]
+		if candidates:
+			_, net, move = max(candidates)
+			entries[key] = (move, net)
+	return entries
+
+def play_self_play_games(games, width = 8, level = DEFAULT_LEVEL, random_plies = DEFAULT_RANDOM_PLIES, seed = 0):
+	"""
+	Returns (moves, winner) for the given number of games between two
+	ComputerPlayers, each starting with a few random moves so the games differ.
+	"""
+	rng = random.Random(seed)
+	players = (None, ComputerPlayer(1, level, seed=seed, endgame_empties=0), ComputerPlayer(2, level, seed=seed + 1, endgame_empties=0))
+	results = []
+	for _ in range(games):
+		game = make_othello(None, width)
+		moves = []
+		player = 2
+		while True:
+			locations = game._get_available_moves(player)
+			if not locations:
+				if not game._get_available_moves(3 - player):
+					break
+				player = 3 - player
+				continue
+			if len(moves) < random_plies:
+				move = rng.choice(locations)
+			else :
+				move = players[player].pick_move(game.board)
+			game.play_move(move, player)
+			moves.append(move)
+			player = 3 - player
+
+		white, black = game.get_state_value(1), game.get_state_value(2)
+		results.append((moves, 1 if white > black else 2 if black > white else 0))
+	return results
+
+################################################################################
+# COMMAND LINE
+################################################################################
+
+def print_help(output = sys.stderr):
+	"""
+	Print out a help screen for the user (probably to stderr).
+	"""
+	print("Usage: python3 " +sys.argv[0]+ " -o <book file> <options>", file=output)
+	print("Options include:", file=output)
+	print("\t-d\tsearch depth for each position (default " +str(DEFAULT_DEPTH)+ ")", file=output)
+	print("\t-g\tbuild from this many self-play games instead of searches", file=output)
+	print("\t-h\tprint this help", file=output)
+	print("\t-i\tbuild from the games in this game record file instead of searches", file=output)
+	print("\t-l\tAI level for self-play (default " +str(DEFAULT_LEVEL)+ ")", file=output)
+	print("\t-o\tthe book file to write", file=output)
+	print("\t-p\tplies from the start to cover (default " +str(DEFAULT_PLIES)+ ")", file=output)
+	print("\t-r\trandom plies to start each self-play game (default " +str(DEFAULT_RANDOM_PLIES)+ ")", file=output)
+	print("\t-w\tboard width (default 8)", file=output)
+
+if __name__ == "__main__":
+	args = sys.argv[1:]
+	if "-h" in args or "--help" in args or "-o" not in args:
+		print_help()
+		sys.exit(1)
+
+	path = args[args.index("-o") + 1]
+	width = int(args[args.index("-w") + 1]) if "-w" in args else 8
+	plies = int(args[args.index("-p") + 1]) if "-p" in args else DEFAULT_PLIES
+
+	if "-g" in args:
+		level = int(args[args.index("-l") + 1]) if "-l" in args else DEFAULT_LEVEL
+		random_plies = int(args[args.index("-r") + 1]) if "-r" in args else DEFAULT_RANDOM_PLIES
+		games = play_self_play_games(int(args[args.index("-g") + 1]), width, level, random_plies)
+		entries = build_from_games(games, width, plies)
+	elif "-i" in args:
+		games = ((record.moves, record.get_winner()) for record in read_games(args[args.index("-i") + 1]) if record.width == width)
+		entries = build_from_games(games, width, plies)
+	else :
+		depth = int(args[args.index("-d") + 1]) if "-d" in args else DEFAULT_DEPTH
+		entries = build_from_search(width, plies, depth, sys.stderr)
+
+	write_book(path, width, entries)
+	print("wrote " + str(len(entries)) + " positions to " + path, file=sys.stderr)
@@ -22,7 +22,10 @@ __license__ = "MIT"
 __date__ = "May 2018"
 
 import sys
+import queue
 import random
+import importlib
+import threading
 from functools import partial
 
 ################################################################################
@@ -37,6 +40,7 @@ SQUARE_SIZE = 75
 DEFAULT_AI_LEVEL = 4
 DEFAULT_AI_FILE = "othelloplayer"
 PLAYERS = {1: "White", 2: "Black"}
+POLL_MS = 20 # how often to check whether the AI has picked its move
 
 HALF_SQUARE = SQUARE_SIZE // 2
 
@@ -47,14 +51,27 @@ class HumanPlayer:
 # APPLICATION CLASS & GRAPHICS STUFF
 ################################################################################
 
-# Does tkinter even exist on this computer? If not, don't do graphics.
-try:
+# the App class, once get_app_class() has made it
+_app_class = None
+
+# images already drawn with PIL, by (what, color, SQUARE_SIZE)
+_image_cache = {}
+
+def get_app_class():
+	"""
+	Returns the App class. tkinter and PIL are only imported (and the class only
+	defined) the first time it's asked for, so headless games never load them.
+	Raises ImportError if either is missing.
+	"""
+	global _app_class
+	if _app_class != None:
+		return _app_class
+
 	import tkinter as tk
 	from PIL import Image, ImageDraw, ImageTk
-	do_graphics = True
 
 	class App(tk.Tk):
-		def __init__(self, players = None, player_colors = None, grid_size = 8):
+		def __init__(self, players = None, player_colors = None, grid_size = 8, hint_player = None):
 			tk.Tk.__init__(self)
 			self.title("Othello")
 			self.configure(bg=BACKGROUND_COLOR)
@@ -80,23 +97,54 @@ try:
 			self.wm_iconphoto(self, App._make_icon())
 			
 			# other data structures
-			self.board = [[0 for x in range(grid_size)] for y in range(grid_size)]
+			self.grid_size = grid_size
+			self.turn_id = 0
+			self.thinking_player = None
+			self.ai_thread = None
+			# the AI that scores a human's moves on the "play" buttons, or None for no
+			# scores. It's kept apart from the players, so it neither tells an AI's
+			# opponent what that AI thinks nor shares its transposition table.
+			self.hint_player = hint_player
+			self.hints = None
 
 			# start forming up the screen--here's the top banner
 			self.top_banner = tk.Label(self, bg="#ffffff", font=("Arial", 20))
 			self.top_banner.grid(column=1, row=1, columnspan=grid_size)
 
-			# buttons
-			self.buttons = []
-
 			self.canvas = tk.Canvas(width = grid_size*SQUARE_SIZE, height = grid_size*SQUARE_SIZE, bg=BACKGROUND_COLOR, highlightthickness=0)
 			self.canvas.grid(column=1, row=3, columnspan=grid_size)
 
+			# one board square, one disc and one "play" button per location, made once
+			# and then shown, hidden or recolored, so nothing piles up over many games
 			self.discs = {}
-			# make the board
+			self.hint_buttons = {}
+			self.buttons = []
 			for r in range(grid_size):
 				for c in range(grid_size):
-					self.canvas.create_image((c*SQUARE_SIZE+HALF_SQUARE,r*SQUARE_SIZE+HALF_SQUARE), image=self.overlay_image)
+					center = (c*SQUARE_SIZE+HALF_SQUARE, r*SQUARE_SIZE+HALF_SQUARE)
+					self.canvas.create_image(center, image=self.overlay_image)
+					self.discs[(c, r)] = self.canvas.create_image(center, image=self.disc1_image, state="hidden")
+					self.hint_buttons[(c, r)] = tk.Button(self, text="play", command=partial(self._place_disc, (c, r)), highlightthickness=0)
+
+			# stop any AI search before closing, and let the user start over with ctrl-n
+			self.protocol("WM_DELETE_WINDOW", self._close)
+			self.bind("<Control-n>", lambda event: self.new_game())
+
+			self.new_game()
+
+		# clear the board and start a new game, abandoning any AI search in progress
+		def new_game(self):
+			self._cancel_computer_turn()
+			self._hide_buttons()
+			for disc in self.discs.values():
+				self.canvas.itemconfig(disc, state="hidden")
+
+			grid_size = self.grid_size
+			self.board = [[0 for x in range(grid_size)] for y in range(grid_size)]
+			# the empty squares next to a disc (the only ones that can be played), and
+			# the disc counts, both kept up to date as discs are placed and flipped
+			self.frontier = set()
+			self.tokens = {1:0, 2:0}
 
 			# place initial tokens
 			middle_top_left = (int(grid_size/2) - 1, int(grid_size/2) - 1, False)
@@ -110,19 +158,23 @@ try:
 					
 		# actually make a play--modifies the board, and switches turns if game_started
 		def _place_disc(self, location, player_num = None, game_started = True):
-			# Clear all buttons
-			for button in self.buttons:
-				button.destroy()
-			self.buttons = []
+			self._hide_buttons()
 
 			if player_num == None: player_num = self.current_player
 
-			# create the new disc
+			# show the square's disc
 			if player_num == 1: image = self.disc1_image
 			else: image = self.disc2_image
-			new_disc = self.canvas.create_image((location[0]*SQUARE_SIZE + HALF_SQUARE, location[1]*SQUARE_SIZE + HALF_SQUARE), image=image)
+			self.canvas.itemconfig(self.discs[location], image=image, state="normal")
 			self.board[location[1]][location[0]] = player_num
-			self.discs[location] = new_disc
+			self.tokens[player_num] += 1
+
+			# the new disc's empty neighbors join the frontier
+			self.frontier.discard(location)
+			for x in range(location[0] - 1, location[0] + 2):
+				for y in range(location[1] - 1, location[1] + 2):
+					if self._is_on_board((x, y)) and self.board[y][x] == 0:
+						self.frontier.add((x, y))
 
 			# flip disks
 			for flip in self._get_flipped(location, player_num):
@@ -131,13 +183,16 @@ try:
 			if game_started:
 				self._swap_player()
 
+		# hide all the "play" buttons, and stop scoring them
+		def _hide_buttons(self):
+			self._stop_hints()
+			for button in self.buttons:
+				button.place_forget()
+			self.buttons = []
+
 		# handle the UI aspect of the victory
 		def _declare_victory(self):
-			tokens = {1:0, 2:0}
-			for row in self.board:
-				for cell in row:
-					if cell is not 0:
-						tokens[cell] += 1
+			tokens = self.tokens
 
 			winstring = " player wins,"
 			if tokens[1] > tokens[2]:
@@ -190,11 +245,9 @@ try:
 		def _get_valid_moves(self, player):
 			available = []
 
-			for y in range(len(self.board)):
-				for x in range(len(self.board[0])):
-					if self.board[y][x] == 0:
-						if self._get_flipped((x, y), player):
-							available.append((x,y))
+			for location in sorted(self.frontier, key=lambda location: (location[1], location[0])):
+				if self._get_flipped(location, player):
+					available.append(location)
 
 			return available
 
@@ -215,39 +268,156 @@ try:
 			if type(self.players[player_id]) == HumanPlayer:
 				self.top_banner.config(text=PLAYERS[self.current_player] + "'s turn")
 				for move in valid_moves:
-					b = tk.Button(self, text="play", command=partial(self._place_disc, move), highlightthickness=0)
+					b = self.hint_buttons[move]
+					b.config(text="play")
 					b.place(x=move[0]*SQUARE_SIZE + HALF_SQUARE - 13, y=move[1]*SQUARE_SIZE + HALF_SQUARE + HALF_SQUARE - 10)
 					self.buttons.append(b)
 
+				# let an AI opponent think on the human's time, unless the hints are using
+				# it. (Two searches at once would only fight over the same CPU.)
+				opponent = self.players[3 - player_id]
+				if self.hint_player != None:
+					self._start_hints(player_id)
+				elif hasattr(opponent, "start_pondering"):
+					opponent.start_pondering(tuple([tuple(column) for column in self.board]))
+
 			# if it's an AI, disable buttons & start up its turn
 			else:
 				self.top_banner.config(text=PLAYERS[self.current_player] + " player is thinking...")
 
-				self.after(50, self._do_computer_turn)
+				self.after(50, self._do_computer_turn, self.turn_id)
 
 		# flip a token
 		def _flip_token(self, location):
 			if self.board[location[1]][location[0]] == 1: 
 				image = self.disc2_image
 				self.board[location[1]][location[0]] = 2
+				self.tokens[1] -= 1
+				self.tokens[2] += 1
 			else: 
 				image = self.disc1_image
 				self.board[location[1]][location[0]] = 1
-			new_disc = self.canvas.create_image((location[0]*SQUARE_SIZE + HALF_SQUARE, location[1]*SQUARE_SIZE + HALF_SQUARE), image=image)
+				self.tokens[2] -= 1
+				self.tokens[1] += 1
+			self.canvas.itemconfig(self.discs[location], image=image)
+
+		# let the computer take a turn. It picks its move on a worker thread, so the
+		# window keeps redrawing while it thinks, and we poll for the result.
+		def _do_computer_turn(self, turn_id):
+			if turn_id != self.turn_id: return
+
+			# a cancelled turn's search may still be unwinding. Wait for it, so the
+			# same player is never asked for two moves at once.
+			if self.ai_thread != None and self.ai_thread.is_alive():
+				self.after(POLL_MS, self._do_computer_turn, turn_id)
+				return
 
-		# let the computer take a turn
-		def _do_computer_turn(self):
 			# pass the player a tuple (so it can't mess with the original board)
 			board_tuple = tuple([tuple(column) for column in self.board])
-			move = self.players[self.current_player].pick_move(board_tuple)
+			player = self.players[self.current_player]
+			results = queue.Queue()
+			self.thinking_player = player
+			self.ai_thread = threading.Thread(target=App._pick_move_in_thread, args=(player, board_tuple, results), daemon=True)
+			self.ai_thread.start()
+			self.after(POLL_MS, self._finish_computer_turn, turn_id, results)
+
+		# the worker thread: pick a move, and hand it (or whatever went wrong) back
+		@staticmethod
+		def _pick_move_in_thread(player, board_tuple, results):
+			try:
+				results.put(player.pick_move(board_tuple))
+			except Exception as exception:
+				results.put(exception)
+
+		# play the computer's move once it has one, unless its turn was cancelled
+		def _finish_computer_turn(self, turn_id, results):
+			if turn_id != self.turn_id: return
+			try:
+				move = results.get_nowait()
+			except queue.Empty:
+				self.after(POLL_MS, self._finish_computer_turn, turn_id, results)
+				return
+
+			self.thinking_player = None
+			if isinstance(move, Exception): raise move
+
+			# only a cancel() meant for an earlier turn that had already finished makes
+			# the AI give up on this one, so just ask again
+			if move == None:
+				self._do_computer_turn(turn_id)
+				return
 
 			# checks to make sure that the AI has made a valid move
 			assert self._is_on_board(move)
 			assert self.board[move[1]][move[0]] == 0
-			
-			self.top_banner.config(text=PLAYERS[self.current_player] + " player is thinking...")
+
 			self._place_disc(move)
-			
+
+		# abandon the computer's turn, and stop its search (and any pondering) if it knows how
+		def _cancel_computer_turn(self):
+			self.turn_id += 1
+			# a player that has already picked its move has nothing to stop, and
+			# cancelling it anyway would cancel its next move instead
+			thinking = self.ai_thread != None and self.ai_thread.is_alive()
+			if thinking and self.thinking_player != None and hasattr(self.thinking_player, "cancel"):
+				self.thinking_player.cancel()
+			self.thinking_player = None
+			for player in self.players[1:]:
+				if hasattr(player, "stop_pondering"):
+					player.stop_pondering()
+
+		# score the human's moves on the "play" buttons, one search depth at a time,
+		# with the hint player. It runs on a worker thread, like the AI's turn.
+		def _start_hints(self, player_id):
+			analyst = self.hint_player
+			if not hasattr(analyst, "analyze"): return
+
+			board_tuple = tuple([tuple(column) for column in self.board])
+			results = queue.Queue()
+			stopped = threading.Event()
+			self.hints = (analyst, stopped)
+			threading.Thread(target=App._analyze_in_thread, args=(analyst, board_tuple, player_id, results, stopped), daemon=True).start()
+			self.after(POLL_MS, self._show_hints, results, stopped)
+
+		# the worker thread: hand back each depth's analysis, then None when done
+		@staticmethod
+		def _analyze_in_thread(analyst, board_tuple, player_id, results, stopped):
+			try:
+				for analysis in analyst.analyze(board_tuple, player_id):
+					if stopped.is_set(): break
+					results.put(analysis)
+			except Exception as exception:
+				results.put(exception)
+			results.put(None)
+
+		# put the newest scores on the buttons, until the analysis ends or is stopped
+		def _show_hints(self, results, stopped):
+			if stopped.is_set(): return
+			try:
+				while True:
+					analysis = results.get_nowait()
+					if analysis == None: return
+					if isinstance(analysis, Exception): raise analysis
+					for location, score in analysis.scores.items():
+						self.hint_buttons[location].config(text="%+d" % score)
+			except queue.Empty:
+				self.after(POLL_MS, self._show_hints, results, stopped)
+
+		# stop scoring the buttons
+		def _stop_hints(self):
+			if self.hints == None: return
+			analyst, stopped = self.hints
+			stopped.set()
+			if hasattr(analyst, "stop_analyzing"):
+				analyst.stop_analyzing()
+			self.hints = None
+
+		# close the window without waiting for the AI
+		def _close(self):
+			self._cancel_computer_turn()
+			self._stop_hints()
+			self.destroy()
+
 		# take in a color string or tuple, return a tuple
 		@staticmethod
 		def _make_color_tuple(color, alpha=255):
@@ -269,70 +439,83 @@ try:
 		# make an image for one square in the board
 		@staticmethod
 		def _make_board_image():
-			# start by making something double-size, so we can shrink it and get anti-aliasing
-			im = Image.new("RGBA", (2*SQUARE_SIZE,2*SQUARE_SIZE), App._make_color_tuple(BOARD_COLOR))
-			draw = ImageDraw.Draw(im)
-			draw.rectangle([(0, 0), (2*SQUARE_SIZE, 2*SQUARE_SIZE)], fill=None, outline=(0, 0, 0, 0))
-			return ImageTk.PhotoImage(im.resize((SQUARE_SIZE, SQUARE_SIZE), resample=Image.BICUBIC))
+			key = ("board", BOARD_COLOR, SQUARE_SIZE)
+			if key not in _image_cache:
+				# start by making something double-size, so we can shrink it and get anti-aliasing
+				im = Image.new("RGBA", (2*SQUARE_SIZE,2*SQUARE_SIZE), App._make_color_tuple(BOARD_COLOR))
+				draw = ImageDraw.Draw(im)
+				draw.rectangle([(0, 0), (2*SQUARE_SIZE, 2*SQUARE_SIZE)], fill=None, outline=(0, 0, 0, 0))
+				_image_cache[key] = im.resize((SQUARE_SIZE, SQUARE_SIZE), resample=Image.BICUBIC)
+			return ImageTk.PhotoImage(_image_cache[key])
 
 		# make a disc out of the passed color
 		@staticmethod
 		def _make_disc_image(color):
-			im = Image.new("RGBA", (2*SQUARE_SIZE,2*SQUARE_SIZE), (0,0,0,0))
-			draw = ImageDraw.Draw(im)
-
-			offset = None
-			if color == (255, 255, 255, 255):
-				offset = (0, 0, 0, 255)
-			color = App._make_color_tuple(color)
-			dark = (color[0]//2, color[1]//2, color[2]//2, color[3])
-	
-			draw.ellipse((0, 0, 2*SQUARE_SIZE, 2*SQUARE_SIZE), color, dark)
-			return ImageTk.PhotoImage(im.resize((SQUARE_SIZE, SQUARE_SIZE), resample=Image.BICUBIC))
+			key = ("disc", tuple(color), SQUARE_SIZE)
+			if key not in _image_cache:
+				im = Image.new("RGBA", (2*SQUARE_SIZE,2*SQUARE_SIZE), (0,0,0,0))
+				draw = ImageDraw.Draw(im)
+
+				offset = None
+				if color == (255, 255, 255, 255):
+					offset = (0, 0, 0, 255)
+				color = App._make_color_tuple(color)
+				dark = (color[0]//2, color[1]//2, color[2]//2, color[3])
+
+				draw.ellipse((0, 0, 2*SQUARE_SIZE, 2*SQUARE_SIZE), color, dark)
+				_image_cache[key] = im.resize((SQUARE_SIZE, SQUARE_SIZE), resample=Image.BICUBIC)
+			return ImageTk.PhotoImage(_image_cache[key])
 
 		# make an 64x64 image of a black disc and a white disc
 		@staticmethod
 		def _make_icon():
-			im = Image.new("RGBA", (100,100), (0,0,0,0))
-			draw = ImageDraw.Draw(im)
-			draw.ellipse((0, 0, 70, 70), "black")
-			draw.ellipse((30, 30, 100, 100), "black") # the outline for the white disc
-			draw.ellipse((34, 34, 96, 96), "white")
-			return ImageTk.PhotoImage(im.resize((64, 64), resample=Image.BICUBIC))
-			
-# error to print out if we couldn't load up graphics
-except ImportError:
-	print("Warning: Could not find the tkinter or PIL module. Graphics disabled.", file=sys.stderr)
-	do_graphics = False
+			key = ("icon", None, 64)
+			if key not in _image_cache:
+				im = Image.new("RGBA", (100,100), (0,0,0,0))
+				draw = ImageDraw.Draw(im)
+				draw.ellipse((0, 0, 70, 70), "black")
+				draw.ellipse((30, 30, 100, 100), "black") # the outline for the white disc
+				draw.ellipse((34, 34, 96, 96), "white")
+				_image_cache[key] = im.resize((64, 64), resample=Image.BICUBIC)
+			return ImageTk.PhotoImage(_image_cache[key])
+
+	_app_class = App
+	return App
 
 ################################################################################
 # FUNCTIONS
 ################################################################################
 
-def load_player(player_id, module_name = None, level = 1):
+def log_search_stats(player_id, stats, output = sys.stderr):
 	"""
-	Load up a ComputerPlayer class from the given module. A module of None means 
-	a human player.
+	Print out the search stats for an AI's move (probably to stderr).
 	"""
-	class_name = "Player" +str(player_id)+ "Class"
+	print(PLAYERS[player_id] + ": " + str(stats), file=output)
 
+def load_player(player_id, module_name = None, level = 1, time_ms = None, workers = None, verbose = False, evaluator = None):
+	"""
+	Load up a ComputerPlayer class from the given module. A module of None means 
+	a human player. A time budget (in ms), a number of worker processes, stats
+	logging and a pattern weight file to evaluate with are only passed on if they
+	were asked for, so AI files that don't take them still work.
+	"""
 	# if module_name is None, that means we have a human player
 	if module_name == None:
-		exec(class_name + " = HumanPlayer", globals())
 		return HumanPlayer()
 
 	# look for the file specified, see if we have a proper ComputerPlayer
 	try:
-		exec("from " +module_name+ " import ComputerPlayer as " +class_name, globals())
-	except ImportError:
+		Player = importlib.import_module(module_name).ComputerPlayer
+	except (ImportError, AttributeError):
 		print("Could not find ComputerPlayer in file \"" +module_name+ ".py\". Exiting.", file=sys.stderr)
 		sys.exit(1)
 
-	# print("success!")
-
-	# make a local pointer to the ComputerPlayer class, and return a new instance
-	exec("Player = " +class_name)
-	return locals()["Player"](player_id, level)
+	options = {}
+	if time_ms != None: options["time_ms"] = time_ms
+	if workers != None: options["workers"] = workers
+	if verbose: options["on_stats"] = partial(log_search_stats, player_id)
+	if evaluator != None: options["evaluator"] = evaluator
+	return Player(player_id, level, **options)
 
 def parse_command_line_args(args):
 	"""
@@ -357,15 +540,46 @@ def parse_command_line_args(args):
 		levels = args[args.index("-l") + 1].split(',')
 		if len(levels) == 1: levels = (int(levels[0]), int(levels[0]))
 		else: levels = (int(levels[0]), int(levels[1]))
+	elif "-t" in args: levels = (None, None)
 	else: levels = (DEFAULT_AI_LEVEL, DEFAULT_AI_LEVEL)
 
+	# time budget per move, in ms
+	if "-t" in args:
+		times = args[args.index("-t") + 1].split(',')
+		if len(times) == 1: times = (int(times[0]), int(times[0]))
+		else: times = (int(times[0]), int(times[1]))
+	else: times = (None, None)
+
+	# worker processes for each AI's search
+	if "-w" in args:
+		workers = args[args.index("-w") + 1].split(',')
+		if len(workers) == 1: workers = (int(workers[0]), int(workers[0]))
+		else: workers = (int(workers[0]), int(workers[1]))
+	else: workers = (None, None)
+
+	# pattern weight files to evaluate with, or "none" to count discs
+	if "-e" in args:
+		evaluators = [None if path == "none" else path for path in args[args.index("-e") + 1].split(',')]
+		if len(evaluators) == 1: evaluators = (evaluators[0], evaluators[0])
+		else: evaluators = (evaluators[0], evaluators[1])
+	else: evaluators = (None, None)
+
+	# log search stats
+	verbose = "-v" in args
+
+	# score the human's moves on the "play" buttons
+	hints = "-s" in args
+
+	# play in the terminal, without loading any graphics
+	headless = "-n" in args
+
 	# colors
 	if "-c" in args:
 		color_string = args[args.index("-c") + 1]
 		colors = color_string.split(',')
 	else: colors = None
 		
-	return (print_help, players, levels, colors)
+	return (print_help, players, levels, times, workers, evaluators, verbose, colors, headless, hints)
 
 def print_help(output = sys.stderr):
 	"""
@@ -378,40 +592,129 @@ def print_help(output = sys.stderr):
 	print("\t-1\t1-player (human-v-computer)", file=output)
 	print("\t-2\t2-player (human-v-human)", file=output)
 	print("\t-c\tuse colors (RRGGBB,RRGGBB)", file=output)
+	print("\t-e\tevaluate with pattern weight files (file,file); none counts discs", file=output)
 	print("\t-f\tuse a non-standard AI file", file=output)
 	print("\t-h\tprint this help", file=output)
 	print("\t-l\tset AI level (#,#)", file=output)
-	#print("\t-n\tnon-graphics mode", file=output)
+	print("\t-n\tnon-graphics mode", file=output)
+	print("\t-s\tshow an AI's score for each of a human's moves", file=output)
+	print("\t-t\tset AI time per move in ms (#,#); -l becomes the max depth", file=output)
+	print("\t-v\tprint search stats for every AI move", file=output)
+	print("\t-w\tsearch with this many processes per AI (#,#)", file=output)
 
-def play_game_in_ascii(player1, player2):
+def read_move(game, player, input_stream = sys.stdin, output = sys.stdout):
 	"""
-	ASCII game. Boring. May not implement this.
+	Asks a human player for a move as "x y" until he types a legal one, and
+	returns it. Returns None if the input runs out.
 	"""
-	pass
+	while True:
+		print(PLAYERS[player] + "'s move (x y): ", end="", file=output, flush=True)
+		line = input_stream.readline()
+		if not line:
+			return None
+		try:
+			x, y = [int(value) for value in line.split()]
+		except ValueError:
+			x, y = -1, -1
+		if game.is_on_board((x, y)) and game.board[y][x] == 0 and game.get_flipped((x, y), player):
+			return (x, y)
+		print("That isn't a legal move. Legal moves are: " + ", ".join(str(move[0]) + " " + str(move[1]) for move in game._get_available_moves(player)), file=output)
+
+def play_game_in_ascii(players, grid_size = 8, input_stream = sys.stdin, output = sys.stdout):
+	"""
+	Plays a game in the terminal, printing the board after every move, without
+	ever loading tkinter or PIL. players[0] is player 1 (white) and players[1]
+	is player 2 (black), who goes first. Returns the winner (1, 2, or 0 for a
+	tie), or None if a human player's input ran out.
+	"""
+	# imported here, so starting the GUI doesn't wait on the search modules
+	from othelloplayer import make_othello
+
+	game = make_othello(None, grid_size)
+	current = 2
+	print(game.to_string(), file=output)
+
+	while True:
+		if not game.get_moves(current):
+			if not game.get_moves(3 - current):
+				break
+			print(PLAYERS[current] + " has no moves.", file=output)
+			current = 3 - current
+			continue
+
+		# pass the player a tuple (so it can't mess with the original board)
+		board_tuple = tuple([tuple(row) for row in game.board])
+		opponent = players[2 - current]
+		if type(players[current - 1]) == HumanPlayer:
+			# let an AI opponent think on the human's time, as the App does
+			if hasattr(opponent, "start_pondering"):
+				opponent.start_pondering(board_tuple)
+			move = read_move(game, current, input_stream, output)
+			if hasattr(opponent, "stop_pondering"):
+				opponent.stop_pondering()
+			if move == None:
+				return None
+		else:
+			move = players[current - 1].pick_move(board_tuple)
+
+			# checks to make sure that the AI has made a valid move
+			assert game.is_on_board(move)
+			assert game.board[move[1]][move[0]] == 0
+			assert game.get_flipped(move, current)
+
+		game.play_move(move, current)
+		print(PLAYERS[current] + " plays " + str(move[0]) + " " + str(move[1]) + ":", file=output)
+		print(game.to_string(), file=output)
+		current = 3 - current
+
+	tokens = {1: game.get_state_value(1), 2: game.get_state_value(2)}
+	if tokens[1] > tokens[2]: winner = 1
+	elif tokens[2] > tokens[1]: winner = 2
+	else: winner = 0
+
+	if winner == 0: winstring = "Tie game,"
+	else: winstring = PLAYERS[winner] + " player wins,"
+	print(winstring + " with " + str(max(tokens[1], tokens[2])) + " tokens!", file=output)
+	return winner
 
 ################################################################################
 # PARSE COMMAND LINE & START PLAYING
 ################################################################################
 
-do_print_help, player_files, levels, colors = parse_command_line_args(sys.argv[1:])
+if __name__ == "__main__":
+	do_print_help, player_files, levels, times, workers, evaluators, verbose, colors, headless, hints = parse_command_line_args(sys.argv[1:])
 
-# help message for user, if -h or --help
-if do_print_help:
-	print_help()
-	sys.exit(1)
-
-# load up the player classes
-if random.random() > .5:
-	players = (load_player(1, player_files[1], levels[1]), load_player(2, player_files[0], levels[0]))
-else :
-	players = (load_player(1, player_files[0], levels[0]), load_player(2, player_files[1], levels[1]))
-
-# hit it!
-if do_graphics:
-	print("starting graphics...")
-	app = App(players, colors)
-	app.mainloop()
+	# help message for user, if -h or --help
+	if do_print_help:
+		print_help()
+		sys.exit(1)
 
-else:
-#    play_game_in_ascii(players[1], players[2])
-	print("Sorry--this game is not implemented yet in ASCII.", file=sys.stderr)
\ No newline at end of file
+	# load up the player classes
+	if random.random() > .5:
+		players = (load_player(1, player_files[1], levels[1], times[1], workers[1], verbose, evaluators[1]), load_player(2, player_files[0], levels[0], times[0], workers[0], verbose, evaluators[0]))
+	else :
+		players = (load_player(1, player_files[0], levels[0], times[0], workers[0], verbose, evaluators[0]), load_player(2, player_files[1], levels[1], times[1], workers[1], verbose, evaluators[1]))
+
+	# Does tkinter even exist on this computer? If not, don't do graphics.
+	if not headless:
+		try:
+			App = get_app_class()
+		except ImportError:
+			print("Warning: Could not find the tkinter or PIL module. Graphics disabled.", file=sys.stderr)
+			headless = True
+
+	# a separate AI (with its own table) to score the human's moves
+	hint_player = None
+	if hints and not headless:
+		hint_player = load_player(2, player_files[1] or DEFAULT_AI_FILE, levels[1] or DEFAULT_AI_LEVEL, evaluator = evaluators[1])
+		if not hasattr(hint_player, "analyze"):
+			print("Warning: this AI file can't score moves. Hints disabled.", file=sys.stderr)
+			hint_player = None
+
+	# hit it!
+	if headless:
+		play_game_in_ascii(players)
+	else:
+		print("starting graphics...")
+		app = App(players, colors, hint_player = hint_player)
+		app.mainloop()
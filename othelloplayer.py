@@ -1,4 +1,38 @@
+import os
 import random
+import threading
+import time
+from itertools import repeat
+
+from bitboard import BitboardOthello
+from book import OpeningBook
+from endgame import EXACT_SCORE, SOLVED_DEPTH, EndgameSolver
+from patterns import PatternEvaluator
+from search import Search, SearchStats, SearchTimeout
+from transposition import TranspositionTable, get_zobrist_keys
+
+DEFAULT_TABLE_ENTRIES = 1 << 18
+DEFAULT_ENDGAME_EMPTIES = 12
+
+# with a time budget, the share of it the endgame solver gets before giving up
+# and leaving the rest to a normal search
+ENDGAME_TIME_SHARE = 0.5
+
+# pondering guesses at the opponent's likely replies with a search this deep
+PONDER_REPLY_PLIES = 2
+
+# pick_moves() hands each worker its boards in about this many chunks, so the
+# work evens out without a round trip per board
+BATCH_CHUNKS_PER_WORKER = 8
+
+# for each board width, each location's list of neighbors
+_neighbor_cache = {}
+
+def _row_order(location):
+	"""
+	Sort key putting locations in the order a row-by-row scan of the board finds them.
+	"""
+	return (location[1], location[0])
 
 def get_location_type(location, board_width):
 	"""
@@ -15,6 +49,31 @@ def get_location_type(location, board_width):
 		return 2
 	return 1
 
+# the ComputerPlayer a pick_moves() worker process searches with
+_worker_player = None
+
+def _pick_move_in_worker(options, board, seed):
+	"""
+	Pool task for pick_moves(): returns the move and SearchStats for the board.
+	Each worker process keeps one ComputerPlayer made with the options, so its
+	transposition table, book and evaluator serve every board it searches.
+	"""
+	global _worker_player
+	if _worker_player == None or _worker_player.options != options:
+		_worker_player = ComputerPlayer(**options)
+	_worker_player.rng.seed(seed)
+	move = _worker_player.pick_move(board)
+	return (move, _worker_player.last_stats)
+
+def make_othello(board, width=None):
+	"""
+	Returns a game state for the board (or a starting board of the given width),
+	using the bitboard engine for 8x8 boards and Othello for everything else.
+	"""
+	if (len(board) if board else width) == 8:
+		return BitboardOthello(board, width)
+	return Othello(board, width)
+
 class Othello:
 	"""
 	A game object to hold the board game Othello, also known as Reversi.
@@ -23,6 +82,14 @@ class Othello:
 		board:	a 2D list of integers representing the board state and the tokens on it. 
 				1 for white, 2 for black, 0 for empty. Optional if width and height are given.
 		width:	The width of the game board. Optional if board is given.
+		counts:	the number of empty squares, white tokens and black tokens, indexed
+				like the board's values and kept up to date by every move.
+		frontier:	the empty squares next to at least one token, also kept up to
+					date. Every legal move is one of these, so move generation only
+					looks at them instead of the whole board.
+		move_cache:	for each player, the (key, moves) of the last moves generated,
+					so asking again about the same position doesn't generate them again.
+		generated:	the number of times moves were actually generated.
 	"""
 	def __init__(self, board, width=None):
 		"""
@@ -46,18 +113,140 @@ class Othello:
 			self.board[middle_top_left[1] + 1][middle_top_left[0]] = 2
 			self.board[middle_top_left[1]][middle_top_left[0] + 1] = 2
 
+		self.width = len(self.board)
+		self.key = self._compute_key()
+		self._compute_frontier()
+		self.move_cache = {}
+		self.generated = 0
+
 	def play_move(self, location, player):
 		"""
 		Places the player's token at the location provided.
 		Then flips all appropriate tokens at orthogonal and diagonal directions.
+		Returns the list of flipped locations, which undo_move() needs.
 		"""
-		self.board[location[1]][location[0]] = player
+		return self._place(location, player, self.get_flipped(location, player))
 
-		flipped = self.get_flipped(location, player)
+	def _place(self, location, player, flipped):
+		"""
+		play_move(), given the list of locations the move flips.
+		"""
+		self.board[location[1]][location[0]] = player
 
 		for flip in flipped:
 			self.board[flip[1]][flip[0]] = player
 
+		counts = self.counts
+		counts[0] -= 1
+		counts[player] += 1 + len(flipped)
+		counts[3 - player] -= len(flipped)
+
+		# the new token's empty neighbors join the frontier
+		frontier = self.frontier
+		frontier.discard(location)
+		for neighbor in self._get_neighbors(location):
+			if self.board[neighbor[1]][neighbor[0]] == 0:
+				frontier.add(neighbor)
+
+		# keep the Zobrist key up to date: one new token, and each flip changes color
+		square_keys = get_zobrist_keys(self.width)[0]
+		self.key ^= square_keys[location[1] * self.width + location[0]][player]
+		for flip in flipped:
+			flip_keys = square_keys[flip[1] * self.width + flip[0]]
+			self.key ^= flip_keys[1] ^ flip_keys[2]
+
+		return flipped
+
+	def undo_move(self, location, player, flipped):
+		"""
+		Takes back a move made with play_move(), given the list of locations it
+		flipped. Moves must be undone in the reverse order they were played.
+		"""
+		opponent = 3 - player
+		self.board[location[1]][location[0]] = 0
+
+		for flip in flipped:
+			self.board[flip[1]][flip[0]] = opponent
+
+		counts = self.counts
+		counts[0] += 1
+		counts[player] -= 1 + len(flipped)
+		counts[opponent] += len(flipped)
+
+		# the emptied square is next to the tokens it flipped, so it's frontier again,
+		# but its empty neighbors only stay frontier if another token is next to them
+		frontier = self.frontier
+		frontier.add(location)
+		for neighbor in self._get_neighbors(location):
+			if self.board[neighbor[1]][neighbor[0]] == 0 and not self._has_token_neighbor(neighbor):
+				frontier.discard(neighbor)
+
+		square_keys = get_zobrist_keys(self.width)[0]
+		self.key ^= square_keys[location[1] * self.width + location[0]][player]
+		for flip in flipped:
+			flip_keys = square_keys[flip[1] * self.width + flip[0]]
+			self.key ^= flip_keys[1] ^ flip_keys[2]
+
+	def _compute_key(self):
+		"""
+		Returns the Zobrist key of the tokens on the board, from scratch.
+		"""
+		square_keys = get_zobrist_keys(self.width)[0]
+		key = 0
+		for y in range(self.width):
+			for x in range(self.width):
+				key ^= square_keys[y * self.width + x][self.board[y][x]]
+		return key
+
+	def _compute_frontier(self):
+		"""
+		Sets the token counts and the frontier from scratch.
+		"""
+		self.counts = [0, 0, 0]
+		self.frontier = set()
+		for y in range(self.width):
+			for x in range(self.width):
+				self.counts[self.board[y][x]] += 1
+				if self.board[y][x] == 0 and self._has_token_neighbor((x, y)):
+					self.frontier.add((x, y))
+
+	def _get_neighbors(self, location):
+		"""
+		Returns the (up to 8) locations on the board next to the one given.
+		"""
+		neighbors = _neighbor_cache.get(self.width)
+		if neighbors == None:
+			neighbors = {}
+			for y in range(self.width):
+				for x in range(self.width):
+					neighbors[(x, y)] = [(x + dx, y + dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+						if (dx or dy) and 0 <= x + dx < self.width and 0 <= y + dy < self.width]
+			_neighbor_cache[self.width] = neighbors
+		return neighbors[location]
+
+	def _has_token_neighbor(self, location):
+		"""
+		Returns whether any square next to the location has a token on it.
+		"""
+		for neighbor in self._get_neighbors(location):
+			if self.board[neighbor[1]][neighbor[0]] != 0:
+				return True
+		return False
+
+	def copy(self):
+		"""
+		Returns a new Othello with a deep copy of the board, without rehashing it.
+		"""
+		other = Othello.__new__(Othello)
+		other.board = [row[:] for row in self.board]
+		other.width = self.width
+		other.counts = self.counts[:]
+		other.frontier = set(self.frontier)
+		other.move_cache = dict(self.move_cache)
+		other.generated = 0
+		other.key = self.key
+		return other
+
 	def to_string(self):
 		"""
 		Converts the game state into an easy-to-read string.
@@ -85,17 +274,29 @@ class Othello:
 		Finds all available moves for a player. These are empty spaces adjacent to at least
 		one pre-existing token, and where placing a token would flip at least one other.
 		Note that a player can have no available play spots in normal play.
+		Only the frontier needs checking, and the moves come back in row order.
+		The moves are cached, so asking again before the board changes is cheap.
 		"""
+		cached = self.move_cache.get(player)
+		if cached != None and cached[0] == self.key:
+			return list(cached[1])
+
+		self.generated += 1
 		available = []
 
-		for y in range(len(self.board)):
-			for x in range(len(self.board[0])):
-				if self.board[y][x] == 0:
-					if self.get_flipped((x, y), player):
-						available.append((x,y))
+		for location in sorted(self.frontier, key=_row_order):
+			if self.get_flipped(location, player):
+				available.append(location)
 
+		self.move_cache[player] = (self.key, tuple(available))
 		return available
 
+	def clear_move_cache(self):
+		"""
+		Forgets the cached moves, so the next call generates them again.
+		"""
+		self.move_cache = {}
+
 	def is_on_board(self, location):
 		"""
 		Returns whether a location is a valid spot on the game board.
@@ -141,24 +342,86 @@ class Othello:
 		children = []
 
 		for move in moves:
-			child = Othello(self.board)
-			child.play_move(move, player)
-			children.append(child)
+			children.append(self.get_child(move, player))
 
 		return children
 
-	def get_state_value(self, player):
+	def get_moves(self, player):
 		"""
-		Returns the number of tokens the player has on the board.
+		Returns the moves available to the player, in the form the search uses.
+		For this board that's just the (x, y) locations.
 		"""
-		value = 0
+		return self._get_available_moves(player)
 
-		for row in self.board:
-			for cell in row:
-				if cell == player:
-					value += 1
+	def get_child(self, move, player):
+		"""
+		Returns a copy of this state with the move played.
+		"""
+		child = self.copy()
+		child.play_move(move, player)
+		return child
+
+	def make_move(self, move, player):
+		"""
+		Plays a move from get_moves() in place, and returns what unmake_move()
+		needs to take it back.
+		"""
+		return self.play_move(move, player)
 
-		return value
+	def unmake_move(self, move, player, undo):
+		"""
+		Takes back a move played by make_move().
+		"""
+		self.undo_move(move, player, undo)
+
+	def try_move(self, move, player):
+		"""
+		make_move() for any empty square: returns None, and leaves the board alone,
+		if the move wouldn't flip anything.
+		"""
+		flipped = self.get_flipped(move, player)
+		if not flipped:
+			return None
+		return self._place(move, player, flipped)
+
+	def get_empties(self):
+		"""
+		Returns every empty square, in the form get_moves() uses.
+		"""
+		return [(x, y) for y in range(self.width) for x in range(self.width) if self.board[y][x] == 0]
+
+	def count_moves(self, player):
+		"""
+		Returns the number of moves available to the player.
+		"""
+		return len(self._get_available_moves(player))
+
+	def get_location(self, move):
+		"""
+		Converts a move from get_moves() into an (x, y) location.
+		"""
+		return move
+
+	def get_move_type(self, move):
+		"""
+		Returns get_location_type() for a move from get_moves().
+		"""
+		return get_location_type(move, self.width)
+
+	def evaluate(self, player):
+		"""
+		Returns the player's token count minus his opponent's. Unlike get_state_value,
+		this is symmetric, so a position is worth the same to one player as it costs
+		the other.
+		"""
+		return self.get_state_value(player) - self.get_state_value(3 - player)
+
+	def get_state_value(self, player):
+		"""
+		Returns the number of tokens the player has on the board (or, for player 0,
+		the number of empty squares).
+		"""
+		return self.counts[player]
 
 	def _is_state_terminal(self):
 		"""
@@ -188,9 +451,9 @@ class Othello:
 		for move in moves:
 			if not move:
 				continue
-			child = Othello(self.board)
-			child.play_move(move, player)
-			score = child.negamax(player, plies - 1, -float("inf"), float("inf"), True)
+			flipped = self.play_move(move, player)
+			score = self.negamax(player, plies - 1, -float("inf"), float("inf"), True)
+			self.undo_move(move, player, flipped)
 			if score > best_move[1]:
 				best_move = (move, score)
 
@@ -207,17 +470,25 @@ class Othello:
 		"""
 		players = {1:2, 2:1}
 
-		game_is_over = self._is_state_terminal()
-		if depth == 0 or game_is_over:
+		if depth == 0:
+			return self.get_state_value(player)
+
+		# the game is over if neither player can move (which includes a full board).
+		# The mover's moves are needed anyway, so check those first.
+		moves = self._get_available_moves(players[player])
+		if not moves and not self._get_available_moves(player):
 			return self.get_state_value(player)
 
 		best = -float("inf")
 
-		children = self.get_children(players[player])
-		random.shuffle(children)
+		# play each move in place rather than copying the board for every child,
+		# since most of them get pruned before they're searched
+		random.shuffle(moves)
 
-		for child in children:
-			value = child.negamax(players[player], depth-1, -b, -a, isPruning)
+		for move in moves:
+			flipped = self.play_move(move, players[player])
+			value = self.negamax(players[player], depth-1, -b, -a, isPruning)
+			self.undo_move(move, players[player], flipped)
 			best = max(best, value)
 
 			# Prunes low-value children. Alpha-beta.
@@ -236,24 +507,420 @@ class ComputerPlayer:
 		player_ID: 			the number corresponding to the tiles this player lays. Must be 1 or 2.
 		difficulty_level:	the number of plies this computer player will look ahead
 							during its search. Defaults to 1, which only evaluates all immediate moves.
+							With a time budget, this is the deepest it will go (None for no limit).
+		time_ms:			the time budget per move in milliseconds, or None to always search
+							difficulty_level plies. With a budget, the search deepens one ply at
+							a time and plays the best move from the deepest search it finished.
+		table:				the transposition table shared by all of this player's searches,
+							so positions seen on earlier turns don't need searching again.
+		rng:				seeds each search's tie-breaks, so a given seed always plays the
+							same game.
+		workers:			the number of processes to spread the root moves over, or None
+							to search on this process only.
+		last_stats:			the SearchStats of the last move picked, or None before the first.
+		on_stats:			a function to call with the SearchStats after every move, or None.
+		endgame_empties:	with this many empty squares or fewer, the game is solved to the end
+							instead of searched. 0 turns the solver off. Without a time budget
+							to bound the solver, it only takes over once the search would reach
+							the end of the game anyway (difficulty_level empties or fewer), so
+							low levels stay quick and don't play perfect endgames.
+		endgame_mode:		"exact" to play for the biggest win, or "wld" to play for any win
+							(or draw), which is quicker to prove.
+		book:				an OpeningBook to play from before searching, or None.
+		last_from_book:		whether the last move picked came from the book.
+		cancelled:			set by cancel() to stop the move being picked on another thread, and
+							cleared by the pick_move() it stops.
+		current_search:		the Search or EndgameSolver picking the move right now, or None.
+		current_call:		a token for the pick_move() running right now, so one that ends
+							late doesn't unregister the search of one that started after it.
+		pondered:			for each position reachable by one opponent reply, the (depth, move,
+							stats) of the deepest search of it finished while pondering.
+		evaluator:			a PatternEvaluator to score positions with instead of the disc
+							count, or None.
+		analysis_search:	the Search behind the last analyze() started, or None.
+		options:			the constructor arguments pick_moves() workers make their own
+							copy of this player with.
+		batch_pool:			the ProcessPoolExecutor pick_moves() searches on, started when
+							first needed.
+		batch_stats:		the SearchStats of each board in the last pick_moves().
 	"""
-	def __init__(self, player_ID, difficulty_level):
+	def __init__(self, player_ID, difficulty_level=None, time_ms=None, table_entries=DEFAULT_TABLE_ENTRIES, table_replacement="depth", seed=None, workers=None, on_stats=None, endgame_empties=DEFAULT_ENDGAME_EMPTIES, endgame_mode=EXACT_SCORE, book=None, evaluator=None):
 		"""
 		Constructor, takes a difficulty level (the # of plies to look
-		ahead), and a player ID, either 1 or 2.
+		ahead), and a player ID, either 1 or 2. Optionally takes a time budget per
+		move, the number of transposition table entries and its replacement policy
+		("depth" or "always"), a random seed for breaking ties between moves, a
+		number of worker processes for a parallel search, a function to pass
+		each move's search stats to, when and how to solve the endgame, an
+		opening book (an OpeningBook or the path to one), and a PatternEvaluator
+		(or the path to its weight file) to score positions with.
 		"""
 		self.player_ID = player_ID
 		self.difficulty_level = difficulty_level
+		self.time_ms = time_ms
 
 		assert (self.player_ID == 1 or self.player_ID == 2), "The player must be set to 1 or 2!"
+		assert (self.time_ms == None or self.time_ms > 0), "The time budget must be positive!"
 
-		if self.difficulty_level == None or self.difficulty_level < 1:
+		if self.time_ms != None and self.difficulty_level == None:
+			pass
+		elif self.difficulty_level == None or self.difficulty_level < 1:
 			print("Difficulty level has been raised to its minimum of 1.")
 			self.difficulty_level = 1
 
+		self.table = TranspositionTable(table_entries, table_replacement)
+		self.rng = random.Random(seed)
+
+		self.last_stats = None
+		self.on_stats = on_stats
+
+		self.endgame_empties = endgame_empties
+		self.endgame_mode = endgame_mode
+
+		if isinstance(book, str):
+			book = OpeningBook(book)
+		self.book = book
+		self.last_from_book = False
+
+		self.cancelled = False
+		self.current_search = None
+		self.current_call = None
+
+		self.pondered = {}
+		self.ponder_thread = None
+		self.ponder_search = None
+		self.ponder_stopped = False
+
+		self.analysis_search = None
+
+		if isinstance(evaluator, str):
+			evaluator = PatternEvaluator.load(evaluator)
+		self.evaluator = evaluator
+
+		self.workers = workers
+		self.parallel_search = None
+		if self.workers != None and self.workers > 1:
+			# multiprocessing is only imported once it's asked for, as it's slow to load
+			from parallel import ParallelSearch
+			self.parallel_search = ParallelSearch(self.workers, evaluator=self.evaluator)
+
+		self.options = {"player_ID": player_ID, "difficulty_level": difficulty_level, "time_ms": time_ms,
+			"table_entries": table_entries, "table_replacement": table_replacement, "endgame_empties": endgame_empties,
+			"endgame_mode": endgame_mode, "book": None if book == None else book.path, "evaluator": self.evaluator}
+		self.batch_pool = None
+		self.batch_workers = None
+		self.batch_stats = []
+
 	def pick_move(self, board):
 		"""
 		Returns the best column for the player to play in, given the board state passed.
+		Positions in the opening book are played from it, 8x8 boards are searched with
+		the faster bitboard engine, and the last few empty squares are solved exactly.
+		Returns None if cancel() was called before it finished, or before it even
+		started. Any pondering stops, and its result is played if it searched this
+		position deep enough.
+		"""
+		self.stop_pondering()
+		start = time.perf_counter()
+		othello = make_othello(board)
+		seed = self.rng.getrandbits(32)
+		call = object()
+		self.current_call = call
+
+		result = None
+		try:
+			if self.book != None:
+				result = self._play_book(othello, start)
+			if result == None:
+				result = self._play_pondered(board)
+			if result == None and self._can_solve(othello):
+				result = self._solve_endgame(othello, start)
+			if result == None:
+				time_ms = self.time_ms
+				if time_ms != None:
+					time_ms = max(1, time_ms - 1000 * (time.perf_counter() - start))
+				result = self._search(othello, seed, time_ms)
+		except SearchTimeout:
+			pass
+		finally:
+			if self.current_call is call:
+				self.current_call = None
+				self.current_search = None
+
+		if self.cancelled:
+			self.cancelled = False
+			return None
+
+		move, stats = result
+		self.last_stats = stats
+		self.last_from_book = stats.from_book
+		if self.on_stats != None:
+			self.on_stats(stats)
+		return move
+
+	def pick_moves(self, boards, workers=None):
+		"""
+		Returns the move pick_move() would pick on each of the boards, in the same
+		order, for many unrelated positions at once. The boards are spread over a
+		pool of worker processes (workers of them, or by default as many as this
+		player's workers, or one per core), and each worker keeps its own copy of
+		this player, so one transposition table and evaluator serve all of its
+		boards. With one worker, the boards are searched here, one after another.
+		Each board's SearchStats end up in batch_stats.
+		"""
+		if workers == None:
+			workers = self.workers or os.cpu_count() or 1
+
+		if workers == 1:
+			results = []
+			for board in boards:
+				move = self.pick_move(board)
+				results.append((move, self.last_stats))
+			self.batch_stats = [stats for move, stats in results]
+			return [move for move, stats in results]
+
+		pool = self._get_batch_pool(workers)
+		seeds = [self.rng.getrandbits(32) for board in boards]
+		chunksize = max(1, len(boards) // (workers * BATCH_CHUNKS_PER_WORKER))
+		results = list(pool.map(_pick_move_in_worker, repeat(self.options), boards, seeds, chunksize=chunksize))
+
+		self.batch_stats = [stats for move, stats in results]
+		if self.on_stats != None:
+			for stats in self.batch_stats:
+				self.on_stats(stats)
+		return [move for move, stats in results]
+
+	def _get_batch_pool(self, workers):
+		"""
+		Returns the pick_moves() process pool, (re)starting it if it doesn't have
+		the given number of workers.
+		"""
+		if self.batch_pool != None and self.batch_workers != workers:
+			self.batch_pool.shutdown()
+			self.batch_pool = None
+		if self.batch_pool == None:
+			from concurrent.futures import ProcessPoolExecutor
+			self.batch_pool = ProcessPoolExecutor(workers)
+			self.batch_workers = workers
+		return self.batch_pool
+
+	def _search(self, othello, seed, time_ms):
+		"""
+		Returns the best move and the SearchStats from a normal search.
+		"""
+		if self.parallel_search != None:
+			search = self.parallel_search
+			if time_ms == None:
+				move = search.get_best_move(othello, self.player_ID, self.difficulty_level, seed)
+			else :
+				move = search.iterative_deepening(othello, self.player_ID, self.difficulty_level, time_ms, seed)
+		else :
+			search = self._start(Search(self.table, seed=seed, evaluator=self.evaluator))
+			if time_ms == None:
+				move = search.get_best_move(othello, self.player_ID, self.difficulty_level)
+			else :
+				move = search.iterative_deepening(othello, self.player_ID, self.difficulty_level, time_ms)
+
+		return (move, search.stats)
+
+	def _play_book(self, othello, start):
+		"""
+		Returns the book move and a SearchStats saying so, or None if the position
+		isn't in the book.
+		"""
+		move = self.book.lookup(othello.board, self.player_ID)
+		# a book built for other rules (or just a bad one) shouldn't make us play an illegal move
+		if move == None or othello.board[move[1]][move[0]] != 0 or not othello.get_flipped(move, self.player_ID):
+			return None
+
+		stats = SearchStats()
+		stats.from_book = True
+		stats.seconds = time.perf_counter() - start
+		return (move, stats)
+
+	def _play_pondered(self, board):
+		"""
+		Returns the move and SearchStats found for this position while pondering,
+		or None if it wasn't searched as deep as pick_move() would have.
+		"""
+		entry = self.pondered.get(tuple(tuple(row) for row in board))
+		if entry == None:
+			return None
+
+		depth, move, stats = entry
+		if depth < SOLVED_DEPTH and (self.difficulty_level == None or depth < self.difficulty_level):
+			return None
+		stats.from_ponder = True
+		return (move, stats)
+
+	def _can_solve(self, othello):
+		"""
+		Returns whether the endgame solver should pick the move for the position.
+		Only a time budget stops the solver early, so without one it waits until
+		the search would look as far as the end of the game itself.
+		"""
+		empties = othello.get_state_value(0)
+		if empties > self.endgame_empties:
+			return False
+		return self.time_ms != None or empties <= self.difficulty_level
+
+	def _solve_endgame(self, othello, start):
+		"""
+		Returns the best move and the SearchStats from the endgame solver, or None
+		if it ran out of its share of the time budget.
+		"""
+		solver = EndgameSolver(self.table)
+		if self.time_ms != None:
+			solver.deadline = start + ENDGAME_TIME_SHARE * self.time_ms / 1000
+			# a timeout leaves moves played on the board, so solve a copy
+			othello = othello.copy()
+
+		self._start(solver)
+		try:
+			move = solver.get_best_move(othello, self.player_ID, self.endgame_mode)
+		except SearchTimeout:
+			return None
+		return (move, solver.stats)
+
+	def _start(self, search):
+		"""
+		Makes the Search or EndgameSolver the one cancel() stops, and returns it.
+		"""
+		self.current_search = search
+		if self.cancelled:
+			search.stop()
+		return search
+
+	def cancel(self):
+		"""
+		Stops pick_move() running on another thread as soon as it can, and makes it
+		return None. If none is running yet, the next one to start is cancelled
+		instead, so a cancel() can't be lost to a thread that hasn't got going.
+		Searches spread over worker processes still run to the end.
+		"""
+		self.cancelled = True
+		search = self.current_search
+		if search != None:
+			search.stop()
+
+	def start_pondering(self, board):
+		"""
+		Starts searching, on a background thread, the positions the opponent's
+		likeliest replies lead to, while he thinks about what to play on the board
+		passed. The work fills the transposition table, and positions searched deep
+		enough don't need searching again once the opponent has moved.
+		"""
+		self.stop_pondering()
+		self.pondered = {}
+		self.ponder_stopped = False
+		self.ponder_thread = threading.Thread(target=self._ponder, args=(make_othello(board),), daemon=True)
+		self.ponder_thread.start()
+
+	def stop_pondering(self):
+		"""
+		Stops the pondering thread (at its next clock check) and waits for it.
+		"""
+		if self.ponder_thread == None:
+			return
+		self.ponder_stopped = True
+		search = self.ponder_search
+		if search != None:
+			search.stop()
+		self.ponder_thread.join()
+		self.ponder_thread = None
+		self.ponder_search = None
+
+	def _start_pondering_search(self, search):
+		"""
+		Makes the Search or EndgameSolver the one stop_pondering() stops, and
+		returns it. Raises SearchTimeout if pondering has already been stopped.
+		"""
+		self.ponder_search = search
+		if self.ponder_stopped:
+			raise SearchTimeout()
+		return search
+
+	def _ponder(self, othello):
+		"""
+		The pondering thread. Orders the opponent's replies with a shallow search,
+		then searches the position after each of them one ply deeper at a time,
+		the likeliest first, until stopped or they're all as deep as pick_move()
+		would search. Pondering uses a fixed seed, to leave the player's own random
+		sequence alone.
+		"""
+		opponent = 3 - self.player_ID
+		try:
+			search = self._start_pondering_search(Search(self.table, seed=0, evaluator=self.evaluator))
+			search.get_best_move(othello, opponent, PONDER_REPLY_PLIES)
+			replies = sorted(search.root_scores, key=lambda move: -search.root_scores[move])
+
+			children = []
+			for move in replies:
+				child = othello.copy()
+				child.make_move(move, opponent)
+				if child.get_moves(self.player_ID):
+					children.append((tuple(tuple(row) for row in child.board), child))
+
+			max_depth = self.difficulty_level or othello.get_state_value(0)
+			for depth in range(1, max_depth + 1):
+				for key, child in children:
+					if key in self.pondered and self.pondered[key][0] >= SOLVED_DEPTH:
+						continue
+					if self._can_solve(child):
+						solver = self._start_pondering_search(EndgameSolver(self.table))
+						move = solver.get_best_move(child, self.player_ID, self.endgame_mode)
+						self.pondered[key] = (SOLVED_DEPTH, move, solver.stats)
+					else :
+						search = self._start_pondering_search(Search(self.table, seed=0, evaluator=self.evaluator))
+						move = search.get_best_move(child, self.player_ID, depth)
+						self.pondered[key] = (depth, move, search.stats)
+		except SearchTimeout:
+			pass
+
+	def analyze(self, board, player=None, max_depth=None):
+		"""
+		A generator for hints and analysis tools. Searches the board one ply deeper
+		at a time for the player (this one by default), and after each depth yields
+		an Analysis with the score of every legal move and the principal variation.
+		It goes as deep as max_depth, or the difficulty level if that isn't given
+		(to the end of the game without either). Stop iterating whenever you like,
+		or call stop_analyzing() from another thread to end it mid-depth. It shares
+		this player's transposition table, so it also helps the next pick_move().
+		"""
+		if player == None:
+			player = self.player_ID
+		if max_depth == None:
+			max_depth = self.difficulty_level
+
+		search = Search(self.table, seed=0, evaluator=self.evaluator)
+		self.analysis_search = search
+		yield from search.analyze(make_othello(board), player, max_depth)
+
+	def stop_analyzing(self):
+		"""
+		Ends the running analyze() at its next clock check. Meant to be called from
+		another thread.
+		"""
+		search = self.analysis_search
+		if search != None:
+			search.stop()
+
+	def close(self):
+		"""
+		Stops pondering, shuts down any worker processes this player started, and
+		closes its book.
+		"""
+		self.stop_pondering()
+		if self.parallel_search != None:
+			self.parallel_search.close()
+		if self.batch_pool != None:
+			self.batch_pool.shutdown()
+			self.batch_pool = None
+		if self.book != None:
+			self.book.close()
+
+	def get_table_stats(self):
+		"""
+		Returns the transposition table's hit/miss and store counters, as a dict.
 		"""
-		othello = Othello(board)
-		return othello.get_best_move(self.player_ID, self.difficulty_level)
\ No newline at end of file
+		return self.table.get_stats()
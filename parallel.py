@@ -0,0 +1,181 @@
+"""
+Root-parallel search. Each root move is searched as its own task on a process
+pool, and every task starts from the best score any worker has found so far,
+which the workers share through a multiprocessing.Value.
+
+Results are deterministic for a given seed. Each task gets a fresh Search and
+transposition table, and searches with a window one below the shared alpha, so
+any move that could be best (or tie for best) gets an exact score no matter
+which worker finished first. Moves that fail low can't be best anyway.
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from search import INFINITY, Search, SearchStats, SearchTimeout
+from transposition import TranspositionTable
+
+_shared_alpha = None
+
+def _init_worker(shared_alpha):
+	"""
+	Pool initializer: keeps the shared alpha where the tasks can find it.
+	"""
+	global _shared_alpha
+	_shared_alpha = shared_alpha
+
+def _search_move(state, player, move, plies, seed, table_entries, deadline, evaluator=None):
+	"""
+	Pool task: returns the score of one root move, or None if the deadline (a
+	time.time() value, or None) passed first, along with the task's SearchStats.
+	"""
+	search = Search(TranspositionTable(table_entries), seed=seed, evaluator=evaluator)
+	if deadline is not None:
+		search.deadline = time.perf_counter() + (deadline - time.time())
+
+	# scores are whole numbers, so anything tied with alpha still comes back exact
+	alpha = _shared_alpha.value - 1
+	undo = state.make_move(move, player)
+	try:
+		score = -search.negamax(state, 3 - player, plies - 1, -INFINITY, -alpha, 1)
+	except SearchTimeout:
+		return (None, search.stats)
+	finally:
+		state.unmake_move(move, player, undo)
+
+	with _shared_alpha.get_lock():
+		if score > _shared_alpha.value:
+			_shared_alpha.value = score
+
+	search.stats.table_hits = search.table.hits
+	search.stats.table_misses = search.table.misses
+	return (score, search.stats)
+
+class ParallelSearch:
+	"""
+	Spreads the root moves of a search across a pool of worker processes.
+
+	Attributes:
+		workers:		the number of worker processes.
+		table_entries:	the transposition table size for each task.
+		pool:			the ProcessPoolExecutor, started when first needed.
+		stats:			a SearchStats for the last search, adding up all the workers.
+		evaluator:		what the searches score leaves with, as in Search.
+	"""
+	def __init__(self, workers, table_entries=1 << 16, evaluator=None):
+		"""
+		Constructor, takes the number of worker processes, the size of each
+		task's transposition table, and what to score the leaves with.
+		"""
+		assert workers > 0, "There must be at least one worker!"
+		self.workers = workers
+		self.table_entries = table_entries
+		self.evaluator = evaluator
+		self.shared_alpha = multiprocessing.Value("d", -INFINITY)
+		self.pool = None
+		self.stats = SearchStats()
+
+	def _get_pool(self):
+		"""
+		Returns the process pool, starting it if need be.
+		"""
+		if self.pool is None:
+			self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.shared_alpha,))
+		return self.pool
+
+	def close(self):
+		"""
+		Shuts down the worker processes.
+		"""
+		if self.pool is not None:
+			self.pool.shutdown()
+			self.pool = None
+
+	def get_best_move(self, state, player, plies, seed=None):
+		"""
+		Returns the best (x, y) location for the player, looking ahead by the given
+		number of plies, or None if he has no moves. Chooses the same move as
+		Search.get_best_move would with the same seed.
+		"""
+		start = time.perf_counter()
+		self.stats = SearchStats()
+		move = self._run_iteration(state, player, plies, seed)[0]
+		self.stats.seconds = time.perf_counter() - start
+		if move is None:
+			return None
+		return state.get_location(move)
+
+	def iterative_deepening(self, state, player, max_plies=None, time_ms=None, seed=None):
+		"""
+		Like Search.iterative_deepening, but each iteration past the first is
+		searched in parallel. Returns the best (x, y) location from the deepest
+		iteration that finished, or None if the player has no moves.
+		"""
+		start = time.perf_counter()
+		self.stats = SearchStats()
+		deadline = None if time_ms is None else time.time() + time_ms / 1000
+
+		moves = state.get_moves(player)
+		if len(moves) < 2:
+			return state.get_location(moves[0]) if moves else None
+
+		limit = state.get_state_value(0)
+		if max_plies is not None:
+			limit = min(limit, max_plies)
+
+		search = Search(seed=seed, evaluator=self.evaluator)
+		best_move = search._run_iteration(state, player, 1)
+		self.stats = search.stats
+		for depth in range(2, limit + 1):
+			move, finished = self._run_iteration(state, player, depth, seed, best_move, deadline)
+			if not finished:
+				break
+			best_move = move
+			if deadline is not None and time.time() >= deadline:
+				break
+
+		self.stats.seconds = time.perf_counter() - start
+		return state.get_location(best_move)
+
+	def _run_iteration(self, state, player, plies, seed, first_move=None, deadline=None):
+		"""
+		_search_root(), recording the iteration in the stats if it finishes.
+		"""
+		nodes = self.stats.nodes
+		start = time.perf_counter()
+		move, finished = self._search_root(state, player, plies, seed, first_move, deadline)
+		if finished:
+			self.stats.iterations.append((plies, self.stats.nodes - nodes, time.perf_counter() - start))
+			self.stats.depth = plies
+		return (move, finished)
+
+	def _search_root(self, state, player, plies, seed, first_move=None, deadline=None):
+		"""
+		Searches each root move on the pool. Returns the best move (in the form
+		get_moves() uses) and whether every task finished before the deadline.
+		"""
+		moves = Search(seed=seed)._order_moves(state, state.get_moves(player), first_move, 0)
+
+		self.shared_alpha.value = -INFINITY
+		pool = self._get_pool()
+		futures = [pool.submit(_search_move, state, player, move, plies, seed, self.table_entries, deadline, self.evaluator) for move in moves]
+
+		best_move = (None, -INFINITY)
+		finished = True
+		for move, future in zip(moves, futures):
+			score, stats = future.result()
+			stats.max_ply += 1
+			self.stats.merge(stats)
+			if score is None:
+				finished = False
+				continue
+
+			if score > best_move[1]:
+				best_move = (move, score)
+
+			if score == best_move[1]:
+				# we prefer corner to edge to other locations.
+				if best_move[0] is None or state.get_move_type(move) > state.get_move_type(best_move[0]):
+					best_move = (move, score)
+
+		return (best_move[0], finished)
@@ -0,0 +1,257 @@
+"""
+A pattern-table evaluation for 8x8 boards, much stronger than counting discs.
+
+A position is scored from the point of view of the player to move as the sum
+of one weight per pattern instance, plus a weight times his mobility (his
+number of moves minus his opponent's) and a constant. A pattern is a fixed
+line or block of squares: the edge, the second row, the 3x3 corner block and
+the diagonals of length 4 to 8. Each instance's contents, read as a base-3
+number (0 empty, 1 the player's, 2 his opponent's), index into its pattern's
+table. Every symmetric copy of a pattern on the board shares one table, in
+which contents that are reflections of each other share a weight, and there is
+a separate set of tables for each stage of the game. Scores are in
+discs, an estimate of the final disc difference, so they mix with the exact
+scores of finished games.
+
+Weight file format (all integers big-endian):
+	header:	8-byte magic "OTHPAT01", number of stages, plies per stage, weight
+			scale (2 bytes each), weights per stage (4 bytes)
+	body:	zlib-compressed signed 2-byte weights, every stage's pattern tables
+			in PATTERNS order, then its mobility weight and its constant. A
+			weight of w is worth w / scale discs. Only the weight at each
+			index get_canonical() gives is used.
+
+trainpatterns.py fits the weights from game records.
+"""
+import struct
+import sys
+import zlib
+from array import array
+
+from bitboard import BitboardOthello
+
+################################################################################
+# CONSTANTS
+################################################################################
+
+MAGIC = b"OTHPAT01"
+HEADER = struct.Struct(">8sHHHI")
+
+# (name, number of squares) for each pattern, in the order their tables are stored
+PATTERNS = (("edge", 8), ("row2", 8), ("corner", 9), ("diag8", 8), ("diag7", 7), ("diag6", 6), ("diag5", 5), ("diag4", 4))
+
+# where each pattern's table starts among a stage's weights, and how many there are
+OFFSETS = {}
+PATTERN_WEIGHTS = 0
+for _name, _squares in PATTERNS:
+	OFFSETS[_name] = PATTERN_WEIGHTS
+	PATTERN_WEIGHTS += 3 ** _squares
+
+# pattern instances on a board: 4 each of the edge, second row and corner, 2 of
+# the long diagonal, and 4 of each shorter diagonal
+INSTANCES = 30
+
+# the mobility weight and the constant come after the pattern tables
+MOBILITY = PATTERN_WEIGHTS
+CONSTANT = PATTERN_WEIGHTS + 1
+STAGE_WEIGHTS = PATTERN_WEIGHTS + 2
+
+# the list get_canonical() returns, made the first time it's asked for
+_canonical = None
+
+def get_canonical():
+	"""
+	Returns, for each of a stage's weights, the one it is tied to: the lower of
+	its index and that of its pattern read the other way round (reversed for the
+	lines, transposed for the corner block), as a reflection of the board reads it.
+	It takes a fair fraction of a second to work out, so it's only done when a
+	weight file is loaded or trained, not whenever this module is imported.
+	"""
+	global _canonical
+	if _canonical != None:
+		return _canonical
+
+	canonical = list(range(STAGE_WEIGHTS))
+	for name, squares in PATTERNS:
+		if name == "corner":
+			order = [3 * (i % 3) + i // 3 for i in range(squares)]
+		else :
+			order = list(range(squares - 1, -1, -1))
+		for index in range(3 ** squares):
+			digits = [index // 3 ** i % 3 for i in range(squares)]
+			reflected = sum(digits[order[i]] * 3 ** i for i in range(squares))
+			canonical[OFFSETS[name] + index] = OFFSETS[name] + min(index, reflected)
+	_canonical = canonical
+	return canonical
+
+# for a bitset of squares, the base-3 number with a 1 digit for each of them
+_BASE3 = [sum(3 ** i for i in range(9) if bits >> i & 1) for bits in range(512)]
+
+# each byte with its bits in reverse order, for mirroring the board
+_REVERSED = bytes(int(format(i, "08b")[::-1], 2) for i in range(256))
+
+# the squares (k + i, i) of the diagonal k files right of the main one
+_DIAGONALS = [sum(1 << (9 * i + k) for i in range(8 - k)) for k in range(5)]
+_GATHER = 0x0101010101010101
+
+################################################################################
+# FEATURES
+################################################################################
+
+def flip_vertical(bitboard):
+	"""
+	Returns the bitboard turned upside down, (x, y) -> (x, 7 - y).
+	"""
+	return int.from_bytes(bitboard.to_bytes(8, "big"), "little")
+
+def mirror_horizontal(bitboard):
+	"""
+	Returns the bitboard mirrored left to right, (x, y) -> (7 - x, y).
+	"""
+	return int.from_bytes(bitboard.to_bytes(8, "little").translate(_REVERSED), "little")
+
+def transpose(bitboard):
+	"""
+	Returns the bitboard flipped about its main diagonal, (x, y) -> (y, x).
+	"""
+	t = 0x0F0F0F0F00000000 & (bitboard ^ (bitboard << 28))
+	bitboard ^= t ^ (t >> 28)
+	t = 0x3333000033330000 & (bitboard ^ (bitboard << 14))
+	bitboard ^= t ^ (t >> 14)
+	t = 0x5500550055005500 & (bitboard ^ (bitboard << 7))
+	bitboard ^= t ^ (t >> 7)
+	return bitboard
+
+def get_feature_indexes(own, opp):
+	"""
+	Returns the index, among a stage's weights, of every pattern instance on the
+	board, where own holds the tokens of the player to move and opp his opponent's.
+	"""
+	# the board turned every way the patterns need: mirrored, upside down, both,
+	# transposed, and transposed and upside down
+	own_h, opp_h = mirror_horizontal(own), mirror_horizontal(opp)
+	own_v, opp_v = flip_vertical(own), flip_vertical(opp)
+	own_hv, opp_hv = flip_vertical(own_h), flip_vertical(opp_h)
+	own_t, opp_t = transpose(own), transpose(opp)
+	own_tv, opp_tv = flip_vertical(own_t), flip_vertical(opp_t)
+	base3 = _BASE3
+	indexes = []
+
+	# the top two rows of the board turned so that each side is on top
+	edge, row2 = OFFSETS["edge"], OFFSETS["row2"]
+	for o, p in ((own, opp), (own_v, opp_v), (own_t, opp_t), (own_tv, opp_tv)):
+		indexes.append(edge + base3[o & 0xFF] + 2 * base3[p & 0xFF])
+		indexes.append(row2 + base3[(o >> 8) & 0xFF] + 2 * base3[(p >> 8) & 0xFF])
+
+	# the top left 3x3 block of the board turned so that each corner is there
+	corner = OFFSETS["corner"]
+	for o, p in ((own, opp), (own_h, opp_h), (own_v, opp_v), (own_hv, opp_hv)):
+		o = (o & 7) | ((o >> 5) & 0x38) | ((o >> 10) & 0x1C0)
+		p = (p & 7) | ((p >> 5) & 0x38) | ((p >> 10) & 0x1C0)
+		indexes.append(corner + base3[o] + 2 * base3[p])
+
+	# multiplying gathers a diagonal's squares (all in different files) into the top byte
+	boards = ((own, opp), (own_h, opp_h), (own_t, opp_t), (own_tv, opp_tv))
+	for k, name in enumerate(("diag8", "diag7", "diag6", "diag5", "diag4")):
+		offset, mask = OFFSETS[name], _DIAGONALS[k]
+		# the long diagonals are their own transposes, so they only come twice
+		for o, p in (boards[:2] if k == 0 else boards):
+			o = ((o & mask) * _GATHER >> 56 & 0xFF) >> k
+			p = ((p & mask) * _GATHER >> 56 & 0xFF) >> k
+			indexes.append(offset + base3[o] + 2 * base3[p])
+
+	return indexes
+
+def get_stage(own, opp, plies_per_stage, stages):
+	"""
+	Returns which stage of the game a position is in, by how many plies in it is.
+	"""
+	return min(((own | opp).bit_count() - 4) // plies_per_stage, stages - 1)
+
+################################################################################
+# EVALUATION
+################################################################################
+
+# PatternEvaluators already loaded in this process, by path
+_loaded = {}
+
+class PatternEvaluator:
+	"""
+	Scores positions with pattern tables. Pass one to Search (or ComputerPlayer)
+	to use it in place of the disc count.
+
+	Attributes:
+		path:				the weight file it was loaded from.
+		stages:				the number of game stages with their own weights.
+		plies_per_stage:	how many plies each stage covers (the last one covers the rest).
+		scale:				how many weight units make a disc.
+		weights:			a list of each stage's weights, as ints.
+	"""
+	def __init__(self, path):
+		"""
+		Constructor, loads the weight file at the given path.
+		"""
+		self.path = path
+		with open(path, "rb") as f:
+			data = f.read()
+
+		magic, self.stages, self.plies_per_stage, self.scale, count = HEADER.unpack_from(data, 0)
+		assert magic == MAGIC, path + " is not a pattern weight file!"
+		assert count == STAGE_WEIGHTS, path + " was made for different patterns!"
+
+		values = array("h", zlib.decompress(data[HEADER.size:]))
+		if sys.byteorder == "little":
+			values.byteswap()
+		# looked up by every index, not just the canonical ones, to save a step per instance
+		canonical = get_canonical()
+		self.weights = []
+		for stage in range(self.stages):
+			weights = values[stage * count:(stage + 1) * count]
+			self.weights.append([weights[index] for index in canonical])
+
+	@staticmethod
+	def load(path):
+		"""
+		Returns the PatternEvaluator for the weight file at the path, loading it
+		only the first time in each process.
+		"""
+		if path not in _loaded:
+			_loaded[path] = PatternEvaluator(path)
+		return _loaded[path]
+
+	def __reduce__(self):
+		# worker processes load the file themselves instead of being sent every weight
+		return (PatternEvaluator.load, (self.path,))
+
+	def evaluate(self, state, player):
+		"""
+		Returns the estimated final disc difference for the player, whose turn it
+		is. Finished games get their exact score, and boards that aren't 8x8 are
+		just counted.
+		"""
+		if not isinstance(state, BitboardOthello):
+			return state.evaluate(player)
+
+		own, opp = state.tokens[player], state.tokens[3 - player]
+		own_moves = state._get_move_mask(player).bit_count()
+		opp_moves = state._get_move_mask(3 - player).bit_count()
+		if not own_moves and not opp_moves:
+			return own.bit_count() - opp.bit_count()
+
+		weights = self.weights[get_stage(own, opp, self.plies_per_stage, self.stages)]
+		total = weights[MOBILITY] * (own_moves - opp_moves) + weights[CONSTANT]
+		for index in get_feature_indexes(own, opp):
+			total += weights[index]
+		return (total + self.scale // 2) // self.scale
+
+def write_weights(path, weights, plies_per_stage, scale):
+	"""
+	Writes a weight file from a list of each stage's weights (STAGE_WEIGHTS ints
+	each, already multiplied by the scale).
+	"""
+	values = array("h", [max(-32768, min(32767, int(value))) for stage in weights for value in stage])
+	if sys.byteorder == "little":
+		values.byteswap()
+	with open(path, "wb") as f:
+		f.write(HEADER.pack(MAGIC, len(weights), plies_per_stage, scale, STAGE_WEIGHTS))
+		f.write(zlib.compress(values.tobytes(), 9))
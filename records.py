@@ -0,0 +1,210 @@
+"""
+A compact binary format for finished games, about one byte per move, with a
+streaming writer and a reader that yields one game at a time, so files of
+millions of games can be written and scanned without holding them in memory.
+
+Passes aren't stored: whenever the recorded move isn't legal for the player to
+move, he must have passed. Player names go in the file header once, and each
+game refers to them by index.
+
+File format (all integers big-endian):
+	header:	8-byte magic "OTHGAME1", number of player names (1 byte), then each
+			name as its length (1 byte) and UTF-8 bytes
+	game:	width, player 1's name index, player 1's level, player 2's name
+			index, player 2's level, number of moves (1 byte each), final score
+			as player 1's tokens minus player 2's (2 bytes, signed), then each
+			move's square y*width + x (1 byte each)
+
+Run this file to print statistics about a record file:
+
+	python3 records.py games.bin
+"""
+import os
+import struct
+import sys
+import time
+
+from othelloplayer import make_othello
+
+################################################################################
+# CONSTANTS
+################################################################################
+
+MAGIC = b"OTHGAME1"
+GAME = struct.Struct(">BBBBBBh")
+
+# squares (0 to width*width - 1) and move counts have to fit in a byte
+MAX_WIDTH = 16
+
+################################################################################
+# RECORDS
+################################################################################
+
+class GameRecord:
+	"""
+	One finished game.
+
+	Attributes:
+		width:		the board width.
+		players:	the names of players 1 and 2 (white and black).
+		levels:		the levels of players 1 and 2 (0 if they had none).
+		moves:		the list of (x, y) locations played, with no passes.
+		score:		player 1's final token count minus player 2's.
+	"""
+	def __init__(self, width, players, levels, moves, score):
+		"""
+		Constructor, takes each of the attributes.
+		"""
+		self.width = width
+		self.players = players
+		self.levels = levels
+		self.moves = moves
+		self.score = score
+
+	def get_winner(self):
+		"""
+		Returns the player who won (1 or 2), or 0 for a tie.
+		"""
+		return 1 if self.score > 0 else 2 if self.score < 0 else 0
+
+	def replay(self):
+		"""
+		Generator that plays the game through, yielding (state, player, location)
+		before each move, where state is the game state as the player is about to
+		play at location. The same state is played on throughout, so copy it to
+		keep it past the next step.
+		"""
+		game = make_othello(None, self.width)
+		player = 2
+		for move in self.moves:
+			if not game.get_flipped(move, player):
+				player = 3 - player
+			yield (game, player, move)
+			game.play_move(move, player)
+			player = 3 - player
+
+################################################################################
+# WRITING
+################################################################################
+
+def check_width(width):
+	"""
+	Raises a ValueError if games on a board of the given width can't be recorded.
+	"""
+	if width > MAX_WIDTH:
+		raise ValueError("boards wider than " + str(MAX_WIDTH) + " can't be recorded, not " + str(width))
+
+class GameWriter:
+	"""
+	Writes games to a record file as they're played. Use it as a context manager,
+	or call close() when done.
+
+	Attributes:
+		names:	the player names in the file header, which games refer to by index.
+		games:	the number of games written so far.
+	"""
+	def __init__(self, path, names):
+		"""
+		Constructor, creates the record file at the given path (replacing any that
+		was there) with the list of player names in its header.
+		"""
+		assert len(names) < 256, "too many player names!"
+		self.names = list(names)
+		self.games = 0
+		self.file = open(path, "wb")
+
+		header = bytearray(MAGIC)
+		header.append(len(self.names))
+		for name in self.names:
+			encoded = name.encode("utf-8")
+			header.append(len(encoded))
+			header += encoded
+		self.file.write(header)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exception):
+		self.close()
+
+	def write_game(self, width, moves, score, players = (0, 0), levels = (0, 0)):
+		"""
+		Adds a game: its list of (x, y) moves (passes left out), player 1's tokens
+		minus player 2's at the end, and the name indexes and levels of players 1
+		and 2 (a level of None is stored as 0).
+		"""
+		check_width(width)
+		squares = bytes(y * width + x for x, y in moves)
+		levels = [level or 0 for level in levels]
+		self.file.write(GAME.pack(width, players[0], levels[0], players[1], levels[1], len(squares), score) + squares)
+		self.games += 1
+
+	def close(self):
+		"""
+		Flushes and closes the file.
+		"""
+		self.file.close()
+
+################################################################################
+# READING
+################################################################################
+
+def read_games(path):
+	"""
+	Generator that yields each GameRecord in a record file, in order, reading
+	only one game at a time. A game cut short at the end of the file (by a writer
+	that was killed) is left out.
+	"""
+	with open(path, "rb") as f:
+		assert f.read(len(MAGIC)) == MAGIC, path + " is not a game record file!"
+		names = []
+		for _ in range(f.read(1)[0]):
+			names.append(f.read(f.read(1)[0]).decode("utf-8"))
+
+		while True:
+			data = f.read(GAME.size)
+			if len(data) < GAME.size:
+				return
+			width, player1, level1, player2, level2, count, score = GAME.unpack(data)
+			squares = f.read(count)
+			if len(squares) < count:
+				return
+			moves = [(square % width, square // width) for square in squares]
+			yield GameRecord(width, (names[player1], names[player2]), (level1, level2), moves, score)
+
+################################################################################
+# COMMAND LINE
+################################################################################
+
+def print_help(output = sys.stderr):
+	"""
+	Print out a help screen for the user (probably to stderr).
+	"""
+	print("Usage: python3 " +sys.argv[0]+ " <record file> <options>", file=output)
+	print("Options include:", file=output)
+	print("\t-h\tprint this help", file=output)
+	print("\t-r\talso replay every game, to check it and time replaying", file=output)
+
+if __name__ == "__main__":
+	args = sys.argv[1:]
+	if "-h" in args or "--help" in args or not args:
+		print_help()
+		sys.exit(1)
+
+	path = args[0]
+	replay = "-r" in args
+	games = moves = 0
+	wins = {0: 0, 1: 0, 2: 0}
+	start = time.perf_counter()
+	for record in read_games(path):
+		games += 1
+		moves += len(record.moves)
+		wins[record.get_winner()] += 1
+		if replay:
+			for state, player, move in record.replay():
+				assert state.get_flipped(move, player), "illegal move " + str(move) + " in game " + str(games)
+	seconds = time.perf_counter() - start
+
+	print(str(games) + " games, " + str(moves) + " moves, in %.2fs (%.0f games/s)" % (seconds, games / seconds if seconds else 0.0))
+	print("%.1f bytes per game, %.2f per move" % (os.path.getsize(path) / max(games, 1), os.path.getsize(path) / max(moves, 1)))
+	print("white wins: " + str(wins[1]) + ", black wins: " + str(wins[2]) + ", ties: " + str(wins[0]))
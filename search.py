@@ -0,0 +1,618 @@
+"""
+The negamax search used by ComputerPlayer. It works on any game state that
+provides get_moves(), make_move(), unmake_move(), get_location(),
+get_move_type(), evaluate(), copy() and a Zobrist "key" attribute, which both
+Othello and BitboardOthello do. Moves are played and taken back on a single
+state, so the search never copies the board.
+
+Unlike Othello.negamax, scores here are always from the point of view of the
+player whose turn it is, and a player with no moves passes instead of losing.
+Scores must be whole numbers, since the principal variation search tells a
+move that beats alpha from one that doesn't with a window one wide.
+"""
+import random
+import time
+
+from transposition import EXACT, LOWER, UPPER, get_zobrist_keys
+
+INFINITY = float("inf")
+
+# how many nodes to visit between looks at the clock
+CLOCK_CHECK_INTERVAL = 64
+
+# how far either side of the score from two plies shallower iterative deepening
+# looks first. Scores swing a long way between odd and even depths (whoever moved
+# last is ahead), but usually stay within a couple of discs of the last search
+# to the same parity.
+DEFAULT_ASPIRATION_WINDOW = 3
+
+def get_square_priority(location, width):
+	"""
+	Returns a static guess at how good a square is to play on, for move ordering.
+	Corners are best (4), then edges (3), then the middle (2). The edge squares
+	next to a corner (1) and the squares diagonally inside a corner (0) come last,
+	since they tend to give the corner away.
+	"""
+	last = width - 1
+	x = min(location[0], last - location[0])
+	y = min(location[1], last - location[1])
+	if x == 0 and y == 0:
+		return 4
+	if x <= 1 and y <= 1:
+		return 0 if x == y else 1
+	if x == 0 or y == 0:
+		return 3
+	return 2
+
+class SearchTimeout(Exception):
+	"""
+	Raised from inside the search when its deadline passes, to unwind the
+	unfinished iteration.
+	"""
+	pass
+
+class SearchStats:
+	"""
+	What a single search did, so a slow move can be put down to poor pruning
+	(low cutoff-on-first-move rate, high branching factor) or to slow move
+	generation (low nodes per second).
+
+	Attributes:
+		nodes:				the number of positions searched below the root.
+		leaves:				how many of those were scored by evaluate().
+		cutoffs:			the number of beta cutoffs.
+		first_move_cutoffs:	how many of those came from the first move searched.
+		max_ply:			the deepest ply reached, counting passes.
+		depth:				the deepest iteration that finished.
+		iterations:			a (depth, nodes, seconds) tuple for each finished iteration,
+							counting only that iteration's nodes and time.
+		seconds:			the time the whole search took.
+		table_hits:			transposition table hits during this search.
+		table_misses:		transposition table misses during this search.
+		from_book:			True if the move came from an opening book, with nothing searched.
+		from_ponder:		True if the move was found on the opponent's time, by pondering.
+	"""
+	def __init__(self):
+		"""
+		Constructor. Every counter starts at zero.
+		"""
+		self.nodes = 0
+		self.leaves = 0
+		self.cutoffs = 0
+		self.first_move_cutoffs = 0
+		self.max_ply = 0
+		self.depth = 0
+		self.iterations = []
+		self.seconds = 0.0
+		self.table_hits = 0
+		self.table_misses = 0
+		self.from_book = False
+		self.from_ponder = False
+
+	def merge(self, other):
+		"""
+		Adds the node and cutoff counters of another search (from a parallel
+		worker) to these.
+		"""
+		self.nodes += other.nodes
+		self.leaves += other.leaves
+		self.cutoffs += other.cutoffs
+		self.first_move_cutoffs += other.first_move_cutoffs
+		self.max_ply = max(self.max_ply, other.max_ply)
+		self.table_hits += other.table_hits
+		self.table_misses += other.table_misses
+
+	def get_cutoff_rate(self):
+		"""
+		Returns the fraction of beta cutoffs that came from the first move searched,
+		which is how often move ordering guessed right. 0 if there were no cutoffs.
+		"""
+		return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+	def get_branching_factor(self):
+		"""
+		Returns the effective branching factor: how many times more nodes the last
+		iteration took than the one before it, or the depth-th root of the nodes
+		if only one iteration finished. 0 if there's nothing to go on.
+		"""
+		if len(self.iterations) >= 2 and self.iterations[-2][1]:
+			return self.iterations[-1][1] / self.iterations[-2][1]
+		if self.iterations and self.iterations[-1][0] and self.iterations[-1][1]:
+			return self.iterations[-1][1] ** (1 / self.iterations[-1][0])
+		return 0.0
+
+	def get_nodes_per_second(self):
+		"""
+		Returns the search speed, or 0 if no time was recorded.
+		"""
+		return self.nodes / self.seconds if self.seconds else 0.0
+
+	def to_dict(self):
+		"""
+		Returns the counters and the figures derived from them, as a dict.
+		"""
+		return {
+			"nodes": self.nodes,
+			"leaves": self.leaves,
+			"cutoffs": self.cutoffs,
+			"first_move_cutoffs": self.first_move_cutoffs,
+			"cutoff_rate": self.get_cutoff_rate(),
+			"max_ply": self.max_ply,
+			"depth": self.depth,
+			"iterations": [{"depth": depth, "nodes": nodes, "seconds": seconds} for depth, nodes, seconds in self.iterations],
+			"seconds": self.seconds,
+			"nodes_per_second": self.get_nodes_per_second(),
+			"branching_factor": self.get_branching_factor(),
+			"table_hits": self.table_hits,
+			"table_misses": self.table_misses,
+			"from_book": self.from_book,
+			"from_ponder": self.from_ponder,
+		}
+
+	def __str__(self):
+		"""
+		Returns a one-line summary.
+		"""
+		if self.from_book:
+			return "book move in %.3fs" % self.seconds
+		return "%sdepth %d (max ply %d), %d nodes, %d leaves in %.3fs (%.0f nodes/s), %d cutoffs (%.0f%% on first move), EBF %.2f, table %d/%d hits" % (
+			"pondered, " if self.from_ponder else "",
+			self.depth, self.max_ply, self.nodes, self.leaves, self.seconds, self.get_nodes_per_second(),
+			self.cutoffs, 100 * self.get_cutoff_rate(), self.get_branching_factor(),
+			self.table_hits, self.table_hits + self.table_misses)
+
+class Analysis:
+	"""
+	What Search.analyze() found after finishing one depth.
+
+	Attributes:
+		depth:		the number of plies searched.
+		scores:		each legal move's (x, y) location and its exact score for the player
+					to move, best first.
+		pv:			the principal variation: the (x, y) locations both players are
+					expected to play, starting with the best move. A pass is None.
+		nodes:		the positions searched so far, over every depth.
+		seconds:	the time taken so far.
+	"""
+	def __init__(self, depth, scores, pv, nodes, seconds):
+		"""
+		Constructor, takes everything above.
+		"""
+		self.depth = depth
+		self.scores = scores
+		self.pv = pv
+		self.nodes = nodes
+		self.seconds = seconds
+
+	def get_best_move(self):
+		"""
+		Returns the (x, y) location of the best move.
+		"""
+		return self.pv[0]
+
+class Search:
+	"""
+	An alpha-beta negamax search, backed by an optional transposition table.
+
+	Moves are ordered with the hash move (or the previous iteration's best move at
+	the root) first, then killer moves, then by static square priority and the
+	history heuristic. A seeded shuffle breaks whatever ties are left.
+
+	By default it is a principal variation search: only the first move at each
+	node gets the full window, and the rest are searched with a null window to
+	prove they are no better, and searched again only if they are. The root does
+	the same, with alpha carried over from one root move to the next, and
+	iterative deepening starts each iteration with an aspiration window around
+	the last iteration's score.
+
+	Attributes:
+		table:		a TranspositionTable, or None to search without one. Passing the
+					same table to every search lets results carry over between moves.
+		ordering:	whether to order moves at all. Without it, moves are only shuffled,
+					which is mostly useful as a baseline for node counts.
+		rng:		the random.Random used for tie-breaks.
+		deadline:	a time.perf_counter() value after which the search gives up, or
+					None for no limit.
+		stats:		a SearchStats for everything searched so far.
+		killers:	for each ply, the last two moves there that caused a beta cutoff.
+		history:	for each move, a score that grows every time it causes a cutoff.
+		evaluator:	an object whose evaluate(state, player) scores the leaves (such as
+					a PatternEvaluator), or None to score them with state.evaluate().
+					Finished games are always scored with state.evaluate().
+		pvs:		whether to do a principal variation search. Without it, every
+					move is searched with the full window (root moves with an
+					infinite one), which is mostly useful as a baseline for node counts.
+		aspiration:	the half-width of iterative deepening's aspiration windows, or
+					None to search every iteration with an infinite window.
+		root_scores: for each root move searched, its score. Only the best move's
+					score is exact: with pvs, the others are upper bounds.
+		depth_scores: the best score found by each iteration of iterative deepening.
+		multi_pv:	whether every root move gets an exact score (and the full window),
+					as analyze() needs.
+	"""
+	def __init__(self, table=None, ordering=True, seed=None, evaluator=None, pvs=True, aspiration=DEFAULT_ASPIRATION_WINDOW):
+		"""
+		Constructor, takes the transposition table to use, whether to order moves,
+		the seed for tie-breaks, what to score the leaves with, whether to do a
+		principal variation search, and the aspiration window.
+		"""
+		self.table = table
+		self.ordering = ordering
+		self.evaluator = evaluator
+		self.pvs = pvs
+		self.aspiration = aspiration
+		self.multi_pv = False
+		self.rng = random.Random(seed)
+		self.deadline = None
+		self.stats = SearchStats()
+		self.killers = {}
+		self.history = {}
+		self.priorities = {}
+		self.root_scores = {}
+		self.depth_scores = {}
+
+	def get_best_move(self, state, player, plies):
+		"""
+		Returns the best (x, y) location for the player, looking ahead by the given
+		number of plies, or None if he has no moves.
+		Ties are broken in favor of corners, then edges.
+		"""
+		self._start_stats()
+		if self.table is not None:
+			self.table.new_search()
+
+		move = self._run_iteration(state, player, plies)
+		self._finish_stats()
+		if move is None:
+			return None
+		return state.get_location(move)
+
+	def iterative_deepening(self, state, player, max_plies=None, time_ms=None):
+		"""
+		Searches 1, 2, 3... plies deep until max_plies is reached, the game's end is
+		in sight, or time_ms milliseconds have passed. Returns the best (x, y)
+		location from the deepest search that finished, or None if the player has
+		no moves. The 1-ply search always finishes, however short the time.
+		"""
+		start = self._start_stats()
+		if self.table is not None:
+			self.table.new_search()
+
+		# a timeout leaves moves played on the board, so search a copy
+		state = state.copy()
+
+		moves = state.get_moves(player)
+		if len(moves) < 2:
+			self._finish_stats()
+			return state.get_location(moves[0]) if moves else None
+
+		# searching past the last empty square can't change anything
+		limit = state.get_state_value(0)
+		if max_plies is not None:
+			limit = min(limit, max_plies)
+
+		self.root_scores = {}
+		self.depth_scores = {}
+		best_move = self._run_iteration(state, player, 1)
+
+		# stop() may already have set a deadline, which this mustn't push back
+		if time_ms is not None and self.deadline is None:
+			self.deadline = start + time_ms / 1000
+		try:
+			for depth in range(2, limit + 1):
+				best_move = self._run_iteration(state, player, depth, best_move)
+				if self.deadline is not None and time.perf_counter() >= self.deadline:
+					break
+		except SearchTimeout:
+			pass
+		finally:
+			self.deadline = None
+
+		self._finish_stats()
+		return state.get_location(best_move)
+
+	def analyze(self, state, player, max_plies=None):
+		"""
+		A generator that searches 1, 2, 3... plies deep like iterative_deepening(),
+		but scores every root move exactly, and yields an Analysis after each depth.
+		It ends after max_plies, once the game's end is in sight, or at the next
+		clock check after stop() is called. Nothing is searched while the caller
+		isn't asking for the next depth, so callers can stop whenever they like.
+		"""
+		self._start_stats()
+		if self.table is not None:
+			self.table.new_search()
+
+		# a timeout leaves moves played on the board, so search a copy
+		state = state.copy()
+		if not state.get_moves(player):
+			return
+
+		limit = state.get_state_value(0)
+		if max_plies is not None:
+			limit = min(limit, max_plies)
+
+		self.root_scores = {}
+		self.depth_scores = {}
+		self.multi_pv = True
+		best_move = None
+		try:
+			for depth in range(1, limit + 1):
+				best_move = self._run_iteration(state, player, depth, best_move)
+				self._finish_stats()
+				moves = sorted(self.root_scores, key=lambda move: (move != best_move, -self.root_scores[move]))
+				scores = {state.get_location(move): self.root_scores[move] for move in moves}
+				pv = self.get_principal_variation(state, player, best_move, depth)
+				yield Analysis(depth, scores, pv, self.stats.nodes, self.stats.seconds)
+		except SearchTimeout:
+			pass
+		finally:
+			self.multi_pv = False
+			self.deadline = None
+
+	def get_principal_variation(self, state, player, move, plies):
+		"""
+		Returns the (x, y) locations of the moves expected after the player plays
+		move, up to plies moves in all, following the best moves stored in the
+		transposition table. A pass is None. Without a table, it's just the move.
+		"""
+		pv = [state.get_location(move)]
+		played = [(move, player, state.make_move(move, player))]
+		player = 3 - player
+		passes = 0
+		while self.table is not None and len(pv) - passes < plies:
+			moves = state.get_moves(player)
+			if not moves:
+				if not state.get_moves(3 - player):
+					break
+				pv.append(None)
+				passes += 1
+				player = 3 - player
+				continue
+
+			key = state.key
+			if player == 2:
+				key ^= get_zobrist_keys(state.width)[1]
+			entry = self.table.probe(key)
+			if entry is None or entry[4] not in moves:
+				break
+			move = entry[4]
+			pv.append(state.get_location(move))
+			played.append((move, player, state.make_move(move, player)))
+			player = 3 - player
+
+		for move, mover, undo in reversed(played):
+			state.unmake_move(move, mover, undo)
+		while pv[-1] is None:
+			pv.pop()
+		return pv
+
+	def stop(self):
+		"""
+		Makes the search give up at its next clock check, as if its time had run
+		out. Meant to be called from another thread.
+		"""
+		self.deadline = 0.0
+
+	def _start_stats(self):
+		"""
+		Resets the stats for a new search, and returns its start time.
+		"""
+		self.stats = SearchStats()
+		self.start_time = time.perf_counter()
+		if self.table is not None:
+			self.start_probes = (self.table.hits, self.table.misses)
+		return self.start_time
+
+	def _finish_stats(self):
+		"""
+		Records the total time and table probes of the search that just ended.
+		"""
+		self.stats.seconds = time.perf_counter() - self.start_time
+		if self.table is not None:
+			self.stats.table_hits = self.table.hits - self.start_probes[0]
+			self.stats.table_misses = self.table.misses - self.start_probes[1]
+
+	def _run_iteration(self, state, player, plies, first_move=None):
+		"""
+		_search_aspiration(), recording the iteration in the stats once it finishes.
+		"""
+		nodes = self.stats.nodes
+		start = time.perf_counter()
+		move = self._search_aspiration(state, player, plies, first_move)
+		if move is not None:
+			self.depth_scores[plies] = self.root_scores[move]
+		self.stats.iterations.append((plies, self.stats.nodes - nodes, time.perf_counter() - start))
+		self.stats.depth = plies
+		return move
+
+	def _search_aspiration(self, state, player, plies, first_move=None):
+		"""
+		_search_root() within the aspiration window around the best score from two
+		plies shallower, searching again with that side of the window opened up
+		whenever the best score falls outside it.
+		"""
+		score = self.depth_scores.get(plies - 2)
+		if not self.pvs or self.multi_pv or self.aspiration is None or score is None:
+			return self._search_root(state, player, plies, first_move)
+
+		a, b = score - self.aspiration, score + self.aspiration
+		while True:
+			move = self._search_root(state, player, plies, first_move, a, b)
+			score = self.root_scores[move]
+			if score <= a:
+				a = -INFINITY
+			elif score >= b:
+				b = INFINITY
+				first_move = move
+			else :
+				return move
+
+	def _search_root(self, state, player, plies, first_move=None, a=-INFINITY, b=INFINITY):
+		"""
+		Searches each of the player's moves and returns the best one, in the form
+		get_moves() uses, or None if he has no moves. first_move (normally the best
+		move from the last iteration) is searched first, then the rest in order of
+		their scores from the last iteration. If the best score is outside the
+		window (a, b), it is only a bound, and the search stops at the first move
+		to reach b.
+		"""
+		moves = self._order_moves(state, state.get_moves(player), first_move, 0)
+		if self.root_scores:
+			moves.sort(key=lambda move: (move != first_move, -self.root_scores.get(move, -INFINITY)))
+
+		best_move = (None, -INFINITY)
+		for move in moves:
+			undo = state.make_move(move, player)
+			if best_move[0] is None or not self.pvs or self.multi_pv:
+				score = -self.negamax(state, 3 - player, plies - 1, -b, -a, 1)
+			else :
+				# one below the best so far, so a move that ties it still gets an exact score
+				alpha = max(a, best_move[1] - 1)
+				score = -self.negamax(state, 3 - player, plies - 1, -alpha - 1, -alpha, 1)
+				if alpha < score < b:
+					score = -self.negamax(state, 3 - player, plies - 1, -b, -alpha, 1)
+			state.unmake_move(move, player, undo)
+			self.root_scores[move] = score
+			if score > best_move[1]:
+				best_move = (move, score)
+				if score >= b:
+					break
+
+			if score == best_move[1]:
+				# we prefer corner to edge to other locations.
+				if best_move[0] is None or state.get_move_type(move) > state.get_move_type(best_move[0]):
+					best_move = (move, score)
+
+		return best_move[0]
+
+	def _order_moves(self, state, moves, hash_move, ply):
+		"""
+		Returns the moves in the order they should be searched: the hash move, the
+		killer moves for this ply, then the rest by square priority and history.
+		"""
+		self.rng.shuffle(moves)
+		if not self.ordering:
+			return moves
+
+		priorities = self.priorities
+		history = self.history
+		killers = self.killers.get(ply, ())
+
+		def rank(move):
+			if move == hash_move:
+				return (3, 0, 0)
+			if move in killers:
+				return (2 - killers.index(move), 0, 0)
+			if move not in priorities:
+				priorities[move] = get_square_priority(state.get_location(move), state.width)
+			return (0, priorities[move], history.get(move, 0))
+
+		# sort() is stable, so the shuffle above only decides between equal ranks
+		moves.sort(key=rank, reverse=True)
+		return moves
+
+	def _record_cutoff(self, move, depth, ply):
+		"""
+		Remembers a move that caused a beta cutoff, as a killer for its ply and in
+		the history table.
+		"""
+		killers = self.killers.get(ply)
+		if killers is None:
+			self.killers[ply] = [move, None]
+		elif killers[0] != move:
+			killers[1] = killers[0]
+			killers[0] = move
+		self.history[move] = self.history.get(move, 0) + depth * depth
+
+	def negamax(self, state, player, depth, a, b, ply=0):
+		"""
+		Returns the value of the state for the player whose turn it is, searching
+		depth plies ahead within the window (a, b). ply is the distance from the
+		root, which is only used to look up killer moves.
+		"""
+		stats = self.stats
+		stats.nodes += 1
+		if ply > stats.max_ply:
+			stats.max_ply = ply
+		if self.deadline is not None and not stats.nodes % CLOCK_CHECK_INTERVAL:
+			if time.perf_counter() >= self.deadline:
+				raise SearchTimeout()
+
+		table = self.table
+		key = state.key
+		if player == 2:
+			key ^= get_zobrist_keys(state.width)[1]
+
+		hash_move = None
+		if table is not None:
+			entry = table.probe(key)
+			if entry is not None:
+				hash_move = entry[4]
+				if entry[1] >= depth:
+					value, bound = entry[2], entry[3]
+					if bound == EXACT:
+						return value
+					if bound == LOWER and value >= b:
+						return value
+					if bound == UPPER and value <= a:
+						return value
+
+		# a leaf is scored the same whether or not anyone can move, so don't ask
+		if depth == 0:
+			stats.leaves += 1
+			if self.evaluator is not None:
+				return self.evaluator.evaluate(state, player)
+			return state.evaluate(player)
+
+		moves = state.get_moves(player)
+		if not moves:
+			if not state.get_moves(3 - player):
+				stats.leaves += 1
+				return state.evaluate(player)
+			# no moves, so pass the turn without using up a ply. The opponent's moves
+			# are cached on the state, so the pass doesn't generate them again.
+			return -self.negamax(state, 3 - player, depth, -b, -a, ply + 1)
+
+		moves = self._order_moves(state, moves, hash_move, ply)
+
+		a_original = a
+		best = -INFINITY
+		best_move = None
+
+		for move in moves:
+			undo = state.make_move(move, player)
+			if best_move is None or not self.pvs:
+				value = -self.negamax(state, 3 - player, depth - 1, -b, -a, ply + 1)
+			else :
+				# prove the move is no better than alpha with a null window, and only
+				# pay for the full window if it is
+				value = -self.negamax(state, 3 - player, depth - 1, -a - 1, -a, ply + 1)
+				if a < value < b:
+					value = -self.negamax(state, 3 - player, depth - 1, -b, -value, ply + 1)
+			state.unmake_move(move, player, undo)
+			if value > best:
+				best = value
+				best_move = move
+
+			# Prunes low-value children. Alpha-beta.
+			if value > a:
+				a = value
+				if a >= b:
+					stats.cutoffs += 1
+					if move == moves[0]:
+						stats.first_move_cutoffs += 1
+					if self.ordering:
+						self._record_cutoff(move, depth, ply)
+					break
+
+		if table is not None:
+			if best <= a_original:
+				bound = UPPER
+			elif best >= b:
+				bound = LOWER
+			else :
+				bound = EXACT
+			table.store(key, depth, best, bound, best_move)
+
+		return best
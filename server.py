@@ -0,0 +1,321 @@
+"""
+A local HTTP/JSON server that suggests moves, for many clients at once.
+
+	python3 server.py -p 8080 -j 4
+
+POST /move with a JSON body like
+	{"board": [[0, 0, ...], ...], "player": 2, "depth": 6, "time_ms": 500}
+("depth" and "time_ms" are optional) returns
+	{"move": [x, y], "score": 4, "depth": 6, "cached": false, "coalesced": false}
+where the move is null if the player has to pass, and the score is the disc
+difference the search expects for him (null when there was nothing to search,
+with no move or only one). GET /stats returns the server's counters.
+
+Searches run on a bounded process pool, and each worker process keeps its own
+transposition table warm between requests. Requests for a position that is
+already being searched wait for that search instead of starting another, and
+recent results are kept in an LRU cache. Once too many searches are waiting for
+a worker, new ones are turned away with 503 and a Retry-After header, so a
+flood of requests can't queue up without limit. loadgen.py measures throughput
+and latency against a running server.
+"""
+import asyncio
+import json
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from endgame import EXACT_SCORE, EndgameSolver
+from othelloplayer import DEFAULT_ENDGAME_EMPTIES, DEFAULT_TABLE_ENTRIES, ENDGAME_TIME_SHARE, make_othello
+from search import Search, SearchTimeout
+from transposition import TranspositionTable
+
+################################################################################
+# CONSTANTS
+################################################################################
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_DEPTH = 6
+DEFAULT_CACHE_ENTRIES = 10000
+DEFAULT_MAX_PENDING = 64
+MAX_DEPTH = 20
+MAX_WIDTH = 24
+MAX_BODY_BYTES = 1 << 16
+
+# how long, in seconds, to tell a turned-away client to wait before trying again
+RETRY_AFTER = 1
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+################################################################################
+# WORKERS
+################################################################################
+
+_worker_table = None
+
+def search_position(board, player, depth, time_ms):
+	"""
+	Pool task: returns (location, score, depth) for the player on the board,
+	solving the endgame once few enough squares are empty and the depth reaches
+	the end of the game. With a time limit, the solver gets its share of it, and
+	the search the rest if it runs out. The score is the one the move got at the
+	depth reported. Each worker process keeps one transposition table for all its
+	tasks.
+	"""
+	global _worker_table
+	if _worker_table is None:
+		_worker_table = TranspositionTable(DEFAULT_TABLE_ENTRIES)
+
+	start = time.perf_counter()
+	state = make_othello([list(row) for row in board])
+	moves = state.get_moves(player)
+	if not moves:
+		return (None, None, 0)
+
+	empties = state.get_state_value(0)
+	if empties <= min(depth, DEFAULT_ENDGAME_EMPTIES):
+		solver = EndgameSolver(_worker_table)
+		if time_ms != None:
+			solver.deadline = start + ENDGAME_TIME_SHARE * time_ms / 1000
+		try:
+			# a timeout leaves moves played on the board, so solve a copy
+			move, score = solver.solve(state.copy(), player, EXACT_SCORE)
+			return (state.get_location(move), score, empties)
+		except SearchTimeout:
+			time_ms = max(1, time_ms - 1000 * (time.perf_counter() - start))
+
+	search = Search(_worker_table, seed=0)
+	location = search.iterative_deepening(state, player, depth, time_ms)
+	return (location, search.depth_scores.get(search.stats.depth), search.stats.depth)
+
+################################################################################
+# SERVER
+################################################################################
+
+class HTTPError(Exception):
+	"""
+	Raised while handling a request to send back an error status and message.
+	"""
+	def __init__(self, status, message, headers = None):
+		Exception.__init__(self, message)
+		self.status = status
+		self.headers = headers or {}
+
+class MoveServer:
+	"""
+	The server's state: the pool, the searches in flight, and the result cache.
+
+	Attributes:
+		pool:			the ProcessPoolExecutor searches run on.
+		max_pending:	how many searches may be running or waiting for a worker
+						before new ones are turned away.
+		cache:			an OrderedDict of request key to result, least recently used first.
+		cache_entries:	how many results the cache keeps.
+		in_flight:		for each request key being searched, the asyncio.Future of its result.
+		counters:		a dict of request, cache, coalescing and rejection counts.
+	"""
+	def __init__(self, workers = None, max_pending = DEFAULT_MAX_PENDING, cache_entries = DEFAULT_CACHE_ENTRIES):
+		"""
+		Constructor, takes the number of worker processes (None for one per core),
+		the limit on pending searches, and the size of the result cache.
+		"""
+		self.pool = ProcessPoolExecutor(workers)
+		self.max_pending = max_pending
+		self.cache = OrderedDict()
+		self.cache_entries = cache_entries
+		self.in_flight = {}
+		self.counters = {"requests": 0, "searches": 0, "cache_hits": 0, "coalesced": 0, "rejected": 0, "errors": 0}
+
+	def close(self):
+		"""
+		Shuts down the worker processes.
+		"""
+		self.pool.shutdown(cancel_futures=True)
+
+	async def get_move(self, board, player, depth, time_ms):
+		"""
+		Returns the result dict for a request, from the cache, from a search of the
+		same position already in flight, or from a new search.
+		"""
+		key = (board, player, depth, time_ms)
+		result = self.cache.get(key)
+		if result != None:
+			self.cache.move_to_end(key)
+			self.counters["cache_hits"] += 1
+			return dict(result, cached=True)
+
+		future = self.in_flight.get(key)
+		if future != None:
+			self.counters["coalesced"] += 1
+			return dict(await asyncio.shield(future), coalesced=True)
+
+		if len(self.in_flight) >= self.max_pending:
+			self.counters["rejected"] += 1
+			raise HTTPError(503, "too many searches pending", {"Retry-After": str(RETRY_AFTER)})
+
+		loop = asyncio.get_running_loop()
+		future = loop.create_future()
+		self.in_flight[key] = future
+		self.counters["searches"] += 1
+		try:
+			location, score, reached = await loop.run_in_executor(self.pool, search_position, board, player, depth, time_ms)
+			result = {"move": location, "score": score, "depth": reached, "cached": False, "coalesced": False}
+			future.set_result(result)
+		except Exception as exception:
+			future.set_exception(exception)
+			# nobody else may be waiting for it, so don't let asyncio complain
+			future.exception()
+			raise
+		finally:
+			del self.in_flight[key]
+
+		# a search with a time limit depends on how busy the machine was, so don't reuse it
+		if time_ms == None:
+			self.cache[key] = result
+			if len(self.cache) > self.cache_entries:
+				self.cache.popitem(last=False)
+		return result
+
+	async def handle_move(self, body):
+		"""
+		POST /move: checks the request, and returns the result dict.
+		"""
+		try:
+			request = json.loads(body)
+			board = tuple(tuple(int(cell) for cell in row) for row in request["board"])
+			player = int(request["player"])
+			depth = int(request.get("depth", DEFAULT_DEPTH))
+			time_ms = request.get("time_ms")
+			time_ms = None if time_ms == None else int(time_ms)
+		except (ValueError, KeyError, TypeError) as exception:
+			raise HTTPError(400, "bad request: " + str(exception))
+
+		width = len(board)
+		if width < 4 or width > MAX_WIDTH or width % 2 or any(len(row) != width or not set(row) <= {0, 1, 2} for row in board):
+			raise HTTPError(400, "the board must be square, an even width from 4 to " + str(MAX_WIDTH) + ", and hold only 0, 1 and 2")
+		if player not in (1, 2):
+			raise HTTPError(400, "the player must be 1 or 2")
+		if not 1 <= depth <= MAX_DEPTH:
+			raise HTTPError(400, "the depth must be from 1 to " + str(MAX_DEPTH))
+		if time_ms != None and time_ms <= 0:
+			raise HTTPError(400, "the time must be positive")
+
+		return await self.get_move(board, player, depth, time_ms)
+
+	def get_stats(self):
+		"""
+		GET /stats: the counters, plus the cache and in-flight sizes.
+		"""
+		return dict(self.counters, cached=len(self.cache), in_flight=len(self.in_flight))
+
+	async def handle_connection(self, reader, writer):
+		"""
+		Serves HTTP/1.1 requests on one connection until the client closes it.
+		"""
+		try:
+			while True:
+				request_line = await reader.readline()
+				if not request_line:
+					break
+				headers = {}
+				while True:
+					line = await reader.readline()
+					if line in (b"\r\n", b"\n", b""):
+						break
+					name, _, value = line.decode("latin-1").partition(":")
+					headers[name.strip().lower()] = value.strip()
+
+				keep_alive = headers.get("connection", "").lower() != "close"
+				status, payload, extra_headers = 200, None, {}
+				try:
+					parts = request_line.decode("latin-1").split()
+					if len(parts) != 3:
+						raise HTTPError(400, "bad request line")
+					method, path = parts[0], parts[1]
+
+					length = int(headers.get("content-length", 0))
+					if length > MAX_BODY_BYTES:
+						keep_alive = False
+						raise HTTPError(413, "request too large")
+					body = await reader.readexactly(length) if length else b""
+
+					self.counters["requests"] += 1
+					if path == "/move":
+						if method != "POST":
+							raise HTTPError(405, "use POST")
+						payload = await self.handle_move(body)
+					elif path == "/stats":
+						payload = self.get_stats()
+					else :
+						raise HTTPError(404, "no such path")
+				except HTTPError as error:
+					status, payload, extra_headers = error.status, {"error": str(error)}, error.headers
+				except (ValueError, asyncio.IncompleteReadError) as exception:
+					status, payload, keep_alive = 400, {"error": str(exception)}, False
+				except Exception as exception:
+					self.counters["errors"] += 1
+					status, payload = 500, {"error": repr(exception)}
+
+				data = json.dumps(payload).encode()
+				response = "HTTP/1.1 " + str(status) + " " + STATUS_TEXT.get(status, "Internal Server Error") + "\r\n"
+				response += "Content-Type: application/json\r\nContent-Length: " + str(len(data)) + "\r\n"
+				for name, value in extra_headers.items():
+					response += name + ": " + value + "\r\n"
+				response += "Connection: " + ("keep-alive" if keep_alive else "close") + "\r\n\r\n"
+				writer.write(response.encode("latin-1") + data)
+				await writer.drain()
+				if not keep_alive:
+					break
+		except (ConnectionError, asyncio.IncompleteReadError):
+			pass
+		finally:
+			writer.close()
+
+async def serve(host = DEFAULT_HOST, port = DEFAULT_PORT, workers = None, max_pending = DEFAULT_MAX_PENDING, cache_entries = DEFAULT_CACHE_ENTRIES):
+	"""
+	Runs the server until it's cancelled.
+	"""
+	server = MoveServer(workers, max_pending, cache_entries)
+	try:
+		listener = await asyncio.start_server(server.handle_connection, host, port)
+		print("serving on http://" + host + ":" + str(port), file=sys.stderr)
+		async with listener:
+			await listener.serve_forever()
+	finally:
+		server.close()
+
+################################################################################
+# COMMAND LINE
+################################################################################
+
+def print_help(output = sys.stderr):
+	"""
+	Print out a help screen for the user (probably to stderr).
+	"""
+	print("Usage: python3 " +sys.argv[0]+ " <options>", file=output)
+	print("Options include:", file=output)
+	print("\t-c\tresult cache entries (default " +str(DEFAULT_CACHE_ENTRIES)+ ")", file=output)
+	print("\t-h\tprint this help", file=output)
+	print("\t-H\thost to listen on (default " +DEFAULT_HOST+ ")", file=output)
+	print("\t-j\tnumber of worker processes (default: one per core)", file=output)
+	print("\t-p\tport to listen on (default " +str(DEFAULT_PORT)+ ")", file=output)
+	print("\t-q\tmost searches pending before turning requests away (default " +str(DEFAULT_MAX_PENDING)+ ")", file=output)
+
+if __name__ == "__main__":
+	args = sys.argv[1:]
+	if "-h" in args or "--help" in args:
+		print_help()
+		sys.exit(1)
+
+	host = args[args.index("-H") + 1] if "-H" in args else DEFAULT_HOST
+	port = int(args[args.index("-p") + 1]) if "-p" in args else DEFAULT_PORT
+	workers = int(args[args.index("-j") + 1]) if "-j" in args else None
+	max_pending = int(args[args.index("-q") + 1]) if "-q" in args else DEFAULT_MAX_PENDING
+	cache_entries = int(args[args.index("-c") + 1]) if "-c" in args else DEFAULT_CACHE_ENTRIES
+
+	try:
+		asyncio.run(serve(host, port, workers, max_pending, cache_entries))
+	except KeyboardInterrupt:
+		pass
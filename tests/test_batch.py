@@ -0,0 +1,19 @@
+"""
+Tests for the batched move generator's timing setup.
+"""
+import unittest
+
+from batch import make_positions, make_timing_games
+
+class MakeTimingGamesTest(unittest.TestCase):
+	def test_games_start_with_no_moves_cached(self):
+		boards, players = make_positions(20, 8, 60, 0)
+		games, locations = make_timing_games(boards, players, 0)
+		for game, player, location, board in zip(games, players, locations, boards):
+			# the timed loop has to generate the moves itself
+			self.assertEqual(game.move_cache, {})
+			self.assertEqual(game.board, board)
+			self.assertIn(location, game._get_available_moves(player))
+
+if __name__ == "__main__":
+	unittest.main()
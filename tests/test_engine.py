@@ -0,0 +1,76 @@
+"""
+Tests for the engine's text protocol.
+"""
+import io
+import json
+import random
+import unittest
+
+from engine import Engine
+from othelloplayer import Othello
+from search import get_square_priority
+
+def make_endgame_board(width, empties, seed):
+	"""
+	Returns (cells, player to move) for a random game played until only the
+	given number of squares are empty, with the player to move able to move.
+	"""
+	while True:
+		rng = random.Random(seed)
+		game = Othello(None, width)
+		player = 2
+		while game.get_state_value(0) > empties:
+			moves = game._get_available_moves(player)
+			if not moves:
+				if not game._get_available_moves(3 - player):
+					break
+				player = 3 - player
+				continue
+			game.play_move(rng.choice(moves), player)
+			player = 3 - player
+		if game.get_state_value(0) == empties and game._get_available_moves(player):
+			return ("".join(str(cell) for row in game.board for cell in row), player)
+		seed += 1000
+
+class EngineTest(unittest.TestCase):
+	def run_commands(self, engine, output, commands):
+		"""
+		Sends the engine each command, waiting for each to finish, and returns its
+		replies.
+		"""
+		for command in commands:
+			engine.handle(command)
+			engine.wait()
+		return output.getvalue().split("\n")[:-1]
+
+	def get_stats(self, replies):
+		return json.loads(replies[-1][len("stats "):])
+
+	def test_depth_limited_go_does_not_solve(self):
+		cells, player = make_endgame_board(8, 12, 1)
+		output = io.StringIO()
+		engine = Engine(output, table_entries=1 << 12, seed=0)
+		replies = self.run_commands(engine, output, ["position board " + cells + " " + str(player), "go depth 1", "isready", "stats"])
+		self.assertTrue(replies[0].startswith("bestmove "))
+		self.assertNotEqual(replies[0], "bestmove none")
+		self.assertEqual(self.get_stats(replies)["depth"], 1)
+
+	def test_deep_enough_go_solves(self):
+		cells, player = make_endgame_board(8, 6, 2)
+		output = io.StringIO()
+		engine = Engine(output, table_entries=1 << 12, seed=0)
+		replies = self.run_commands(engine, output, ["position board " + cells + " " + str(player), "go depth 6", "isready", "stats"])
+		# the solver reports the number of empty squares as its depth
+		self.assertEqual(self.get_stats(replies)["depth"], 6)
+
+	def test_width_change_starts_a_new_search(self):
+		output = io.StringIO()
+		engine = Engine(output, table_entries=1 << 12, seed=0)
+		self.run_commands(engine, output, ["position startpos width 10", "go depth 3", "position startpos", "go depth 3"])
+		# every square priority the search has cached is for the 8x8 board
+		self.assertTrue(engine.search.priorities)
+		for move, priority in engine.search.priorities.items():
+			self.assertEqual(priority, get_square_priority(engine.state.get_location(move), 8))
+
+if __name__ == "__main__":
+	unittest.main()
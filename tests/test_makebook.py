@@ -0,0 +1,53 @@
+"""
+Tests for building opening books by search.
+"""
+import random
+import unittest
+
+from makebook import search_position
+from othelloplayer import make_othello
+from search import INFINITY, Search
+from transposition import TranspositionTable
+
+def find_position(move_count, seed):
+	"""
+	Returns (state, player) from a random game, the first position where the
+	player to move has exactly move_count moves.
+	"""
+	while True:
+		rng = random.Random(seed)
+		game = make_othello(None, 8)
+		player = 2
+		while True:
+			moves = game._get_available_moves(player)
+			if not moves:
+				if not game._get_available_moves(3 - player):
+					break
+				player = 3 - player
+				continue
+			if len(moves) == move_count:
+				return (game, player)
+			game.play_move(rng.choice(moves), player)
+			player = 3 - player
+		seed += 1000
+
+class SearchPositionTest(unittest.TestCase):
+	def test_score_is_from_the_deepest_iteration(self):
+		state, player = find_position(6, 1)
+		location, score = search_position(TranspositionTable(), state, player, 3)
+		search = Search(TranspositionTable(), seed=0)
+		self.assertEqual(location, search.iterative_deepening(state, player, 3))
+		self.assertEqual(score, search.depth_scores[3])
+
+	def test_forced_move_is_searched(self):
+		state, player = find_position(1, 2)
+		location, score = search_position(TranspositionTable(), state, player, 3)
+		self.assertEqual(location, state.get_location(state.get_moves(player)[0]))
+
+		# the forced move's score is its child's, searched a ply shallower
+		child = state.copy()
+		child.make_move(state.get_moves(player)[0], player)
+		self.assertEqual(score, -Search(TranspositionTable(), seed=0).negamax(child, 3 - player, 2, -INFINITY, INFINITY))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,37 @@
+"""
+Tests for the game record format.
+"""
+import os
+import tempfile
+import unittest
+
+from records import GameWriter, MAX_WIDTH, read_games
+
+class RecordsTest(unittest.TestCase):
+	def setUp(self):
+		handle, self.path = tempfile.mkstemp(suffix=".bin")
+		os.close(handle)
+
+	def tearDown(self):
+		os.remove(self.path)
+
+	def test_widest_board_round_trips(self):
+		# the last square of the widest board still fits in a byte
+		moves = [(0, 0), (MAX_WIDTH - 1, MAX_WIDTH - 1)]
+		with GameWriter(self.path, ["a", "b"]) as writer:
+			writer.write_game(MAX_WIDTH, moves, -3, (1, 0), (2, None))
+		records = list(read_games(self.path))
+		self.assertEqual(len(records), 1)
+		self.assertEqual(records[0].width, MAX_WIDTH)
+		self.assertEqual(records[0].moves, moves)
+		self.assertEqual(records[0].players, ("b", "a"))
+		self.assertEqual(records[0].levels, (2, 0))
+		self.assertEqual(records[0].score, -3)
+
+	def test_too_wide_board_raises(self):
+		with GameWriter(self.path, ["a"]) as writer:
+			with self.assertRaises(ValueError):
+				writer.write_game(MAX_WIDTH + 1, [(0, 0)], 0)
+
+if __name__ == "__main__":
+	unittest.main()
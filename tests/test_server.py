@@ -0,0 +1,35 @@
+"""
+Tests for the move server's request checks.
+"""
+import asyncio
+import json
+import unittest
+
+from server import MAX_WIDTH, HTTPError, MoveServer
+
+class HandleMoveTest(unittest.TestCase):
+	def setUp(self):
+		self.server = MoveServer(workers=1)
+
+	def tearDown(self):
+		self.server.close()
+
+	def get_status(self, width):
+		"""
+		Returns the status of a move request on an empty board of the given width.
+		"""
+		body = json.dumps({"board": [[0] * width for _ in range(width)], "player": 2, "depth": 1}).encode()
+		try:
+			asyncio.run(self.server.handle_move(body))
+		except HTTPError as error:
+			return error.status
+		return 200
+
+	def test_too_wide_board_is_a_bad_request(self):
+		self.assertEqual(self.get_status(MAX_WIDTH + 2), 400)
+
+	def test_widest_board_is_searched(self):
+		self.assertEqual(self.get_status(MAX_WIDTH), 200)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,18 @@
+"""
+Tests for the tournament's command line.
+"""
+import unittest
+
+from tournament import parse_command_line_args
+
+class ParseCommandLineArgsTest(unittest.TestCase):
+	def test_evaluators(self):
+		configs = parse_command_line_args(["-e", "weights.bin,none", "-l", "3,4"])[1]
+		self.assertEqual(configs, (("othelloplayer", 3, None, "weights.bin"), ("othelloplayer", 4, None, None)))
+
+	def test_no_evaluators_count_discs(self):
+		configs = parse_command_line_args(["-l", "3"])[1]
+		self.assertEqual([config[3] for config in configs], [None, None])
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,249 @@
+"""
+Headless Othello games and AI-vs-AI tournaments.
+
+play_game() runs one game between two ComputerPlayers with no graphics and no
+delay between moves. Run this file to play a whole tournament between two AI
+configurations across a pool of processes, e.g.
+
+	python3 tournament.py -f othelloplayer,myplayer -l 4,6 -g 1000 -j 16
+
+It reports games/sec, win rates, and per-move latency percentiles for each side.
+Colors alternate from game to game, so neither side always moves first. With
+-o, every game is also saved to a game record file (see records.py). With -e,
+a side scores positions with a pattern weight file (see patterns.py) instead
+of counting discs, e.g. to see whether the patterns are worth a ply:
+
+	python3 tournament.py -e weights.bin,none -l 3,4 -g 200 -s 1
+"""
+import importlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from othelloplayer import make_othello
+from records import GameWriter, check_width
+
+################################################################################
+# CONSTANTS
+################################################################################
+
+DEFAULT_AI_FILE = "othelloplayer"
+DEFAULT_AI_LEVEL = 4
+DEFAULT_GAMES = 100
+DEFAULT_WIDTH = 8
+LATENCY_PERCENTILES = (50, 90, 99, 100)
+
+################################################################################
+# GAMES
+################################################################################
+
+def load_player(player_id, module_name, level, time_ms = None, seed = None, evaluator = None):
+	"""
+	Returns a new ComputerPlayer from the given module. Options are only passed on
+	if they were given, so AI files that don't take them still work.
+	"""
+	options = {}
+	if time_ms != None: options["time_ms"] = time_ms
+	if seed != None: options["seed"] = seed
+	if evaluator != None: options["evaluator"] = evaluator
+	module = importlib.import_module(module_name)
+	return module.ComputerPlayer(player_id, level, **options)
+
+def play_game(players, width = DEFAULT_WIDTH, ponder = False):
+	"""
+	Plays one game between two players, where players[0] is player 1 (white) and
+	players[1] is player 2 (black), who goes first. Returns a dict with the
+	"winner" (1, 2, or 0 for a tie), each player's "tokens", the list of "moves"
+	played, and each player's per-move "latencies" in seconds. With ponder, each
+	player that can ponders on the other's time.
+	"""
+	game = make_othello(None, width)
+	moves = []
+	latencies = {1: [], 2: []}
+	current = 2
+
+	while True:
+		if not game.get_moves(current):
+			if not game.get_moves(3 - current):
+				break
+			current = 3 - current
+			continue
+
+		# pass the player a tuple (so it can't mess with the original board)
+		board_tuple = tuple([tuple(row) for row in game.board])
+		opponent = players[2 - current]
+		if ponder and hasattr(opponent, "start_pondering"):
+			opponent.start_pondering(board_tuple)
+		start = time.perf_counter()
+		move = players[current - 1].pick_move(board_tuple)
+		latencies[current].append(time.perf_counter() - start)
+
+		# checks to make sure that the AI has made a valid move
+		assert game.is_on_board(move)
+		assert game.board[move[1]][move[0]] == 0
+		assert game.get_flipped(move, current)
+
+		game.play_move(move, current)
+		moves.append(move)
+		current = 3 - current
+
+	for player in players:
+		if hasattr(player, "stop_pondering"):
+			player.stop_pondering()
+
+	tokens = {1: game.get_state_value(1), 2: game.get_state_value(2)}
+	if tokens[1] > tokens[2]: winner = 1
+	elif tokens[2] > tokens[1]: winner = 2
+	else: winner = 0
+
+	return {"winner": winner, "tokens": tokens, "moves": moves, "latencies": latencies}
+
+def play_tournament_game(game_number, configs, width, seed, ponder = False):
+	"""
+	Pool task: plays game number game_number between configs[0] ("A") and
+	configs[1] ("B"), each a (module_name, level, time_ms, evaluator) tuple, where
+	the evaluator is a pattern weight file or None to count discs. A plays white in
+	even-numbered games and black in odd ones. Returns the play_game() result
+	with "A" and "B" keys telling which player number each side was.
+	"""
+	sides = ("A", "B") if game_number % 2 == 0 else ("B", "A")
+	players = []
+	for player_id, side in zip((1, 2), sides):
+		module_name, level, time_ms, evaluator = configs[0 if side == "A" else 1]
+		player_seed = None if seed == None else seed * 1000003 + game_number * 2 + player_id
+		players.append(load_player(player_id, module_name, level, time_ms, player_seed, evaluator))
+
+	result = play_game(players, width, ponder)
+	result[sides[0]] = 1
+	result[sides[1]] = 2
+	return result
+
+def get_percentile(sorted_values, percentile):
+	"""
+	Returns the nearest-rank percentile of an already sorted list.
+	"""
+	if not sorted_values:
+		return 0.0
+	rank = max(1, -(-percentile * len(sorted_values) // 100))
+	return sorted_values[rank - 1]
+
+def run_tournament(configs, games = DEFAULT_GAMES, jobs = None, width = DEFAULT_WIDTH, seed = None, ponder = False, record_path = None):
+	"""
+	Plays a number of games between configs[0] ("A") and configs[1] ("B") on a
+	pool of jobs processes, and returns a dict of summary statistics. With a
+	record_path, each game is written to that game record file as it finishes
+	(a board too wide to record raises a ValueError before any game is played).
+	"""
+	if record_path != None:
+		check_width(width)
+	writer = None if record_path == None else GameWriter(record_path, [config[0] for config in configs])
+	results = []
+	start = time.perf_counter()
+	try:
+		with ProcessPoolExecutor(jobs) as pool:
+			for result in pool.map(play_tournament_game, range(games), [configs] * games, [width] * games, [seed] * games, [ponder] * games):
+				results.append(result)
+				if writer != None:
+					# the config (and so name) index of players 1 and 2
+					indexes = [0 if result["A"] == player_id else 1 for player_id in (1, 2)]
+					score = result["tokens"][1] - result["tokens"][2]
+					writer.write_game(width, result["moves"], score, indexes, [configs[index][1] for index in indexes])
+	finally:
+		if writer != None:
+			writer.close()
+	elapsed = time.perf_counter() - start
+
+	summary = {"games": games, "seconds": elapsed, "games_per_second": games / elapsed if elapsed else 0.0}
+	summary["draws"] = sum(1 for result in results if result["winner"] == 0)
+	for side, config in zip(("A", "B"), configs):
+		wins = sum(1 for result in results if result["winner"] == result[side])
+		latencies = sorted(latency for result in results for latency in result["latencies"][result[side]])
+		summary[side] = {
+			"config": config,
+			"wins": wins,
+			"win_rate": wins / games if games else 0.0,
+			"moves": len(latencies),
+			"latency_ms": {"p" + str(p): 1000 * get_percentile(latencies, p) for p in LATENCY_PERCENTILES},
+		}
+
+	return summary
+
+def print_summary(summary, output = sys.stdout):
+	"""
+	Prints the results of run_tournament() in a human-readable form.
+	"""
+	print(str(summary["games"]) + " games in " + "%.1f" % summary["seconds"] + "s (" + "%.2f" % summary["games_per_second"] + " games/sec), " + str(summary["draws"]) + " draws", file=output)
+	for side in ("A", "B"):
+		stats = summary[side]
+		module_name, level, time_ms, evaluator = stats["config"]
+		name = module_name + " level " + str(level) + ("" if time_ms == None else " " + str(time_ms) + "ms") + ("" if evaluator == None else " " + evaluator)
+		latency = ", ".join(p + " " + "%.1f" % ms + "ms" for p, ms in stats["latency_ms"].items())
+		print(side + " (" + name + "): " + str(stats["wins"]) + " wins (" + "%.1f" % (100 * stats["win_rate"]) + "%), move latency " + latency, file=output)
+
+################################################################################
+# COMMAND LINE
+################################################################################
+
+def parse_pair(args, flag, default, convert = int):
+	"""
+	Returns the two values of a "-x a,b" (or "-x a") option, or (default, default).
+	"""
+	if flag not in args:
+		return (default, default)
+	values = args[args.index(flag) + 1].split(',')
+	if len(values) == 1: return (convert(values[0]), convert(values[0]))
+	return (convert(values[0]), convert(values[1]))
+
+def parse_command_line_args(args):
+	"""
+	Search the command-line args for the various options (see the help function).
+	"""
+	print_help = "-h" in args or "--help" in args
+
+	ai_files = parse_pair(args, "-f", DEFAULT_AI_FILE, lambda name: name[:-3] if name.endswith(".py") else name)
+	times = parse_pair(args, "-t", None)
+	levels = parse_pair(args, "-l", None if "-t" in args else DEFAULT_AI_LEVEL)
+	evaluators = parse_pair(args, "-e", None, lambda path: None if path == "none" else path)
+	configs = tuple(zip(ai_files, levels, times, evaluators))
+
+	games = int(args[args.index("-g") + 1]) if "-g" in args else DEFAULT_GAMES
+	jobs = int(args[args.index("-j") + 1]) if "-j" in args else None
+	width = int(args[args.index("-w") + 1]) if "-w" in args else DEFAULT_WIDTH
+	seed = int(args[args.index("-s") + 1]) if "-s" in args else None
+	ponder = "-p" in args
+	record_path = args[args.index("-o") + 1] if "-o" in args else None
+
+	return (print_help, configs, games, jobs, width, seed, ponder, record_path)
+
+def print_help(output = sys.stderr):
+	"""
+	Print out a help screen for the user (probably to stderr).
+	"""
+	print("Usage: python3 " +sys.argv[0]+ " <options>", file=output)
+	print("Options include:", file=output)
+	print("\t-e\tpattern weight files to evaluate with (file,file); none counts discs", file=output)
+	print("\t-f\tAI files for sides A and B (file,file)", file=output)
+	print("\t-g\tnumber of games (default " +str(DEFAULT_GAMES)+ ")", file=output)
+	print("\t-h\tprint this help", file=output)
+	print("\t-j\tnumber of processes (default: one per core)", file=output)
+	print("\t-l\tset AI levels (#,#)", file=output)
+	print("\t-o\tsave the games to this game record file", file=output)
+	print("\t-p\tAIs ponder on each other's time", file=output)
+	print("\t-s\trandom seed, for a repeatable tournament", file=output)
+	print("\t-t\tset AI time per move in ms (#,#); -l becomes the max depth", file=output)
+	print("\t-w\tboard width (default " +str(DEFAULT_WIDTH)+ ")", file=output)
+
+if __name__ == "__main__":
+	do_print_help, configs, games, jobs, width, seed, ponder, record_path = parse_command_line_args(sys.argv[1:])
+
+	if do_print_help:
+		print_help()
+		sys.exit(1)
+	if record_path != None:
+		try:
+			check_width(width)
+		except ValueError as error:
+			print(error, file=sys.stderr)
+			sys.exit(1)
+
+	print_summary(run_tournament(configs, games, jobs, width, seed, ponder, record_path))
@@ -0,0 +1,174 @@
+"""
+Fits the weights of the pattern evaluation (see patterns.py) to games saved in
+game record files (see records.py), and writes them to a weight file:
+
+	python3 tournament.py -g 5000 -l 3 -s 1 -o games.bin
+	python3 trainpatterns.py -o weights.bin games.bin
+
+Every position in the games is a sample: the pattern indexes and mobility of
+the player to move, with the final disc difference from his side as the
+target. Each stage's weights are a ridge least-squares fit to its samples.
+There are far too many weights for a dense solver, but each sample only uses a
+few dozen of them, so the fit is solved with NumPy by conjugate gradients and
+the sample matrix is never built. Every tenth game is held out (by default) to
+check that the fit carries over to games it hasn't seen.
+"""
+import sys
+import time
+
+import numpy
+
+from patterns import CONSTANT, INSTANCES, MOBILITY, STAGE_WEIGHTS, get_canonical, get_feature_indexes, get_stage, write_weights
+from records import read_games
+
+################################################################################
+# CONSTANTS
+################################################################################
+
+DEFAULT_STAGES = 4
+DEFAULT_PLIES_PER_STAGE = 15
+DEFAULT_RIDGE = 10.0
+DEFAULT_ITERATIONS = 300
+DEFAULT_HOLDOUT = 10
+DEFAULT_SCALE = 64
+
+# stop once the gradient has shrunk by this much
+TOLERANCE = 1e-6
+
+################################################################################
+# TRAINING
+################################################################################
+
+def get_samples(paths, stages = DEFAULT_STAGES, plies_per_stage = DEFAULT_PLIES_PER_STAGE, holdout = DEFAULT_HOLDOUT):
+	"""
+	Replays every 8x8 game in the record files, and returns (training, test)
+	samples, each a list with one (indexes, mobility, targets) tuple of arrays per
+	stage. Every holdout-th game goes to the test samples (none if holdout is 0).
+	"""
+	canonical = get_canonical()
+	columns = [[([], [], []) for _ in range(stages)] for _ in range(2)]
+	games = 0
+	for path in paths:
+		for record in read_games(path):
+			if record.width != 8:
+				continue
+			games += 1
+			held_out = holdout and games % holdout == 0
+			for state, player, move in record.replay():
+				own, opp = state.tokens[player], state.tokens[3 - player]
+				indexes, mobility, targets = columns[held_out][get_stage(own, opp, plies_per_stage, stages)]
+				indexes.append([canonical[index] for index in get_feature_indexes(own, opp)])
+				mobility.append(state._get_move_mask(player).bit_count() - state._get_move_mask(3 - player).bit_count())
+				targets.append(record.score if player == 1 else -record.score)
+
+	return [[(numpy.array(indexes, dtype=numpy.int64).reshape(-1, INSTANCES), numpy.array(mobility, dtype=numpy.float64), numpy.array(targets, dtype=numpy.float64))
+		for indexes, mobility, targets in stage_columns] for stage_columns in columns]
+
+def predict(weights, indexes, mobility):
+	"""
+	Returns the evaluation of each sample with the given stage weights, in discs.
+	"""
+	return weights[indexes].sum(axis=1) + weights[MOBILITY] * mobility + weights[CONSTANT]
+
+def fit_stage(indexes, mobility, targets, ridge = DEFAULT_RIDGE, iterations = DEFAULT_ITERATIONS):
+	"""
+	Returns the stage weights w that minimize |A w - targets|^2 + ridge |w|^2,
+	where row n of A has a 1 for each of indexes[n], mobility[n] for the
+	mobility weight and a 1 for the constant. Solved by conjugate gradients on
+	the normal equations (CGLS), multiplying by A and its transpose directly.
+	"""
+	def multiply_transposed(residuals):
+		result = numpy.bincount(indexes.ravel(), weights=numpy.repeat(residuals, indexes.shape[1]), minlength=STAGE_WEIGHTS)
+		result[MOBILITY] += residuals @ mobility
+		result[CONSTANT] += residuals.sum()
+		return result
+
+	weights = numpy.zeros(STAGE_WEIGHTS)
+	if not len(targets):
+		return weights
+
+	residuals = targets.copy()
+	gradient = multiply_transposed(residuals)
+	direction = gradient.copy()
+	gamma = start_gamma = gradient @ gradient
+	for _ in range(iterations):
+		product = predict(direction, indexes, mobility)
+		alpha = gamma / (product @ product + ridge * (direction @ direction))
+		weights += alpha * direction
+		residuals -= alpha * product
+		gradient = multiply_transposed(residuals) - ridge * weights
+		new_gamma = gradient @ gradient
+		if new_gamma <= TOLERANCE * TOLERANCE * start_gamma:
+			break
+		direction = gradient + (new_gamma / gamma) * direction
+		gamma = new_gamma
+	return weights
+
+def get_error(weights, samples):
+	"""
+	Returns the root mean square error, in discs, of the weights on the samples.
+	"""
+	indexes, mobility, targets = samples
+	if not len(targets):
+		return 0.0
+	return float(numpy.sqrt(numpy.mean((predict(weights, indexes, mobility) - targets) ** 2)))
+
+def train(paths, stages = DEFAULT_STAGES, plies_per_stage = DEFAULT_PLIES_PER_STAGE, ridge = DEFAULT_RIDGE, iterations = DEFAULT_ITERATIONS, holdout = DEFAULT_HOLDOUT, output = None):
+	"""
+	Returns the fitted weights for each stage, as arrays in discs, printing the
+	fit of each stage to output (if not None).
+	"""
+	start = time.perf_counter()
+	training, test = get_samples(paths, stages, plies_per_stage, holdout)
+	if output != None:
+		print("read %d training and %d test positions in %.1fs" % (sum(len(s[2]) for s in training), sum(len(s[2]) for s in test), time.perf_counter() - start), file=output)
+
+	all_weights = []
+	for stage in range(stages):
+		weights = fit_stage(*training[stage], ridge, iterations)
+		all_weights.append(weights)
+		if output != None:
+			# predicting a draw every time is the baseline to beat
+			print("stage %d: %d positions, rms error %.2f discs (test %.2f, predicting 0: %.2f)" % (stage, len(training[stage][2]),
+				get_error(weights, training[stage]), get_error(weights, test[stage]), get_error(numpy.zeros(STAGE_WEIGHTS), test[stage])), file=output)
+	return all_weights
+
+################################################################################
+# COMMAND LINE
+################################################################################
+
+def print_help(output = sys.stderr):
+	"""
+	Print out a help screen for the user (probably to stderr).
+	"""
+	print("Usage: python3 " +sys.argv[0]+ " -o <weight file> <options> <record file>...", file=output)
+	print("Options include:", file=output)
+	print("\t-h\tprint this help", file=output)
+	print("\t-i\tmost conjugate gradient iterations per stage (default " +str(DEFAULT_ITERATIONS)+ ")", file=output)
+	print("\t-o\tthe weight file to write", file=output)
+	print("\t-p\tplies per stage (default " +str(DEFAULT_PLIES_PER_STAGE)+ ")", file=output)
+	print("\t-r\tridge penalty (default " +str(DEFAULT_RIDGE)+ ")", file=output)
+	print("\t-s\tnumber of stages (default " +str(DEFAULT_STAGES)+ ")", file=output)
+	print("\t-t\thold out every nth game to test on, 0 for none (default " +str(DEFAULT_HOLDOUT)+ ")", file=output)
+
+if __name__ == "__main__":
+	args = sys.argv[1:]
+	if "-h" in args or "--help" in args or "-o" not in args:
+		print_help()
+		sys.exit(1)
+
+	options = {}
+	for flag in ("-i", "-o", "-p", "-r", "-s", "-t"):
+		if flag in args:
+			options[flag] = args.pop(args.index(flag) + 1)
+			args.remove(flag)
+
+	stages = int(options.get("-s", DEFAULT_STAGES))
+	plies_per_stage = int(options.get("-p", DEFAULT_PLIES_PER_STAGE))
+	ridge = float(options.get("-r", DEFAULT_RIDGE))
+	iterations = int(options.get("-i", DEFAULT_ITERATIONS))
+	holdout = int(options.get("-t", DEFAULT_HOLDOUT))
+
+	weights = train(args, stages, plies_per_stage, ridge, iterations, holdout, sys.stderr)
+	write_weights(options["-o"], [numpy.rint(stage * DEFAULT_SCALE) for stage in weights], plies_per_stage, DEFAULT_SCALE)
+	print("wrote " + options["-o"], file=sys.stderr)
@@ -0,0 +1,140 @@
+"""
+Zobrist hashing and a fixed-size transposition table for the negamax search.
+"""
+import random
+
+EXACT = 0
+LOWER = 1 # the stored value is a lower bound (the search failed high)
+UPPER = 2 # the stored value is an upper bound (the search failed low)
+
+REPLACEMENT_POLICIES = ("depth", "always")
+
+_zobrist_cache = {}
+
+def get_zobrist_keys(width):
+	"""
+	Returns (square_keys, side_key) for a board of the given width.
+	square_keys[y*width + x][player] is the random key for that player's token on
+	that square (player 0 is always 0, so empty squares hash to nothing), and
+	side_key is mixed in when it is player 2's turn.
+	The keys are seeded by the width, so they are the same in every process.
+	"""
+	if width not in _zobrist_cache:
+		rng = random.Random(width)
+		square_keys = [(0, rng.getrandbits(64), rng.getrandbits(64)) for _ in range(width * width)]
+		_zobrist_cache[width] = (square_keys, rng.getrandbits(64))
+	return _zobrist_cache[width]
+
+class TranspositionTable:
+	"""
+	A fixed-size hash table of previously searched positions, indexed by Zobrist key.
+
+	Each slot holds a tuple of (key, depth, value, bound, move, generation). The
+	full key is kept so that two positions sharing a slot are never confused.
+
+	Attributes:
+		max_entries:	the number of slots. The table never grows past this.
+		replacement:	"depth" keeps the deeper of two colliding entries unless the
+						old one is from an earlier search; "always" keeps the newest.
+		filled:			the number of slots in use.
+		generation:		bumped by new_search(), so stale entries can be replaced.
+		hits, misses:	probe counters, for sizing the table.
+		stores, overwrites, rejected:	store counters. An overwrite replaces a
+						different position; a rejection keeps the old entry.
+	"""
+	def __init__(self, max_entries=1 << 20, replacement="depth"):
+		"""
+		Constructor. Takes the entry budget and the replacement policy.
+		"""
+		assert max_entries > 0, "The table needs at least one entry!"
+		assert replacement in REPLACEMENT_POLICIES, "Unknown replacement policy: " + str(replacement)
+
+		self.max_entries = max_entries
+		self.replacement = replacement
+		self.slots = [None] * max_entries
+		self.filled = 0
+		self.generation = 0
+		self.reset_counters()
+
+	def reset_counters(self):
+		"""
+		Zeroes the hit/miss and store counters.
+		"""
+		self.hits = 0
+		self.misses = 0
+		self.stores = 0
+		self.overwrites = 0
+		self.rejected = 0
+
+	def clear(self):
+		"""
+		Empties the table and its counters.
+		"""
+		self.slots = [None] * self.max_entries
+		self.filled = 0
+		self.generation = 0
+		self.reset_counters()
+
+	def new_search(self):
+		"""
+		Marks the start of a new search, making older entries cheap to replace.
+		"""
+		self.generation += 1
+
+	def probe(self, key):
+		"""
+		Returns the (key, depth, value, bound, move, generation) entry for the key,
+		or None if the position isn't stored.
+		"""
+		entry = self.slots[key % self.max_entries]
+		if entry is not None and entry[0] == key:
+			self.hits += 1
+			return entry
+		self.misses += 1
+		return None
+
+	def store(self, key, depth, value, bound, move):
+		"""
+		Records a search result, subject to the replacement policy.
+		"""
+		index = key % self.max_entries
+		old = self.slots[index]
+
+		if old is None:
+			self.filled += 1
+		elif old[0] != key:
+			if self.replacement == "depth" and old[1] > depth and old[5] == self.generation:
+				self.rejected += 1
+				return
+			self.overwrites += 1
+
+		self.slots[index] = (key, depth, value, bound, move, self.generation)
+		self.stores += 1
+
+	def __len__(self):
+		"""
+		Returns the number of filled slots.
+		"""
+		return self.filled
+
+	def get_hit_rate(self):
+		"""
+		Returns the fraction of probes that found their position, or 0 if none were made.
+		"""
+		probes = self.hits + self.misses
+		return self.hits / probes if probes else 0.0
+
+	def get_stats(self):
+		"""
+		Returns the table's counters as a dict.
+		"""
+		return {
+			"max_entries": self.max_entries,
+			"filled": len(self),
+			"hits": self.hits,
+			"misses": self.misses,
+			"hit_rate": self.get_hit_rate(),
+			"stores": self.stores,
+			"overwrites": self.overwrites,
+			"rejected": self.rejected,
+		}